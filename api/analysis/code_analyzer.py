@@ -6,6 +6,11 @@ import json
 from datetime import datetime
 import argparse
 import glob
+import sys
+
+# manifest.py lives in api/, one level up from this script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from manifest import MISSING, Manifest, manifest_path_for, source_fingerprint
 
 # Test for Aria Labels
 def check_aria_labels(html_file_path):
@@ -89,9 +94,10 @@ def get_element_line_context(html_content, element_html):
     # Return the element HTML itself as fallback
     return f"Element: {element_html}"
 
-def analyze_directory(directory_path=".", output_json=True, json_filename="aria_issues.json"):
+def analyze_directory(directory_path=".", output_json=True, json_filename="aria_issues.json", manifest=None):
     """
     Analyze all HTML files in a directory
+    Files unchanged since the run recorded in `manifest` reuse their cached results
     """
     import json
     from datetime import datetime
@@ -122,7 +128,11 @@ def analyze_directory(directory_path=".", output_json=True, json_filename="aria_
         print("=" * 50)
     
     for html_file in html_files:
-        percentage, without_aria, total, missing_by_type, missing_elements = check_aria_labels(html_file)
+        if manifest is not None:
+            aria = manifest.get_or_compute(html_file, "aria", lambda: list(check_aria_labels(html_file)))
+        else:
+            aria = check_aria_labels(html_file)
+        percentage, without_aria, total, missing_by_type, missing_elements = aria
         filename = os.path.basename(html_file)
         
         file_result = {
@@ -314,7 +324,7 @@ class ImageAltAnalyzer:
                 'file_type': 'javascript'
             })
 
-    def analyze_directory(self, directory_path, recursive=True):
+    def analyze_directory(self, directory_path, recursive=True, manifest=None):
         """Analyze all HTML, JS, and CSS files in a directory"""
         directory = Path(directory_path)
         
@@ -337,14 +347,28 @@ class ImageAltAnalyzer:
         print(f"Analyzing {len(files)} files...")
         
         for file_path in files:
+            if manifest is not None:
+                cached = manifest.lookup(str(file_path), "image_alt")
+                if cached is not MISSING:
+                    # Replay the per-file results recorded last time
+                    for result in cached:
+                        self.total_images += result['total_images']
+                        self.images_without_alt += result['without_alt']
+                        self.file_results.append(result)
+                    continue
+            
             try:
                 with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                     content = f.read()
                 
+                first_result = len(self.file_results)
                 if file_path.suffix.lower() in {'.html', '.htm'}:
                     self.analyze_html_content(content, file_path.name)
                 elif file_path.suffix.lower() in {'.js', '.jsx', '.ts', '.tsx'}:
                     self.analyze_js_content(content, file_path.name)
+                
+                if manifest is not None:
+                    manifest.store(str(file_path), "image_alt", self.file_results[first_result:])
                     
             except Exception as e:
                 print(f"Error reading {file_path}: {e}")
@@ -748,9 +772,10 @@ def find_element_line_number(html_content, element_html):
     
     return 1  # Fallback
 
-def analyze_nesting_issues(directory_path=".", output_json=True, json_filename="nesting_issues.json"):
+def analyze_nesting_issues(directory_path=".", output_json=True, json_filename="nesting_issues.json", manifest=None):
     """
     Analyze all HTML, CSS, and JS files for nesting issues
+    Files unchanged since the run recorded in `manifest` reuse their cached results
     """
     import json
     from datetime import datetime
@@ -791,12 +816,12 @@ def analyze_nesting_issues(directory_path=".", output_json=True, json_filename="
             issues = []
             
             try:
-                if file_extension == '.html':
-                    issues = check_html_nesting(file_path)
-                elif file_extension == '.css':
-                    issues = check_css_nesting(file_path)
-                elif file_extension == '.js':
-                    issues = check_js_nesting(file_path)
+                check = {'.html': check_html_nesting, '.css': check_css_nesting, '.js': check_js_nesting}.get(file_extension)
+                if check is not None:
+                    if manifest is not None:
+                        issues = manifest.get_or_compute(file_path, "nesting", lambda: check(file_path))
+                    else:
+                        issues = check(file_path)
                 
                 file_result["issues_count"] = len(issues)
                 file_result["issues"] = issues
@@ -874,10 +899,10 @@ def analyze_nesting_issues(directory_path=".", output_json=True, json_filename="
 
 # Combine all three checks
 
-def run_image_alt_analysis(directory_path="."):
+def run_image_alt_analysis(directory_path=".", manifest=None):
     """Run image alt analysis and return results"""
     analyzer = ImageAltAnalyzer()
-    analyzer.analyze_directory(directory_path)
+    analyzer.analyze_directory(directory_path, manifest=manifest)
     return analyzer.get_results_dict(directory_path)
 
 def combine_all_analysis_results(aria_results, nesting_results, image_alt_results, output_filename="complete_analysis.json"):
@@ -1126,25 +1151,30 @@ def combine_all_analysis_results(aria_results, nesting_results, image_alt_result
     
     return combined_results
 
-def complete_website_analysis(directory_path=".", output_filename="complete_website_analysis.json"):
+def complete_website_analysis(directory_path=".", output_filename="complete_website_analysis.json", incremental=False):
     """
     Main function that runs ARIA, nesting, and image alt analysis and combines results into JSON
+    With incremental=True, a manifest next to `output_filename` lets unchanged files reuse last run's results
     """
     print("🔍 Starting Complete Website Analysis...")
     print("=" * 80)
     
+    manifest = None
+    if incremental:
+        manifest = Manifest(manifest_path_for(output_filename), salt=source_fingerprint(__file__))
+    
     try:
         # Run ARIA analysis
         print("📋 Running ARIA label analysis...")
-        aria_results = analyze_directory(directory_path, output_json=True, json_filename="temp_aria.json")
+        aria_results = analyze_directory(directory_path, output_json=True, json_filename="temp_aria.json", manifest=manifest)
         
         # Run nesting analysis  
         print("🔍 Running nesting analysis...")
-        nesting_results = analyze_nesting_issues(directory_path, output_json=True, json_filename="temp_nesting.json")
+        nesting_results = analyze_nesting_issues(directory_path, output_json=True, json_filename="temp_nesting.json", manifest=manifest)
         
         # Run image alt analysis
         print("🖼️  Running image alt tag analysis...")
-        image_alt_results = run_image_alt_analysis(directory_path)
+        image_alt_results = run_image_alt_analysis(directory_path, manifest=manifest)
         
         # Combine all results
         print("🔄 Combining all results...")
@@ -1157,6 +1187,10 @@ def complete_website_analysis(directory_path=".", output_filename="complete_webs
             if os.path.exists(temp_file):
                 os.remove(temp_file)
         
+        if manifest is not None:
+            manifest.save()
+            print(f"♻️  Incremental: {manifest.hits} cached results reused, {manifest.misses} recomputed")
+        
         # Print comprehensive summary
         print(f"\n✅ Complete website analysis finished!")
         print(f"📄 Results saved to: {output_filename}")
@@ -1188,8 +1222,9 @@ def complete_website_analysis(directory_path=".", output_filename="complete_webs
 
 # Example usage
 if __name__ == "__main__":
-    # Run complete website analysis
-    results = complete_website_analysis(".", "my_complete_website_analysis.json")
+    # Run complete website analysis (ANALYSIS_INCREMENTAL=1 re-analyzes only changed files)
+    incremental = os.environ.get("ANALYSIS_INCREMENTAL", "0").lower() in ("1", "true", "yes")
+    results = complete_website_analysis(".", "my_complete_website_analysis.json", incremental=incremental)
     
     # You can also specify custom directory and filename
     # results = complete_website_analysis("/path/to/your/website", "custom_analysis.json")
@@ -0,0 +1,420 @@
+"""
+Disk space owned by the analysis backend.
+
+Scratch: every request gets its own directory (screenshots, uploads,
+segments) that is removed when the request ends, whether it succeeded or
+not. Directories left behind by a crashed process are removed by the sweeper
+once they are older than ARTIFACT_SCRATCH_TTL_HOURS.
+
+Published artifacts (annotated/page images, tile caches) are content
+addressed - a file's name is the hash of what it holds, so identical images
+are stored once. Each ArtifactStore bounds one directory by age and total
+size: files not used for ARTIFACT_TTL_HOURS are removed, and while the
+directory is over its quota the least recently used files go first. "Used"
+is the file mtime, which `touch` bumps when an existing artifact is reused
+or served. Files younger than ARTIFACT_MIN_AGE_SECONDS are never removed, so
+URLs in a response that was just sent stay valid.
+
+A daemon thread sweeps every registered store (and the scratch root) each
+ARTIFACT_SWEEP_SECONDS; the API starts it in its lifespan.
+
+Published images are served by the API itself at /artifacts/<name> (see
+`open_artifact`): names are content hashes, so the hash is a strong ETag and
+responses are immutable. Small files are kept in an in-memory LRU.
+
+Only the standard library is used so the API can import it without the
+vision stack.
+
+Environment:
+    ARTIFACT_DIR                 published images (default <tmp>/analysis_artifacts)
+    ARTIFACT_URL_PREFIX          URL path they are served under (default /artifacts)
+    ARTIFACT_MEMORY_MB           in-memory cache of hot artifacts (default 64)
+    ARTIFACT_MEMORY_MAX_FILE_KB  larger files are streamed from disk (default 2048)
+    ARTIFACT_MAX_MB              size quota of ARTIFACT_DIR (default 1024; 0 = no quota)
+    ARTIFACT_TTL_HOURS           unused artifacts expire after this (default 72; 0 = never)
+    ARTIFACT_MIN_AGE_SECONDS     grace period for new files (default 300)
+    ARTIFACT_SWEEP_SECONDS       sweeper interval (default 300; 0 disables the thread)
+    ARTIFACT_SCRATCH_DIR         per-request scratch root (default <tmp>/analysis_scratch)
+    ARTIFACT_SCRATCH_TTL_HOURS   leftover scratch dirs are removed after this (default 6)
+"""
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, NamedTuple, Optional
+
+from log_config import get_logger
+from metrics import CACHE_HITS_TOTAL, CACHE_MISSES_TOTAL
+
+logger = get_logger("artifacts")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PUBLISHED_DIR = os.environ.get("ARTIFACT_DIR") or os.path.join(tempfile.gettempdir(), "analysis_artifacts")
+URL_PREFIX = os.environ.get("ARTIFACT_URL_PREFIX", "/artifacts").rstrip("/")
+MEMORY_BYTES = int(float(os.environ.get("ARTIFACT_MEMORY_MB", 64)) * 1024 * 1024)
+MEMORY_MAX_FILE_BYTES = int(float(os.environ.get("ARTIFACT_MEMORY_MAX_FILE_KB", 2048)) * 1024)
+MAX_BYTES = int(float(os.environ.get("ARTIFACT_MAX_MB", 1024)) * 1024 * 1024)
+TTL_SECONDS = float(os.environ.get("ARTIFACT_TTL_HOURS", 72)) * 3600
+MIN_AGE_SECONDS = float(os.environ.get("ARTIFACT_MIN_AGE_SECONDS", 300))
+SWEEP_SECONDS = float(os.environ.get("ARTIFACT_SWEEP_SECONDS", 300))
+SCRATCH_DIR = os.environ.get("ARTIFACT_SCRATCH_DIR") or os.path.join(tempfile.gettempdir(), "analysis_scratch")
+SCRATCH_TTL_SECONDS = float(os.environ.get("ARTIFACT_SCRATCH_TTL_HOURS", 6)) * 3600
+
+# Partially written files (write_atomic temp names) count as stale after this
+PARTIAL_PREFIX = ".encoding_"
+_PARTIAL_TTL_SECONDS = 3600
+# Evict down to this share of the quota so a full store is not swept on every write
+_LOW_WATERMARK = 0.9
+# Reuse within this many seconds does not bump the mtime again
+_TOUCH_RESOLUTION = 60
+
+
+# ---------------- Scratch space ----------------
+def new_scratch_dir(prefix: str = "analysis_") -> str:
+    os.makedirs(SCRATCH_DIR, exist_ok=True)
+    return tempfile.mkdtemp(prefix=prefix, dir=SCRATCH_DIR)
+
+
+def remove_scratch_dir(path: Optional[str]) -> None:
+    if not path:
+        return
+    try:
+        shutil.rmtree(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        # The sweeper gets it later
+        logger.warning("Failed to remove scratch dir: %s", e, extra={"fields": {"path": path}})
+
+
+@contextmanager
+def scratch_dir(prefix: str = "analysis_"):
+    """Per-request working directory, removed on exit"""
+    path = new_scratch_dir(prefix)
+    try:
+        yield path
+    finally:
+        remove_scratch_dir(path)
+
+
+def sweep_scratch(now: Optional[float] = None) -> int:
+    """Remove scratch dirs older than the scratch TTL; returns how many"""
+    if not os.path.isdir(SCRATCH_DIR):
+        return 0
+    now = now or time.time()
+    removed = 0
+    with os.scandir(SCRATCH_DIR) as entries:
+        for entry in entries:
+            try:
+                if now - entry.stat(follow_symlinks=False).st_mtime < SCRATCH_TTL_SECONDS:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.unlink(entry.path)
+                removed += 1
+            except OSError:
+                continue
+    return removed
+
+
+# ---------------- Published artifacts ----------------
+class ByteLRU:
+    """
+    OrderedDict LRU bounded by the summed size of its values. A value's size
+    is taken when it is put; put it again after it grows to re-account it.
+    """
+
+    def __init__(self, max_bytes: int, size=len):
+        self.max_bytes = max_bytes
+        self._size = size
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            self._items.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        size = self._size(value)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._items:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._items.pop(key, None)
+            if entry is None:
+                return None
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Write `data` to `path` via a temp file in the same directory, so readers never see a partial file"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=PARTIAL_PREFIX)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600; static servers must read it
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SweepResult(NamedTuple):
+    files: int
+    bytes: int
+    expired: int
+    evicted: int
+    freed_bytes: int
+
+
+class ArtifactStore:
+    """One content-addressed directory (recursive) bounded by TTL and size quota"""
+
+    def __init__(self, root: str, max_bytes: int = MAX_BYTES, ttl_seconds: float = TTL_SECONDS,
+                 min_age_seconds: float = MIN_AGE_SECONDS, name: str = "published"):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.min_age_seconds = min_age_seconds
+        self.name = name
+        self._touched = {}
+        self._lock = threading.Lock()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def touch(self, path: str) -> None:
+        """Mark an existing artifact as used (it moves to the back of the eviction order)"""
+        now = time.time()
+        with self._lock:
+            if now - self._touched.get(path, 0) < _TOUCH_RESOLUTION:
+                return
+            self._touched[path] = now
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+    def _files(self):
+        stack = [self.root]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        yield entry.path, entry.name, st.st_size, st.st_mtime
+                except OSError:
+                    continue
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.unlink(path)
+        except OSError:
+            return False
+        with self._lock:
+            self._touched.pop(path, None)
+        _hot.pop(os.path.basename(path))
+        return True
+
+    def sweep(self, now: Optional[float] = None) -> SweepResult:
+        now = now or time.time()
+        kept = []
+        total = expired = freed = 0
+        for path, name, size, mtime in self._files():
+            age = now - mtime
+            if name.startswith(PARTIAL_PREFIX):
+                if age > _PARTIAL_TTL_SECONDS and self._remove(path):
+                    freed += size
+                continue
+            if self.ttl_seconds and age > max(self.ttl_seconds, self.min_age_seconds):
+                if self._remove(path):
+                    expired += 1
+                    freed += size
+                continue
+            kept.append((mtime, size, path))
+            total += size
+
+        evicted = 0
+        if self.max_bytes and total > self.max_bytes:
+            target = self.max_bytes * _LOW_WATERMARK
+            kept.sort()  # least recently used first
+            for mtime, size, path in kept:
+                if total <= target:
+                    break
+                if now - mtime < self.min_age_seconds:
+                    break  # everything after this is newer still
+                if self._remove(path):
+                    total -= size
+                    freed += size
+                    evicted += 1
+            if total > self.max_bytes:
+                logger.warning("Artifact store over quota with only recent files",
+                               extra={"fields": {"store": self.name, "bytes": total, "max_bytes": self.max_bytes}})
+
+        self._prune_empty_dirs()
+        return SweepResult(len(kept) - evicted, total, expired, evicted, freed)
+
+    def _prune_empty_dirs(self):
+        for dirpath, dirnames, filenames in os.walk(self.root, topdown=False):
+            if dirpath != self.root and not dirnames and not filenames:
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass
+
+
+published = ArtifactStore(PUBLISHED_DIR)
+
+_stores: List[ArtifactStore] = [published]
+_stores_lock = threading.Lock()
+
+
+def register(store: ArtifactStore) -> ArtifactStore:
+    """Add a store to the background sweep"""
+    with _stores_lock:
+        if all(s.root != store.root for s in _stores):
+            _stores.append(store)
+    return store
+
+
+def sweep_all() -> dict:
+    with _stores_lock:
+        stores = list(_stores)
+    results = {}
+    for store in stores:
+        result = results[store.name] = store.sweep()
+        if result.expired or result.evicted:
+            logger.info("Swept artifacts", extra={"fields": {"store": store.name, **result._asdict()}})
+    scratch = sweep_scratch()
+    if scratch:
+        logger.info("Removed stale scratch dirs", extra={"fields": {"count": scratch}})
+    return results
+
+
+class Sweeper:
+    """Daemon thread running sweep_all every `interval` seconds"""
+
+    def __init__(self, interval: float = SWEEP_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name="artifact-sweeper", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                sweep_all()
+            except Exception as e:
+                logger.error("Artifact sweep failed: %s", e, exc_info=e)
+            if self._stop.wait(self.interval):
+                return
+
+    def stop(self, timeout: Optional[float] = 5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+# ---------------- Serving ----------------
+MEDIA_TYPES = {
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+    ".jpg": "image/jpeg",
+    ".png": "image/png",
+}
+_NAME_RE = re.compile(r"^([0-9a-f]{16,64})(\.[a-z]+)$")
+
+
+class ArtifactNotFound(LookupError):
+    pass
+
+
+class Artifact(NamedTuple):
+    """A published file; `data` is set when it came from (or went into) the memory cache"""
+    name: str
+    path: str
+    size: int
+    media_type: str
+    etag: str
+    data: Optional[bytes]
+
+
+_hot = ByteLRU(MEMORY_BYTES, size=lambda artifact: artifact.size)
+
+
+def url_for(name: str) -> str:
+    return f"{URL_PREFIX}/{name}"
+
+
+def open_artifact(name: str, store: ArtifactStore = None) -> Artifact:
+    """Look up a published artifact by file name; raises ArtifactNotFound"""
+    store = store or published
+    match = _NAME_RE.match(name)
+    if match is None or match.group(2) not in MEDIA_TYPES:
+        raise ArtifactNotFound(name)
+    artifact = _hot.get(name)
+    if artifact is not None:
+        CACHE_HITS_TOTAL.inc(cache="artifact_memory")
+        store.touch(artifact.path)
+        return artifact
+
+    CACHE_MISSES_TOTAL.inc(cache="artifact_memory")
+    path = store.path(name)
+    try:
+        size = os.stat(path).st_size
+    except OSError:
+        raise ArtifactNotFound(name)
+    store.touch(path)
+    artifact = Artifact(name, path, size, MEDIA_TYPES[match.group(2)], f'"{match.group(1)}"', None)
+    if size <= MEMORY_MAX_FILE_BYTES:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            raise ArtifactNotFound(name)
+        artifact = artifact._replace(size=len(data), data=data)
+        _hot.put(name, artifact)
+    return artifact
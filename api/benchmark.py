@@ -0,0 +1,521 @@
+"""
+Reproducible benchmarks for the contrast and code analysis pipelines.
+
+Generates synthetic screenshots and HTML/JS/CSS corpora from a fixed seed,
+times each stage, and writes JSON that can be compared against a previous run.
+When the EAST model file is missing a stub net with the same output shapes is
+used so the suite runs offline.
+
+Usage:
+    python benchmark.py --output bench.json
+    python benchmark.py --suite code --sizes small,large --baseline bench.json
+    python benchmark.py --suite code --sizes small --bundle-mb 5
+    python benchmark.py --suite inference --east-variants "int8=onnxruntime:east_int8.onnx"
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import metrics
+
+SIZES = {
+    # name: (screenshot height px, text rows per 1000px, corpus scale)
+    "small": (1080, 12, 50),
+    "medium": (4320, 24, 500),
+    "large": (12960, 36, 5000),
+}
+
+COLOR_PAIRS = [
+    # (name, foreground BGR, background BGR)
+    ("black_on_white", (0, 0, 0), (255, 255, 255)),
+    ("grey_on_white", (170, 170, 170), (255, 255, 255)),
+    ("white_on_blue", (255, 255, 255), (160, 60, 20)),
+    ("yellow_on_white", (0, 220, 240), (255, 255, 255)),
+]
+
+
+# ---------------- Stub EAST net ----------------
+class StubEASTNet:
+    """
+    Stand-in for cv2.dnn.Net that mimics EAST's outputs.
+
+    Scores are high in 4x4 cells with strong local contrast, geometry is a fixed
+    box around each cell, so decode/NMS see a realistic number of candidates.
+    """
+
+    def __init__(self):
+        self._blob = None
+
+    def setInput(self, blob):
+        self._blob = blob
+
+    def forward(self, layer_names=None):
+        import numpy as np
+        blob = self._blob
+        _, _, H, W = blob.shape
+        rows, cols = H // 4, W // 4
+        gray = blob[0].mean(axis=0)[: rows * 4, : cols * 4]
+        cells = gray.reshape(rows, 4, cols, 4)
+        spread = cells.max(axis=(1, 3)) - cells.min(axis=(1, 3))
+        scores = np.clip(spread / 128.0, 0.0, 1.0).astype(np.float32)[None, None]
+        geometry = np.zeros((1, 5, rows, cols), dtype=np.float32)
+        geometry[0, 0] = 6.0   # top
+        geometry[0, 1] = 12.0  # right
+        geometry[0, 2] = 6.0   # bottom
+        geometry[0, 3] = 12.0  # left
+        return scores, geometry
+
+
+def load_net(east_path):
+    if east_path and os.path.exists(east_path):
+        import contrast_detection
+        return contrast_detection.load_east(east_path), "east"
+    return StubEASTNet(), "stub"
+
+
+# ---------------- Synthetic inputs ----------------
+def make_screenshot(height, rows_per_1000, fg, bg, width=1280, seed=0):
+    """Page-like BGR image with lines of pseudo-text in `fg` on `bg`."""
+    import cv2
+    import numpy as np
+    rng = random.Random(seed)
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[:] = bg
+    n_rows = max(1, int(height / 1000.0 * rows_per_1000))
+    step = height / float(n_rows)
+    for i in range(n_rows):
+        y = int(i * step + step / 2)
+        x = rng.randint(20, 200)
+        words = " ".join("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9)))
+                         for _ in range(rng.randint(3, 12)))
+        scale = rng.choice([0.5, 0.7, 1.0, 1.4])
+        cv2.putText(img, words, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, fg, 1 if scale < 1 else 2, cv2.LINE_AA)
+    return img
+
+
+def make_html(scale, seed=0):
+    rng = random.Random(seed)
+    parts = ["<!DOCTYPE html>", "<html>", "<head><title>Bench</title></head>", "<body>"]
+    for i in range(scale):
+        kind = rng.randrange(6)
+        if kind == 0:
+            parts.append(f'<button class="b{i}">Click {i}</button>')
+        elif kind == 1:
+            parts.append(f'<a href="/p/{i}" aria-label="Page {i}">Page {i}</a>')
+        elif kind == 2:
+            alt = f' alt="img {i}"' if rng.random() < 0.5 else ""
+            parts.append(f'<img src="/img/{i}.png"{alt}>')
+        elif kind == 3:
+            parts.append(f'<ul><li>Item {i}</li><div>bad {i}</div></ul>')
+        elif kind == 4:
+            parts.append(f'<p>Text <span>{i}</span> <div>block in p</div></p>')
+        else:
+            parts.append(f'<div><input type="text" name="f{i}"><select><option>{i}</option></select></div>')
+    parts += ["</body>", "</html>"]
+    return "\n".join(parts)
+
+
+def make_js(scale, seed=0):
+    rng = random.Random(seed)
+    parts = []
+    for i in range(scale):
+        kind = rng.randrange(5)
+        if kind == 0:
+            parts.append(f"function f{i}(a, b) {{\n  if (a) {{\n    return [a, b].map(x => ({{ v: x }}));\n  }}\n  return null;\n}}")
+        elif kind == 1:
+            parts.append(f"const s{i} = 'brace {{ in string' + \"(paren\" + `tpl ${{a{i}}} }}`;")
+        elif kind == 2:
+            parts.append(f"// comment with {{ braces }}\nconst r{i} = /[{{}}]+/g.test(x{i});")
+        elif kind == 3:
+            parts.append(f"const img{i} = document.createElement('img');\nimg{i}.src = '/i/{i}.png';")
+        else:
+            parts.append(f"el{i}.innerHTML = '<div><img src=\"/i/{i}.png\"></div>';")
+    return "\n".join(parts)
+
+
+def make_bundle(target_bytes, seed=0):
+    """Minified single-line bundle of about `target_bytes`, heavy on long string literals."""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    i = 0
+    while size < target_bytes:
+        kind = rng.randrange(8)
+        filler = "x" * rng.randrange(200, 2000)
+        if kind == 0:
+            part = f"var n{i}=document.createElement(\"img\");n{i}.src=u{i};n{i}.setAttribute(\"alt\",t{i});"
+        elif kind == 1:
+            part = f"e{i}.innerHTML='<div class=\"{filler}\"><span>'+v{i}+'</span></div>';"
+        elif kind == 2:
+            part = f"e{i}.innerHTML=\"<p>{filler}</p><img src='/i/{i}.png'>\";"
+        elif kind == 3:
+            part = f"e{i}.insertAdjacentHTML(\"beforeend\",\"<li>{filler}\"+f(a{i},b{i})+\"</li>\");"
+        elif kind == 4:
+            part = f"var m{i}=new Image;m{i}.src=\"/i/{i}.png\";"
+        elif kind == 5:
+            part = f"function f{i}(a,b){{return a.map(function(c){{return c+b*{i}}}).filter(Boolean)}}"
+        elif kind == 6:
+            part = f"var s{i}={{k:\"{filler}\",j:'{filler[:100]}',h:`${{a{i}}}{filler[:50]}`}};"
+        else:
+            part = f"o{i}.innerHTML=h{i};o{i}.title=\"{filler[:300]}\";"
+        parts.append(part)
+        size += len(part)
+        i += 1
+    return "".join(parts)
+
+
+def make_css(scale, seed=0):
+    rng = random.Random(seed)
+    parts = []
+    for i in range(scale):
+        kind = rng.randrange(4)
+        if kind == 0:
+            parts.append(f".c{i} {{ color: #{rng.randrange(0xffffff):06x}; margin: {i % 20}px; }}")
+        elif kind == 1:
+            parts.append(f"@media (max-width: {600 + i % 400}px) {{\n  .c{i} {{ display: none; }}\n}}")
+        elif kind == 2:
+            parts.append(f"/* {{ comment }} */\n.c{i}::after {{ content: \"{{\"; }}")
+        else:
+            parts.append(f".p{i} {{\n  color: red;\n  .child{i} {{ color: blue; }}\n}}")
+    return "\n".join(parts)
+
+
+def write_corpus(directory, scale, seed=0):
+    """Write index.html/app.js/styles.css of the given scale; returns their paths."""
+    paths = {}
+    for name, content in (("index.html", make_html(scale, seed)),
+                          ("app.js", make_js(scale, seed)),
+                          ("styles.css", make_css(scale, seed))):
+        path = os.path.join(directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        paths[name] = path
+    return paths
+
+
+# ---------------- Timing ----------------
+class _StageCollector:
+    def __init__(self):
+        self.samples = {}
+
+    def __call__(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def reset(self):
+        self.samples = {}
+
+
+def _summarize(samples):
+    return {
+        "runs": len(samples),
+        "min_s": round(min(samples), 6),
+        "median_s": round(statistics.median(samples), 6),
+        "mean_s": round(statistics.fmean(samples), 6),
+        "max_s": round(max(samples), 6),
+    }
+
+
+def time_case(func, repeat, warmup=1):
+    """Run `func` warmup+repeat times; returns (timing summary, sub-stage summaries, last result)."""
+    collector = _StageCollector()
+    result = None
+    for _ in range(warmup):
+        result = func()
+    metrics.add_stage_hook(collector)
+    try:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            samples.append(time.perf_counter() - start)
+    finally:
+        metrics.remove_stage_hook(collector)
+    stages = {stage: _summarize(values) for stage, values in sorted(collector.samples.items())}
+    return _summarize(samples), stages, result
+
+
+# ---------------- Suites ----------------
+def run_contrast_suite(sizes, repeat, east_path, seed):
+    import contrast_detection
+
+    net, net_kind = load_net(east_path)
+    cases = {}
+    for size in sizes:
+        height, density, _ = SIZES[size]
+        for pair_name, fg, bg in COLOR_PAIRS:
+            img = make_screenshot(height, density, fg, bg, seed=seed)
+            params = {"size": size, "height": height, "text_rows_per_1000px": density, "colors": pair_name}
+
+            def detect():
+                boxes = []
+                for (y0, _y1, sub) in contrast_detection.split_vertical_slices(img):
+                    for (sx, sy, ex, ey) in contrast_detection.detect_text_regions(sub, net):
+                        boxes.append((sx, sy + y0, ex, ey + y0))
+                return boxes
+
+            timing, stages, boxes = time_case(detect, repeat)
+            cases[f"detect_text_regions/{size}/{pair_name}"] = {
+                "stage": "detect_text_regions", "params": params, "timing": timing,
+                "substages": stages, "output": {"boxes": len(boxes)},
+            }
+
+            timing, stages, (_, issues) = time_case(lambda: contrast_detection.annotate_contrast(img, boxes), repeat)
+            cases[f"annotate_contrast/{size}/{pair_name}"] = {
+                "stage": "annotate_contrast", "params": params, "timing": timing,
+                "substages": stages, "output": {"issues": len(issues)},
+            }
+    return cases, {"east": net_kind}
+
+
+def _iou(a, b):
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_boxes(reference, boxes, iou=0.5):
+    """Greedy one-to-one matching; returns (recall, precision) of `boxes` against `reference`"""
+    unmatched = list(boxes)
+    matched = 0
+    for ref in reference:
+        best = max(unmatched, key=lambda box: _iou(ref, box), default=None)
+        if best is not None and _iou(ref, best) >= iou:
+            unmatched.remove(best)
+            matched += 1
+    recall = matched / len(reference) if reference else 1.0
+    precision = matched / len(boxes) if boxes else 1.0
+    return round(recall, 4), round(precision, 4)
+
+
+def run_inference_suite(sizes, repeat, east_path, variants, seed, min_recall=0.95):
+    """Latency and box agreement of EAST variants against the FP32 OpenCV path on the same screenshots"""
+    import cv2
+    import contrast_detection
+    import inference
+
+    if not (east_path and os.path.exists(east_path)):
+        # Agreement with a stub net means nothing, so there is no offline fallback here
+        return {}, {"east_variants": {"fp32": {"skipped": f"missing model {east_path}"}}}
+    nets = {"fp32": inference.load(east_path, "opencv", "default", "cpu")}
+    summary = {"fp32": {"engine": nets["fp32"].name, "path": east_path}}
+    for variant in inference.parse_variants(variants):
+        if not os.path.exists(variant.path):
+            summary[variant.name] = {"skipped": f"missing model {variant.path}"}
+            continue
+        try:
+            nets[variant.name] = variant.load()
+        except ImportError as e:
+            summary[variant.name] = {"skipped": f"missing dependency: {e.name or e}"}
+            continue
+        except (ValueError, cv2.error) as e:
+            summary[variant.name] = {"skipped": f"{type(e).__name__}: {e}"}
+            continue
+        summary[variant.name] = {"engine": nets[variant.name].name, "path": variant.path}
+
+    images = []
+    for size in sizes:
+        height, density, _ = SIZES[size]
+        for pair_name, fg, bg in COLOR_PAIRS:
+            images.append((size, pair_name, make_screenshot(height, density, fg, bg, seed=seed)))
+
+    def detector(net, img):
+        def detect():
+            boxes = []
+            for (y0, _y1, sub) in contrast_detection.split_vertical_slices(img):
+                for (sx, sy, ex, ey) in contrast_detection.detect_text_regions(sub, net):
+                    boxes.append((sx, sy + y0, ex, ey + y0))
+            return boxes
+        return detect
+
+    cases = {}
+    reference = {}
+    for name, net in nets.items():  # fp32 first
+        forward_s = []
+        recalls = []
+        precisions = []
+        for size, pair_name, img in images:
+            timing, stages, boxes = time_case(detector(net, img), repeat)
+            key = (size, pair_name)
+            if name == "fp32":
+                reference[key] = boxes
+            recall, precision = match_boxes(reference[key], boxes)
+            recalls.append(recall)
+            precisions.append(precision)
+            forward_s.append(stages.get("east_forward", timing)["median_s"])
+            cases[f"east_inference/{name}/{size}/{pair_name}"] = {
+                "stage": "east_inference", "params": {"variant": name, "size": size, "colors": pair_name},
+                "timing": timing, "substages": stages,
+                "output": {"boxes": len(boxes), "recall": recall, "precision": precision},
+            }
+        entry = summary[name]
+        entry["east_forward_median_s"] = round(statistics.median(forward_s), 6)
+        entry["min_recall"] = min(recalls)
+        entry["mean_precision"] = round(statistics.fmean(precisions), 4)
+        entry["recall_ok"] = entry["min_recall"] >= min_recall
+    base = summary["fp32"]["east_forward_median_s"]
+    for name in nets:
+        forward = summary[name]["east_forward_median_s"]
+        summary[name]["speedup"] = round(base / forward, 2) if forward > 0 else None
+    return cases, {"east_variants": summary, "east_min_recall": min_recall}
+
+
+def run_code_suite(sizes, repeat, seed, bundle_mb=5.0):
+    import code_analyzer
+
+    cases = {}
+    if bundle_mb > 0:
+        bundle = make_bundle(int(bundle_mb * 1024 * 1024), seed)
+
+        def alt_bundle():
+            analyzer = code_analyzer.ImageAltAnalyzer()
+            analyzer.analyze_js_content(bundle, "bundle.min.js")
+            return analyzer.total_images, analyzer.images_without_alt
+
+        timing, _stages, (found, missing) = time_case(alt_bundle, repeat)
+        cases[f"alt_text_js/bundle_{bundle_mb:g}mb"] = {
+            "stage": "alt_text_js", "params": {"bytes": len(bundle)}, "timing": timing,
+            "output": {"images": found, "findings": missing},
+        }
+
+    with tempfile.TemporaryDirectory(prefix="bench_code_") as work_dir:
+        for size in sizes:
+            scale = SIZES[size][2]
+            size_dir = os.path.join(work_dir, size)
+            os.makedirs(size_dir)
+            paths = write_corpus(size_dir, scale, seed)
+            params = {"size": size, "scale": scale}
+
+            with open(paths["index.html"], encoding="utf-8") as f:
+                html_content = f.read()
+            with open(paths["app.js"], encoding="utf-8") as f:
+                js_content = f.read()
+
+            def alt_html():
+                analyzer = code_analyzer.ImageAltAnalyzer()
+                analyzer.analyze_html_content(html_content, "index.html")
+                return analyzer.images_without_alt
+
+            def alt_js():
+                analyzer = code_analyzer.ImageAltAnalyzer()
+                analyzer.analyze_js_content(js_content, "app.js")
+                return analyzer.images_without_alt
+
+            checks = [
+                ("check_aria_labels", lambda: code_analyzer.check_aria_labels(paths["index.html"])[1]),
+                ("check_html_nesting", lambda: len(code_analyzer.check_html_nesting(paths["index.html"]))),
+                ("check_css_nesting", lambda: len(code_analyzer.check_css_nesting(paths["styles.css"]))),
+                ("check_js_nesting", lambda: len(code_analyzer.check_js_nesting(paths["app.js"]))),
+                ("alt_text_html", alt_html),
+                ("alt_text_js", alt_js),
+            ]
+            for stage, func in checks:
+                timing, _stages, found = time_case(func, repeat)
+                cases[f"{stage}/{size}"] = {
+                    "stage": stage, "params": params, "timing": timing,
+                    "output": {"findings": found},
+                }
+    return cases, {}
+
+
+SUITES = {
+    "contrast": lambda args, sizes: run_contrast_suite(sizes, args.repeat, args.east, args.seed),
+    "code": lambda args, sizes: run_code_suite(sizes, args.repeat, args.seed, args.bundle_mb),
+    "inference": lambda args, sizes: run_inference_suite(sizes, args.repeat, args.east, args.east_variants, args.seed,
+                                                         args.min_recall),
+}
+
+
+# ---------------- Baseline comparison ----------------
+def compare(current, baseline, tolerance):
+    """Return list of (case, baseline_median, current_median, ratio) slower than 1 + tolerance."""
+    regressions = []
+    for name, case in current.get("cases", {}).items():
+        base = baseline.get("cases", {}).get(name)
+        if not base or "timing" not in base or "timing" not in case:
+            continue
+        before = base["timing"]["median_s"]
+        after = case["timing"]["median_s"]
+        if before > 0 and after / before > 1.0 + tolerance:
+            regressions.append((name, before, after, after / before))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the contrast and code analysis pipelines")
+    parser.add_argument("--suite", default="contrast,code", help="Comma-separated suites: contrast, code, inference")
+    parser.add_argument("--sizes", default="small,medium", help=f"Comma-separated sizes: {', '.join(SIZES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (default 5)")
+    parser.add_argument("--seed", type=int, default=1234, help="Seed for synthetic inputs")
+    parser.add_argument("--bundle-mb", type=float, default=5.0,
+                        help="Size of the minified bundle for the alt_text_js case (0 disables)")
+    parser.add_argument("--east", default="frozen_east_text_detection.pb",
+                        help="EAST model path; a stub net is used when it does not exist")
+    parser.add_argument("--east-variants", default="", metavar="SPECS",
+                        help="inference suite: name=backend[/dnn_backend/dnn_target]:path,... compared against --east as FP32")
+    parser.add_argument("--min-recall", type=float, default=0.95,
+                        help="inference suite: box recall vs FP32 a variant must keep on every case (default 0.95)")
+    parser.add_argument("--output", metavar="FILE", help="Write JSON results to FILE (default stdout)")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against a previous JSON result")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed median slowdown vs baseline before failing (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "sizes": sizes,
+        },
+        "cases": {},
+        "skipped": {},
+    }
+    for suite in [s for s in args.suite.split(",") if s]:
+        if suite not in SUITES:
+            parser.error(f"unknown suite: {suite}")
+        try:
+            cases, meta = SUITES[suite](args, sizes)
+        except ImportError as e:
+            report["skipped"][suite] = f"missing dependency: {e.name or e}"
+            continue
+        report["cases"].update(cases)
+        report["meta"].update(meta)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Benchmark results saved to {args.output}")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.2f}ms -> {after * 1000:.2f}ms ({ratio:.2f}x)", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
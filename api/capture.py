@@ -0,0 +1,548 @@
+"""
+Page capture with Playwright.
+
+`capture_screenshot` takes one full_page screenshot: Chromium rasterizes the
+whole page into a single bitmap before anything else can start, which runs
+out of memory or time on very long pages.
+
+`capture_clips` captures the page progressively instead, one clip of
+`clip_height` pixels at a time from the top, yielding each clip's PNG as soon
+as it is taken. Memory stays bounded by the clip size and the caller can
+analyze the first clips while the rest of the page is still being captured.
+The page height is re-read after every clip, so content that lazy-loads as
+the page scrolls is picked up.
+
+Both load the page through a capture profile (CAPTURE_PROFILE), which uses
+Playwright routing to abort requests by resource type and host, and decides
+how long to wait before capturing:
+
+    full     nothing blocked; wait for the load event (the old behaviour)
+    fast     block media, sockets and known ad/analytics hosts; wait for
+             DOMContentLoaded, then up to 2.5s for the network to go idle
+    lean     fast, plus images and web fonts; 250ms settle time instead of
+             the idle wait (text contrast against plain backgrounds only)
+
+Pass a dict as `report` to get what was requested and blocked, and how the
+wait went.
+
+Snapshots (CAPTURE_SNAPSHOT) make captures repeatable without the network:
+
+    off      always load from the network
+    record   load from the network and save every response to a HAR archive
+    replay   serve the page from its archive only; requests that were not
+             recorded are aborted, so nothing leaves the machine
+    auto     replay when an archive exists, otherwise record one
+
+Archives are keyed by URL and the profile's blocking rules (a page recorded
+through lean has no images to replay through full). They are kept in
+CAPTURE_SNAPSHOT_DIR. The default temp directory is bounded by the artifacts
+sweeper (CAPTURE_SNAPSHOT_MAX_MB, CAPTURE_SNAPSHOT_TTL_HOURS); a directory set
+explicitly is never swept, so it can be a checked-in set of fixtures for
+replaying pages in CI without network access.
+
+Captures that do not use a snapshot share Chromium's on-disk HTTP cache
+(CAPTURE_HTTP_CACHE_DIR), so the fonts, CSS, bundles and images of a site
+are downloaded once per audit rather than once per page. Chromium's cache is
+single-writer, so the directory is split into CAPTURE_HTTP_CACHE_SLOTS slots,
+each locked by one browser at a time and capped (Chromium evicts within the
+cap) at CAPTURE_HTTP_CACHE_MB / slots; a capture that finds every slot busy
+runs uncached. The browser profile itself is still a fresh scratch directory
+per capture, so cookies and storage never carry over.
+
+Playwright routing disables the HTTP cache, so cached captures block
+differently: hosts through Chromium's resolver (--host-resolver-rules), and
+resource types through DevTools URL patterns on the path's file extension
+(an approximation: extensionless media is not blocked, nor are eventsource
+requests).
+
+Strategies (CAPTURE_STRATEGY):
+    clip     screenshot(clip=...) in page coordinates; the window is scrolled
+             to the clip first so scroll-triggered content loads
+    scroll   scroll the window and take viewport screenshots; cheapest for
+             Chromium, but sticky headers appear in every clip
+
+Environment:
+    CAPTURE_PROFILE          full, fast or lean (default fast)
+    CAPTURE_BLOCK_TYPES      override the profile's blocked resource types (comma-separated)
+    CAPTURE_BLOCK_HOSTS      extra blocked hosts; "example.com" covers its subdomains, globs allowed
+    CAPTURE_WAIT_UNTIL       override: commit, domcontentloaded, load or networkidle
+    CAPTURE_NETWORK_IDLE_MS  override: network-idle budget after navigation (0 = don't wait)
+    CAPTURE_SETTLE_MS        override: fixed wait before capturing
+    CAPTURE_SNAPSHOT         off, record, replay or auto (default off)
+    CAPTURE_SNAPSHOT_DIR     HAR archives (default <tmp>/analysis_snapshots)
+    CAPTURE_SNAPSHOT_MAX_MB  quota of the default archive directory (default 1024; 0 = no quota)
+    CAPTURE_SNAPSHOT_TTL_HOURS  unused archives in the default directory expire after this (default 0 = never)
+    CAPTURE_HTTP_CACHE_DIR   shared browser HTTP cache (default <tmp>/analysis_browser_cache; empty disables)
+    CAPTURE_HTTP_CACHE_MB    total size cap of the cache (default 512)
+    CAPTURE_HTTP_CACHE_SLOTS browsers that can use the cache at once (default 2)
+    CAPTURE_MODE             full or progressive (default full)
+    CAPTURE_STRATEGY         clip or scroll (default clip)
+    CAPTURE_VIEWPORT_WIDTH   viewport width in px (default 1280)
+    CAPTURE_MAX_HEIGHT       stop capturing below this many px (default 50000)
+    CAPTURE_TIMEOUT_MS       navigation timeout (default 30000)
+"""
+import fnmatch
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import FrozenSet, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import artifacts
+from metrics import CACHE_HITS_TOTAL, CACHE_MISSES_TOTAL, stage_timer, timed
+
+try:
+    import fcntl
+except ImportError:  # Windows: cache slots are only exclusive within this process
+    fcntl = None
+
+CAPTURE_MODE = os.environ.get("CAPTURE_MODE", "full").strip().lower()
+CAPTURE_STRATEGY = os.environ.get("CAPTURE_STRATEGY", "clip").strip().lower()
+VIEWPORT_WIDTH = int(os.environ.get("CAPTURE_VIEWPORT_WIDTH", 1280))
+MAX_HEIGHT = int(os.environ.get("CAPTURE_MAX_HEIGHT", 50000))
+TIMEOUT_MS = int(os.environ.get("CAPTURE_TIMEOUT_MS", 30000))
+SNAPSHOT_MODE = os.environ.get("CAPTURE_SNAPSHOT", "off").strip().lower()
+SNAPSHOT_DIR = os.environ.get("CAPTURE_SNAPSHOT_DIR") or os.path.join(tempfile.gettempdir(), "analysis_snapshots")
+SNAPSHOT_MAX_BYTES = int(float(os.environ.get("CAPTURE_SNAPSHOT_MAX_MB", 1024)) * 1024 * 1024)
+SNAPSHOT_TTL_SECONDS = float(os.environ.get("CAPTURE_SNAPSHOT_TTL_HOURS", 0)) * 3600
+
+HTTP_CACHE_DIR = os.environ.get("CAPTURE_HTTP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "analysis_browser_cache"))
+HTTP_CACHE_BYTES = int(float(os.environ.get("CAPTURE_HTTP_CACHE_MB", 512)) * 1024 * 1024)
+HTTP_CACHE_SLOTS = int(os.environ.get("CAPTURE_HTTP_CACHE_SLOTS", 2))
+
+SNAPSHOT_MODES = ("off", "record", "replay", "auto")
+
+# Only the default directory is ours to evict from; an explicit one may hold fixtures
+_snapshot_store = None if os.environ.get("CAPTURE_SNAPSHOT_DIR") else artifacts.register(
+    artifacts.ArtifactStore(SNAPSHOT_DIR, SNAPSHOT_MAX_BYTES, SNAPSHOT_TTL_SECONDS, name="snapshots")
+)
+
+_PAGE_HEIGHT_JS = "() => Math.max(document.documentElement.scrollHeight, document.body ? document.body.scrollHeight : 0)"
+
+
+def _csv(value: str) -> Tuple[str, ...]:
+    return tuple(v.strip().lower() for v in value.split(",") if v.strip())
+
+
+# ---------------- Capture profiles ----------------
+AD_HOSTS = (
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "adservice.google.com",
+    "google-analytics.com", "googletagmanager.com", "googletagservices.com",
+    "facebook.net", "connect.facebook.com", "hotjar.com", "clarity.ms", "fullstory.com",
+    "segment.io", "cdn.segment.com", "mixpanel.com", "amplitude.com", "nr-data.net",
+    "scorecardresearch.com", "amazon-adsystem.com", "adnxs.com", "criteo.com",
+    "taboola.com", "outbrain.com", "quantserve.com",
+)
+
+
+class CaptureProfile(NamedTuple):
+    name: str
+    block_types: FrozenSet[str] = frozenset()
+    block_hosts: Tuple[str, ...] = ()
+    wait_until: str = "load"
+    network_idle_ms: int = 0
+    settle_ms: int = 0
+
+    def blocks(self, resource_type: str, host: str) -> Optional[str]:
+        """Why a request would be blocked ("type" or "host"), or None"""
+        if resource_type in self.block_types:
+            return "type"
+        if host and any(_host_matches(host, pattern) for pattern in self.block_hosts):
+            return "host"
+        return None
+
+
+def _host_matches(host: str, pattern: str) -> bool:
+    if any(c in pattern for c in "*?["):
+        return fnmatch.fnmatchcase(host, pattern)
+    return host == pattern or host.endswith("." + pattern)
+
+
+_FAST_TYPES = frozenset({"media", "websocket", "eventsource", "manifest", "texttrack"})
+
+PROFILES = {
+    "full": CaptureProfile("full"),
+    "fast": CaptureProfile("fast", _FAST_TYPES, AD_HOSTS, "domcontentloaded", network_idle_ms=2500),
+    "lean": CaptureProfile("lean", _FAST_TYPES | {"image", "font"}, AD_HOSTS, "domcontentloaded", settle_ms=250),
+}
+
+
+def get_profile(name: Optional[str] = None) -> CaptureProfile:
+    """The named profile (default CAPTURE_PROFILE) with any CAPTURE_* overrides applied"""
+    name = (name or os.environ.get("CAPTURE_PROFILE", "fast")).strip().lower()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown capture profile {name!r}; expected one of {', '.join(PROFILES)}")
+    profile = PROFILES[name]
+    env = os.environ
+    if "CAPTURE_BLOCK_TYPES" in env:
+        profile = profile._replace(block_types=frozenset(_csv(env["CAPTURE_BLOCK_TYPES"])))
+    if env.get("CAPTURE_BLOCK_HOSTS"):
+        profile = profile._replace(block_hosts=profile.block_hosts + _csv(env["CAPTURE_BLOCK_HOSTS"]))
+    if env.get("CAPTURE_WAIT_UNTIL"):
+        profile = profile._replace(wait_until=env["CAPTURE_WAIT_UNTIL"].strip().lower())
+    if env.get("CAPTURE_NETWORK_IDLE_MS"):
+        profile = profile._replace(network_idle_ms=int(env["CAPTURE_NETWORK_IDLE_MS"]))
+    if env.get("CAPTURE_SETTLE_MS"):
+        profile = profile._replace(settle_ms=int(env["CAPTURE_SETTLE_MS"]))
+    return profile
+
+
+def _new_report(profile: CaptureProfile, report: Optional[dict]) -> dict:
+    report = report if report is not None else {}
+    report.update({
+        "profile": profile.name,
+        "requests": 0,
+        "blocked": {"count": 0, "by_type": {}, "by_host": {}},
+        "network_idle": None,
+        "timings_ms": {},
+        "snapshot": None,
+        "http_cache": None,
+    })
+    return report
+
+
+# File extensions standing in for resource types when routing is off (HTTP cache in use)
+_TYPE_EXTENSIONS = {
+    "media": ("mp4", "webm", "m4v", "mov", "m3u8", "mpd", "mp3", "ogg", "wav"),
+    "manifest": ("webmanifest",),
+    "texttrack": ("vtt",),
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico"),
+    "font": ("woff2", "woff", "ttf", "otf", "eot"),
+}
+_TYPE_SCHEMES = {"websocket": ("ws://*", "wss://*")}
+
+
+def _blocked_url_patterns(profile: CaptureProfile) -> List[str]:
+    """
+    Network.setBlockedURLs patterns for the profile's blocked types. `*` is
+    the only wildcard and matches anywhere, hostname included, so each
+    extension is anchored to the end of the path (optionally followed by a
+    query or fragment): "*.webm*" would also block https://www.webmd.com/.
+    """
+    patterns = []
+    for resource_type in sorted(profile.block_types):
+        patterns.extend(_TYPE_SCHEMES.get(resource_type, ()))
+        for ext in _TYPE_EXTENSIONS.get(resource_type, ()):
+            patterns += [f"*://*/*.{ext}", f"*://*/*.{ext}?*", f"*://*/*.{ext}#*"]
+    return patterns
+
+
+def _host_resolver_rules(profile: CaptureProfile) -> Optional[str]:
+    """Chromium resolver rules that make the profile's blocked hosts unresolvable"""
+    rules = []
+    for pattern in profile.block_hosts:
+        if "[" in pattern:
+            continue  # the resolver only understands * and ?
+        rules.append(f"MAP {pattern} ~NOTFOUND")
+        if not any(c in pattern for c in "*?"):
+            rules.append(f"MAP *.{pattern} ~NOTFOUND")
+    return ", ".join(rules) or None
+
+
+def _install_routes(page, profile: CaptureProfile, report: dict, cached: bool = False) -> None:
+    """Abort what the profile blocks and count everything in `report`"""
+    blocked = report["blocked"]
+    by_type = blocked["by_type"] = Counter()
+    by_host = blocked["by_host"] = Counter()
+    if cached:
+        _install_cached_blocking(page, profile, report)
+        return
+
+    def handle(route):
+        request = route.request
+        report["requests"] += 1
+        host = urlsplit(request.url).hostname or ""
+        if profile.blocks(request.resource_type, host):
+            blocked["count"] += 1
+            by_type[request.resource_type] += 1
+            by_host[host] += 1
+            route.abort("blockedbyclient")
+        else:
+            # Not continue_(): a replayed snapshot's handler must still see the request
+            route.fallback()
+
+    def count(request):
+        report["requests"] += 1
+
+    if profile.block_types or profile.block_hosts:
+        page.route("**/*", handle)
+    else:
+        # Routing has a per-request cost; only count when nothing is blocked
+        page.on("request", count)
+
+
+def _install_cached_blocking(page, profile: CaptureProfile, report: dict) -> None:
+    """Block without routing (which would turn the HTTP cache off) and count cache hits"""
+    blocked = report["blocked"]
+    cache = report["http_cache"]
+
+    def count(request):
+        report["requests"] += 1
+
+    def failed(request):
+        host = urlsplit(request.url).hostname or ""
+        if profile.blocks(request.resource_type, host):
+            blocked["count"] += 1
+            blocked["by_type"][request.resource_type] += 1
+            blocked["by_host"][host] += 1
+
+    def received(event):
+        cache["responses"] += 1
+        if event["response"].get("fromDiskCache"):
+            cache["hits"] += 1
+            CACHE_HITS_TOTAL.inc(cache="browser_http")
+
+    page.on("request", count)
+    page.on("requestfailed", failed)
+    cdp = page.context.new_cdp_session(page)
+    cdp.on("Network.responseReceived", received)
+    cdp.send("Network.enable")
+    patterns = _blocked_url_patterns(profile)
+    if patterns:
+        cdp.send("Network.setBlockedURLs", {"urls": patterns})
+
+
+# ---------------- Snapshots ----------------
+class SnapshotNotFound(LookupError):
+    """Replay was requested for a page that has no recorded snapshot"""
+
+
+def snapshot_id(url: str, profile: CaptureProfile) -> str:
+    rules = f"{url}\n{','.join(sorted(profile.block_types))}\n{','.join(profile.block_hosts)}"
+    return hashlib.blake2b(rules.encode(), digest_size=16).hexdigest()
+
+
+def snapshot_path(url: str, profile: CaptureProfile) -> str:
+    # .zip: Playwright stores response bodies as archive entries instead of base64 in the JSON
+    return os.path.join(SNAPSHOT_DIR, snapshot_id(url, profile) + ".har.zip")
+
+
+def _snapshot_mode(url: str, profile: CaptureProfile, mode: Optional[str]) -> Tuple[str, str]:
+    mode = (mode or SNAPSHOT_MODE).strip().lower()
+    if mode not in SNAPSHOT_MODES:
+        raise ValueError(f"Unknown snapshot mode {mode!r}; expected one of {', '.join(SNAPSHOT_MODES)}")
+    path = snapshot_path(url, profile)
+    exists = mode != "off" and os.path.exists(path)
+    if mode == "auto":
+        mode = "replay" if exists else "record"
+    if mode == "replay" and not exists:
+        raise SnapshotNotFound(f"No snapshot of {url} for profile {profile.name} in {SNAPSHOT_DIR}")
+    return mode, path
+
+
+@contextmanager
+def _browser_context(p, url: str, profile: CaptureProfile, report: dict, snapshot: Optional[str] = None, **options):
+    """
+    Launch Chromium and yield a context that records or replays the page's
+    snapshot as `snapshot` says, or uses the shared HTTP cache when there is
+    no snapshot. `report["http_cache"]` is set when the cache is in use.
+    """
+    mode, path = _snapshot_mode(url, profile, snapshot)
+    # A snapshot must hold every response, and replay needs routing anyway
+    slot = _acquire_cache_slot() if mode == "off" else None
+    if slot is not None:
+        try:
+            context, user_data_dir = _launch_cached(p, slot, profile, options)
+        except BaseException:
+            _release_cache_slot(slot)
+            raise
+        report["http_cache"] = {"slot": slot.index, "responses": 0, "hits": 0}
+        try:
+            yield context
+        finally:
+            try:
+                context.close()
+            finally:
+                _release_cache_slot(slot)
+                artifacts.remove_scratch_dir(user_data_dir)
+        return
+
+    partial = None
+    if mode != "off":
+        # Service worker fetches bypass both recording and routing
+        options["service_workers"] = "block"
+        report["snapshot"] = {"mode": mode, "id": snapshot_id(url, profile)}
+    if mode == "record":
+        CACHE_MISSES_TOTAL.inc(cache="snapshot")
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        partial = os.path.join(SNAPSHOT_DIR, artifacts.PARTIAL_PREFIX + os.path.basename(path))
+        options.update(record_har_path=partial, record_har_mode="full", record_har_content="attach")
+    elif mode == "replay":
+        CACHE_HITS_TOTAL.inc(cache="snapshot")
+        if _snapshot_store is not None:
+            _snapshot_store.touch(path)
+
+    browser = p.chromium.launch()
+    complete = False
+    try:
+        context = browser.new_context(**options)
+        try:
+            if mode == "replay":
+                context.route_from_har(path, not_found="abort")
+            yield context
+            complete = True
+        finally:
+            context.close()  # writes the HAR
+    finally:
+        browser.close()
+        if partial:
+            # Only a capture that ran to the end becomes the page's snapshot
+            if complete and os.path.exists(partial):
+                os.replace(partial, path)
+            elif os.path.exists(partial):
+                os.unlink(partial)
+
+
+# ---------------- Shared HTTP cache ----------------
+_slots_in_use = set()
+_slots_lock = threading.Lock()
+
+
+class _CacheSlot(NamedTuple):
+    index: int
+    path: str
+    lock_file: object
+
+
+def _acquire_cache_slot() -> Optional[_CacheSlot]:
+    """A free cache slot, locked against other threads and processes, or None"""
+    if not HTTP_CACHE_DIR or HTTP_CACHE_SLOTS <= 0:
+        return None
+    for index in range(HTTP_CACHE_SLOTS):
+        with _slots_lock:
+            if index in _slots_in_use:
+                continue
+            _slots_in_use.add(index)
+        path = os.path.join(HTTP_CACHE_DIR, f"slot-{index}")
+        try:
+            os.makedirs(path, exist_ok=True)
+            lock_file = open(path + ".lock", "w")
+        except OSError:
+            _release_cache_slot_index(index)
+            continue
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # Held by another worker process
+                lock_file.close()
+                _release_cache_slot_index(index)
+                continue
+        return _CacheSlot(index, path, lock_file)
+    CACHE_MISSES_TOTAL.inc(cache="browser_http_slot")
+    return None
+
+
+def _release_cache_slot_index(index: int) -> None:
+    with _slots_lock:
+        _slots_in_use.discard(index)
+
+
+def _release_cache_slot(slot: _CacheSlot) -> None:
+    slot.lock_file.close()  # drops the flock
+    _release_cache_slot_index(slot.index)
+
+
+def _launch_cached(p, slot: _CacheSlot, profile: CaptureProfile, options: dict):
+    """A persistent context on a fresh profile directory that uses `slot` as its disk cache"""
+    args = [f"--disk-cache-dir={slot.path}", f"--disk-cache-size={HTTP_CACHE_BYTES // HTTP_CACHE_SLOTS}"]
+    rules = _host_resolver_rules(profile)
+    if rules:
+        args.append(f"--host-resolver-rules={rules}")
+    user_data_dir = artifacts.new_scratch_dir("browser_")
+    try:
+        return p.chromium.launch_persistent_context(user_data_dir, args=args, **options), user_data_dir
+    except BaseException:
+        artifacts.remove_scratch_dir(user_data_dir)
+        raise
+
+
+def _first_page(context):
+    # A persistent context (HTTP cache in use) already has a blank page open
+    return context.pages[0] if context.pages else context.new_page()
+
+
+def _load(page, url: str, profile: CaptureProfile, report: dict) -> None:
+    """Navigate and wait the way the profile says; fills report timings"""
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    timings = report["timings_ms"]
+    start = time.perf_counter()
+    with stage_timer("page_load"):
+        page.goto(url, timeout=TIMEOUT_MS, wait_until=profile.wait_until)
+        timings["navigation"] = round((time.perf_counter() - start) * 1000)
+        if profile.network_idle_ms:
+            # A budget, not a requirement: pages that never go idle are captured anyway
+            idle_start = time.perf_counter()
+            try:
+                page.wait_for_load_state("networkidle", timeout=profile.network_idle_ms)
+                report["network_idle"] = True
+            except PlaywrightTimeoutError:
+                report["network_idle"] = False
+            timings["network_idle"] = round((time.perf_counter() - idle_start) * 1000)
+        if profile.settle_ms:
+            page.wait_for_timeout(profile.settle_ms)
+            timings["settle"] = profile.settle_ms
+    timings["total"] = round((time.perf_counter() - start) * 1000)
+
+
+@timed("screenshot")
+def capture_screenshot(url: str, screenshot_path: str = "screenshot.png", profile: Optional[CaptureProfile] = None,
+                       report: Optional[dict] = None, snapshot: Optional[str] = None) -> str:
+    from playwright.sync_api import sync_playwright
+    profile = profile or get_profile()
+    report = _new_report(profile, report)
+    with sync_playwright() as p:
+        with _browser_context(p, url, profile, report, snapshot) as context:
+            page = _first_page(context)
+            _install_routes(page, profile, report, cached=report["http_cache"] is not None)
+            _load(page, url, profile, report)
+            page.screenshot(path=screenshot_path, full_page=True)
+    return screenshot_path
+
+
+def capture_clips(url: str, clip_height: int = 1080, strategy: str = None,
+                  viewport_width: int = VIEWPORT_WIDTH, max_height: int = MAX_HEIGHT,
+                  profile: Optional[CaptureProfile] = None, report: Optional[dict] = None,
+                  snapshot: Optional[str] = None) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yield (y, png_bytes) for consecutive clips of the page, top to bottom.
+    Runs Playwright's sync API, so the whole iteration must happen on one
+    thread; closing the generator closes the browser.
+    """
+    from playwright.sync_api import sync_playwright
+    strategy = (strategy or CAPTURE_STRATEGY).lower()
+    profile = profile or get_profile()
+    report = _new_report(profile, report)
+    with sync_playwright() as p:
+        viewport = {"width": viewport_width, "height": clip_height}
+        with _browser_context(p, url, profile, report, snapshot, viewport=viewport) as context:
+            page = _first_page(context)
+            _install_routes(page, profile, report, cached=report["http_cache"] is not None)
+            _load(page, url, profile, report)
+            y = 0
+            while y < max_height:
+                height = min(page.evaluate(_PAGE_HEIGHT_JS), max_height)
+                if y >= height:
+                    break
+                h = min(clip_height, height - y)
+                with stage_timer("screenshot_clip"):
+                    if strategy == "scroll":
+                        png = _viewport_clip(page, y, h)
+                    else:
+                        page.evaluate("y => window.scrollTo(0, y)", y)
+                        png = page.screenshot(clip={"x": 0, "y": y, "width": viewport_width, "height": h}, full_page=True)
+                yield y, png
+                y += h
+
+
+def _viewport_clip(page, y: int, h: int) -> bytes:
+    page.evaluate("y => window.scrollTo(0, y)", y)
+    scrolled = page.evaluate("() => window.scrollY")
+    # Near the bottom the window stops short of y; skip the rows already captured
+    top = max(0, y - int(scrolled))
+    width = page.viewport_size["width"]
+    return page.screenshot(clip={"x": 0, "y": top, "width": width, "height": h})
@@ -2,12 +2,22 @@ from bs4 import BeautifulSoup
 import os
 import re
 from pathlib import Path
-import json
 from datetime import datetime
 import argparse
 import glob
+import sys
+from metrics import timed
+from log_config import configure_logging, get_logger
+from project_tree import DEFAULT_IGNORE, walk_tree
+from manifest import Manifest, manifest_path_for, source_fingerprint
+from sinks import FileSink, JsonLinesSink, MemorySink, TeeSink
+from issue_store import (AriaFinding, ImageFinding, IssueIndex, NestingIssue, SourceText,
+                         element_span, materialize)
+
+logger = get_logger("code_analyzer")
 
 # Test for Aria Labels
+@timed("check_aria_labels")
 def check_aria_labels(html_file_path):
     """
     Analyze HTML file and return percentage of elements without aria labels
@@ -30,7 +40,8 @@ def check_aria_labels(html_file_path):
     if not all_elements:
         return 0, 0, 0, {}, []  # No elements found
     
-    # Track elements without aria by type and their code
+    # Track elements without aria by type; findings keep a snippet located through the shared SourceText
+    source = SourceText(html_content)
     missing_aria_by_type = {}
     elements_with_aria = 0
     elements_without_aria = 0
@@ -53,55 +64,63 @@ def check_aria_labels(html_file_path):
             element_type = element.name
             missing_aria_by_type[element_type] = missing_aria_by_type.get(element_type, 0) + 1
             
-            # Get the actual HTML code for this element
-            element_html = str(element)
-            # Get surrounding context (find the line in original HTML)
-            line_context = get_element_line_context(html_content, element_html)
-            
-            missing_elements_code.append({
-                'type': element_type,
-                'html': element_html,
-                'context': line_context
-            })
+            span = element_span(source, element)
+            if span is not None:
+                missing_elements_code.append(AriaFinding(element_type, element.sourceline, source, *span))
+            else:
+                missing_elements_code.append(AriaFinding(element_type, 1, str(element)))
     
     total_elements = len(all_elements)
     percentage_without_aria = (elements_without_aria / total_elements) * 100
     
     return percentage_without_aria, elements_without_aria, total_elements, missing_aria_by_type, missing_elements_code
 
-def get_element_line_context(html_content, element_html):
+def find_files(directory_path, extensions, recursive=False, ignore=DEFAULT_IGNORE):
     """
-    Find the line context for an element in the original HTML
+    Paths of files with the given extensions in `directory_path`. With `recursive`
+    the whole tree is walked in parallel, skipping `ignore` globs.
     """
-    # Split HTML into lines
-    lines = html_content.split('\n')
-    
-    # Clean up the element HTML for searching (remove extra whitespace)
-    element_clean = ' '.join(element_html.split())
-    
-    # Search for the line containing this element
-    for i, line in enumerate(lines):
-        line_clean = ' '.join(line.split())
-        if element_clean in line_clean:
-            return f"Line {i+1}: {line.strip()}"
-    
-    # If not found in a single line, it might span multiple lines
-    # Return the element HTML itself as fallback
-    return f"Element: {element_html}"
+    if recursive:
+        return [os.path.join(directory_path, rel_path)
+                for rel_path in walk_tree(directory_path, ignore=ignore, extensions=set(extensions))]
+    return [f for ext in extensions for f in glob.glob(os.path.join(directory_path, "*" + ext))]
+
+def open_manifest(json_filename):
+    """Incremental-mode manifest stored next to `json_filename`"""
+    if not json_filename:
+        raise ValueError("Incremental analysis needs a json_filename to keep its manifest next to")
+    return Manifest(manifest_path_for(json_filename), salt=source_fingerprint(__file__))
+
+def result_sink(sink, output_json, json_filename):
+    """Where an analysis reports: `sink`, else a FileSink for `json_filename` in JSON mode"""
+    if sink is not None:
+        return sink
+    if output_json and json_filename:
+        return FileSink(json_filename)
+    return None
 
-def analyze_directory(directory_path=".", output_json=True, json_filename="aria_issues.json"):
+def relative_name(file_path, directory_path):
+    """Path of `file_path` relative to the analyzed directory, with / separators"""
+    return os.path.relpath(file_path, directory_path).replace(os.sep, "/")
+
+def analyze_directory(directory_path=".", output_json=True, json_filename="aria_issues.json",
+                      recursive=False, ignore=DEFAULT_IGNORE, incremental=False, sink=None):
     """
-    Analyze all HTML files in a directory
+    Analyze all HTML files in a directory (and its subdirectories with recursive=True)
+    With incremental=True only files changed since the last run are re-analyzed
+    Results are reported to `sink` (sinks.py); without one, JSON mode writes
+    json_filename, and json_filename=None writes nothing
     """
-    import json
     from datetime import datetime
     
-    html_files = glob.glob(os.path.join(directory_path, "*.html"))
+    html_files = find_files(directory_path, [".html"], recursive, ignore)
     
     if not html_files:
         message = "No HTML files found in the directory"
         if not output_json:
             print(message)
+        if sink is not None:
+            sink.end("aria", {"error": message})
         return {"error": message}
     
     total_elements_all_files = 0
@@ -114,16 +133,30 @@ def analyze_directory(directory_path=".", output_json=True, json_filename="aria_
         "directory": directory_path,
         "summary": {},
         "files": [],
-        "missing_aria_elements": []
+        # Flattened lazily from the per-file findings when serialized
+        "missing_aria_elements": IssueIndex(lambda filename, file_path, element: {
+            "filename": filename,
+            "file_path": file_path,
+            "element_type": element["type"],
+            "element_html": element["html"],
+            "context": element["context"]
+        })
     }
     
     if not output_json:
         print("📋 ARIA Label Analysis Results")
         print("=" * 50)
     
+    manifest = open_manifest(json_filename) if incremental else None
+    sink = result_sink(sink, output_json, json_filename)
+    
     for html_file in html_files:
-        percentage, without_aria, total, missing_by_type, missing_elements = check_aria_labels(html_file)
-        filename = os.path.basename(html_file)
+        if manifest is not None:
+            aria = manifest.get_or_compute(html_file, "aria", lambda: list(check_aria_labels(html_file)))
+        else:
+            aria = check_aria_labels(html_file)
+        percentage, without_aria, total, missing_by_type, missing_elements = aria
+        filename = relative_name(html_file, directory_path)
         
         file_result = {
             "filename": filename,
@@ -159,20 +192,15 @@ def analyze_directory(directory_path=".", output_json=True, json_filename="aria_
         all_missing_elements.extend([(filename, elem) for elem in missing_elements])
         
         # Add to results
-        for element_info in missing_elements:
-            results["missing_aria_elements"].append({
-                "filename": filename,
-                "file_path": html_file,
-                "element_type": element_info["type"],
-                "element_html": element_info["html"],
-                "context": element_info["context"]
-            })
+        results["missing_aria_elements"].add(filename, html_file, missing_elements)
         
         # Combine element type counts
         for element_type, count in missing_by_type.items():
             overall_missing_by_type[element_type] = overall_missing_by_type.get(element_type, 0) + count
         
         results["files"].append(file_result)
+        if sink is not None:
+            sink.file("aria", file_result)
     
     # Generate summary
     overall_percentage = (total_without_aria_all_files / total_elements_all_files * 100) if total_elements_all_files > 0 else 0
@@ -186,11 +214,15 @@ def analyze_directory(directory_path=".", output_json=True, json_filename="aria_
         "missing_by_element_type": overall_missing_by_type
     }
     
+    if manifest is not None:
+        manifest.save()
+        logger.info("Incremental ARIA analysis", extra={"fields": {"reused": manifest.hits, "analyzed": manifest.misses}})
+    
+    if sink is not None:
+        sink.end("aria", results)
+        logger.debug("ARIA analysis results written", extra={"fields": {"sink": type(sink).__name__}})
+    
     if output_json:
-        # Save to JSON file
-        with open(json_filename, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
-        print(f"✅ ARIA analysis results saved to {json_filename}")
         return results
     else:
         # Display summary
@@ -222,6 +254,47 @@ def analyze_directory(directory_path=".", output_json=True, json_filename="aria_
         
         return results
 
+# ---------------- JS image patterns ----------------
+# A single precompiled alternation finds every image site in one pass. For the
+# innerHTML / insertAdjacentHTML sinks only the anchor is matched; the string
+# literal after it is read by a separate anchored pattern whose alternatives
+# never overlap, so nothing backtracks over long minified literals.
+_JS_IMAGE_SITES = (
+    r"(?P<createElement>createElement\s*\(\s*(?P<ce_quote>['\"`])[iI][mM][gG](?P=ce_quote)\s*\))"
+    r"|(?P<new_image>\bnew\s+Image\b(?:\s*\((?:\s*[\w.$]+\s*(?:,\s*[\w.$]+\s*)?)?\))?)"
+    r"|(?P<innerHTML>\binnerHTML\s*\+?=\s*(?=['\"`]))"
+    r"|(?P<insertAdjacentHTML>\binsertAdjacentHTML\s*\(\s*(?P<ia_quote>['\"`])[\w-]{0,20}(?P=ia_quote)\s*,\s*(?=['\"`]))"
+    r"|(?P<alt_set>\.setAttribute\s*\(\s*(?P<sa_quote>['\"`])alt(?P=sa_quote)|\.alt\s*=(?!=))"
+)
+# JSX {expression} attribute values, up to four levels of nested braces
+_JSX_EXPRESSION = r"\{[^{}]*\}"
+for _ in range(3):
+    _JSX_EXPRESSION = r"\{(?:[^{}]|%s)*\}" % _JSX_EXPRESSION
+_JSX_IMAGE_SITE = (
+    r"|(?P<jsx><img\b(?P<jsx_attrs>(?:[^<>{}\"']|\"[^\"]*\"|'[^']*'|" + _JSX_EXPRESSION + r")*)/?>)"
+)
+# The leading lookahead lets the engine reject most positions on their first character
+_JS_IMAGE_SCAN_RE = re.compile(r"(?=[cni.])(?:" + _JS_IMAGE_SITES + r")")
+_JSX_IMAGE_SCAN_RE = re.compile(r"(?=[cni.<])(?:" + _JS_IMAGE_SITES + _JSX_IMAGE_SITE + r")")
+_JSX_SUFFIXES = ('.jsx', '.tsx')
+
+_JS_LITERAL_RES = {
+    quote: re.compile(r"{0}([^{0}\\]*(?:\\.[^{0}\\]*)*){0}".format(quote), re.DOTALL)
+    for quote in '"\'`'
+}
+_HTML_IMG_TAG_RE = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+# `name = [document.]` right before createElement / new Image, and `name` before .alt / .setAttribute
+_JS_ASSIGNED_NAME_RE = re.compile(r"([\w$]+)\s*=\s*(?:[\w$]+\s*\.\s*)?$")
+_JS_RECEIVER_NAME_RE = re.compile(r"([\w$]+)\s*$")
+_JS_NAME_WINDOW = 80
+_ALT_ATTR_RE = re.compile(r"(?<![\w-])alt\s*=|\{\s*\.\.\.", re.IGNORECASE)
+
+
+def _has_alt_attr(attrs):
+    # A JSX spread ({...props}) may carry alt, so it is not reported
+    return _ALT_ATTR_RE.search(attrs) is not None
+
+
 # Analyzing Images for Alt Tags
 class ImageAltAnalyzer:
     def __init__(self):
@@ -229,11 +302,13 @@ class ImageAltAnalyzer:
         self.images_without_alt = 0
         self.file_results = []
 
+    @timed("alt_text_html")
     def analyze_html_content(self, content, filename):
         """Analyze HTML content for img tags and their alt attributes"""
         try:
             soup = BeautifulSoup(content, 'html.parser')
             img_tags = soup.find_all('img')
+            source = SourceText(content)
             
             file_total = len(img_tags)
             file_without_alt = 0
@@ -245,14 +320,18 @@ class ImageAltAnalyzer:
                 # Only count as missing if alt attribute is completely absent
                 if alt_attr is None:
                     file_without_alt += 1
-                    # Store the actual img tag as string
-                    missing_alt_tags.append(str(img))
+                    # Keep where the img tag is; it is read back when serialized
+                    span = element_span(source, img)
+                    if span is not None:
+                        missing_alt_tags.append(ImageFinding('html', img.sourceline, source, *span))
+                    else:
+                        missing_alt_tags.append(ImageFinding('html', 1, str(img)))
             
             self.total_images += file_total
             self.images_without_alt += file_without_alt
             
             self.file_results.append({
-                'filename': filename,
+                'filename': sys.intern(filename),
                 'total_images': file_total,
                 'without_alt': file_without_alt,
                 'percentage': (file_without_alt / file_total * 100) if file_total > 0 else 0,
@@ -261,52 +340,74 @@ class ImageAltAnalyzer:
             })
             
         except Exception as e:
-            print(f"Error parsing {filename}: {e}")
+            logger.warning("Error parsing %s: %s", filename, e)
 
+    @timed("alt_text_js")
     def analyze_js_content(self, content, filename):
         """Analyze JavaScript content for dynamically created img elements"""
-        # Look for patterns like: createElement('img'), new Image(), innerHTML with <img>
-        patterns = [
-            (r'createElement\s*\(\s*[\'"]img[\'"]\s*\)', 'createElement'),
-            (r'new\s+Image\s*\(\s*\)', 'new Image'),
-            (r'innerHTML\s*[+]?=\s*[\'"]([^\'\"]*<img[^>]*>)[^\'\"]*[\'"]', 'innerHTML'),
-            (r'insertAdjacentHTML\s*\([^)]*[\'"]([^\'\"]*<img[^>]*>)[^\'\"]*[\'"]\)', 'insertAdjacentHTML'),
-        ]
-        
-        js_images = 0
-        js_without_alt = 0
-        missing_alt_tags = []
-        
-        for pattern, pattern_type in patterns:
-            matches = re.finditer(pattern, content, re.IGNORECASE | re.DOTALL)
-            for match in matches:
-                js_images += 1
-                
-                if pattern_type in ['innerHTML', 'insertAdjacentHTML']:
-                    # Extract the img tag from the captured group
-                    img_html = match.group(1) if match.groups() else match.group()
-                    if 'alt=' not in img_html.lower():
-                        js_without_alt += 1
-                        missing_alt_tags.append({
-                            'type': pattern_type,
-                            'img_tag': img_html.strip(),
-                            'full_match': match.group().strip()
-                        })
-                else:
-                    # createElement and new Image() don't automatically have alt
-                    js_without_alt += 1
-                    missing_alt_tags.append({
-                        'type': pattern_type,
-                        'img_tag': f"Dynamic image creation: {pattern_type}",
-                        'full_match': match.group().strip()
-                    })
+        # Look for patterns like: createElement('img'), new Image(), innerHTML with <img>,
+        # JSX <img> in .jsx/.tsx files, and setAttribute('alt', ...) / .alt = ...
+        scanner = _JSX_IMAGE_SCAN_RE if filename.lower().endswith(_JSX_SUFFIXES) else _JS_IMAGE_SCAN_RE
+
+        source = SourceText(content)
+        found = []
+        # Parallel to `found`: False once an alt was set on the image
+        missing = []
+        # (variable, index into found) of dynamic images waiting for a later
+        # setAttribute('alt') / .alt =
+        pending = []
+        line_num = 1
+        last = 0
+        pos = 0
+
+        for match in scanner.finditer(content):
+            kind = match.lastgroup
+            start = match.start()
+            if start < pos:
+                # Inside a string literal already consumed after an HTML sink
+                continue
+            line_num += content.count('\n', last, start)
+            last = start
+            pos = match.end()
+
+            if kind == 'alt_set':
+                if pending:
+                    receiver = _JS_RECEIVER_NAME_RE.search(content, max(0, start - _JS_NAME_WINDOW), start)
+                    name = receiver.group(1) if receiver else None
+                    # Prefer the image assigned to the same variable, else the latest one
+                    index = next((i for i in range(len(pending) - 1, -1, -1)
+                                  if pending[i][0] == name), len(pending) - 1)
+                    missing[pending.pop(index)[1]] = False
+            elif kind in ('createElement', 'new_image'):
+                # createElement and new Image() don't automatically have alt
+                pattern_type = 'createElement' if kind == 'createElement' else 'new Image'
+                assigned = _JS_ASSIGNED_NAME_RE.search(content, max(0, start - _JS_NAME_WINDOW), start)
+                pending.append((assigned.group(1) if assigned else None, len(found)))
+                found.append(ImageFinding(pattern_type, line_num, source, start, pos))
+                missing.append(True)
+            elif kind == 'jsx':
+                found.append(ImageFinding('jsx', line_num, source, start, pos))
+                missing.append(not _has_alt_attr(match.group('jsx_attrs')))
+            else:
+                # innerHTML / insertAdjacentHTML: read the string literal that follows
+                literal = _JS_LITERAL_RES[content[pos]].match(content, pos)
+                if literal is None:
+                    continue
+                pos = literal.end()
+                for img in _HTML_IMG_TAG_RE.finditer(content, literal.start(1), literal.end(1)):
+                    found.append(ImageFinding(kind, line_num, source, img.start(), img.end(), (start, pos)))
+                    missing.append(not _has_alt_attr(img.group()))
+
+        js_images = len(found)
+        missing_alt_tags = [entry for entry, is_missing in zip(found, missing) if is_missing]
+        js_without_alt = len(missing_alt_tags)
         
         if js_images > 0:
             self.total_images += js_images
             self.images_without_alt += js_without_alt
             
             self.file_results.append({
-                'filename': filename,
+                'filename': sys.intern(filename),
                 'total_images': js_images,
                 'without_alt': js_without_alt,
                 'percentage': (js_without_alt / js_images * 100) if js_images > 0 else 0,
@@ -314,47 +415,48 @@ class ImageAltAnalyzer:
                 'file_type': 'javascript'
             })
 
-    def analyze_directory(self, directory_path, recursive=True):
+    def analyze_directory(self, directory_path, recursive=True, ignore=DEFAULT_IGNORE):
         """Analyze all HTML, JS, and CSS files in a directory"""
         directory = Path(directory_path)
         
         if not directory.exists():
-            print(f"Directory {directory_path} does not exist.")
+            logger.warning("Directory %s does not exist", directory_path)
             return
         
         # File extensions to analyze
         extensions = {'.html', '.htm', '.js', '.jsx', '.ts', '.tsx'}
         
         if recursive:
-            files = [f for f in directory.rglob('*') if f.suffix.lower() in extensions]
+            files = [directory / rel_path for rel_path in walk_tree(directory, ignore=ignore, extensions=extensions)]
         else:
             files = [f for f in directory.iterdir() if f.is_file() and f.suffix.lower() in extensions]
         
         if not files:
-            print(f"No HTML/JS files found in {directory_path}")
+            logger.info("No HTML/JS files found in %s", directory_path)
             return
         
-        print(f"Analyzing {len(files)} files...")
+        logger.debug("Analyzing image alt tags", extra={"fields": {"files": len(files)}})
         
         for file_path in files:
             try:
                 with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                     content = f.read()
                 
+                filename = relative_name(file_path, directory)
                 if file_path.suffix.lower() in {'.html', '.htm'}:
-                    self.analyze_html_content(content, file_path.name)
+                    self.analyze_html_content(content, filename)
                 elif file_path.suffix.lower() in {'.js', '.jsx', '.ts', '.tsx'}:
-                    self.analyze_js_content(content, file_path.name)
+                    self.analyze_js_content(content, filename)
                     
             except Exception as e:
-                print(f"Error reading {file_path}: {e}")
+                logger.warning("Error reading %s: %s", file_path, e)
 
     def analyze_files(self, file_paths):
         """Analyze specific files"""
         for file_path in file_paths:
             path = Path(file_path)
             if not path.exists():
-                print(f"File {file_path} does not exist.")
+                logger.warning("File %s does not exist", file_path)
                 continue
                 
             try:
@@ -366,10 +468,10 @@ class ImageAltAnalyzer:
                 elif path.suffix.lower() in {'.js', '.jsx', '.ts', '.tsx'}:
                     self.analyze_js_content(content, path.name)
                 else:
-                    print(f"Unsupported file type: {path.suffix}")
+                    logger.info("Unsupported file type: %s", path.suffix)
                     
             except Exception as e:
-                print(f"Error reading {file_path}: {e}")
+                logger.warning("Error reading %s: %s", file_path, e)
 
     def get_results_dict(self):
         """Get results as a dictionary for JSON export"""
@@ -405,18 +507,19 @@ class ImageAltAnalyzer:
             "notes": [
                 "Empty alt='' attributes are considered valid (for decorative images)",
                 "Only completely missing alt attributes are counted as violations",
-                "For JavaScript files, dynamic image creation patterns are detected",
+                "For JavaScript files, dynamic image creation patterns are detected (and <img> elements in .jsx/.tsx)",
                 "Image tags show the actual HTML found in the files"
             ]
         }
 
+    def write_to(self, sink):
+        """Report the results to a sink (sinks.py)"""
+        sink.end("alt_tag", self.get_results_dict())
+
     def save_to_json(self, output_file):
         """Save results to JSON file"""
-        results = self.get_results_dict()
-        
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
+            self.write_to(FileSink(output_file))
             print(f"Results saved to {output_file}")
         except Exception as e:
             print(f"Error saving to JSON file: {e}")
@@ -442,6 +545,7 @@ class ImageAltAnalyzer:
                     if missing_tags:
                         print(f"  Missing alt tags:")
                         for i, tag in enumerate(missing_tags, 1):
+                            tag = materialize(tag)
                             if isinstance(tag, dict):  # JavaScript tags
                                 print(f"    {i}. [{tag['type']}] {tag['img_tag']}")
                             else:  # HTML tags
@@ -475,6 +579,8 @@ def main():
                        help='Save results to JSON file (e.g., --json results.json)')
     parser.add_argument('--json-only', metavar='OUTPUT_FILE',
                        help='Save to JSON and suppress console output')
+    parser.add_argument('--jsonl', metavar='OUTPUT_FILE',
+                       help='Also write results as JSON Lines')
     
     args = parser.parse_args()
     
@@ -489,6 +595,10 @@ def main():
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     auto_json_filename = f"img_alt_analysis.json"
     
+    if args.jsonl:
+        with JsonLinesSink(args.jsonl) as sink:
+            analyzer.write_to(sink)
+    
     # Handle JSON output
     if args.json_only:
         analyzer.save_to_json(args.json_only)
@@ -501,6 +611,7 @@ def main():
         analyzer.save_to_json(auto_json_filename)
 
 # Test for Nesting
+@timed("check_html_nesting")
 def check_html_nesting(file_path):
     """
     Check for improper HTML nesting issues
@@ -508,9 +619,14 @@ def check_html_nesting(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         html_content = f.read()
     
-    lines = html_content.split('\n')
+    source = SourceText(html_content)
     issues = []
     
+    def issue_at(child, message):
+        # The offending line is kept as a span and read back when serialized
+        line_num = child.sourceline or find_element_line_number(html_content, str(child))
+        return NestingIssue('HTML_IMPROPER_NESTING', line_num, message, source, *source.line_span(line_num))
+    
     try:
         soup = BeautifulSoup(html_content, 'html.parser')
         
@@ -549,191 +665,438 @@ def check_html_nesting(file_path):
                 # Check for invalid children
                 for child in parent.find_all(recursive=False):  # Direct children only
                     if child.name in invalid_children:
-                        line_num = find_element_line_number(html_content, str(child))
-                        issues.append({
-                            'type': 'HTML_IMPROPER_NESTING',
-                            'line': line_num,
-                            'message': f"Invalid nesting: <{child.name}> inside <{parent_tag}>",
-                            'code': lines[line_num-1].strip() if line_num <= len(lines) else str(child)
-                        })
+                        issues.append(issue_at(child, f"Invalid nesting: <{child.name}> inside <{parent_tag}>"))
                 
                 # Check if only valid children are allowed
                 if valid_children:
                     for child in parent.find_all(recursive=False):
                         if child.name and child.name not in valid_children:
-                            line_num = find_element_line_number(html_content, str(child))
-                            issues.append({
-                                'type': 'HTML_IMPROPER_NESTING',
-                                'line': line_num,
-                                'message': f"Invalid child: <{child.name}> inside <{parent_tag}> (only {valid_children} allowed)",
-                                'code': lines[line_num-1].strip() if line_num <= len(lines) else str(child)
-                            })
+                            issues.append(issue_at(
+                                child, f"Invalid child: <{child.name}> inside <{parent_tag}> (only {valid_children} allowed)"))
     
     except Exception as e:
-        issues.append({
-            'type': 'HTML_PARSE_ERROR',
-            'line': 1,
-            'message': f"HTML parsing error: {str(e)}",
-            'code': 'Unable to parse HTML'
-        })
+        issues.append(NestingIssue('HTML_PARSE_ERROR', 1, f"HTML parsing error: {str(e)}", 'Unable to parse HTML'))
     
     return issues
 
-def check_css_nesting(file_path):
+# ---------------- CSS scanner ----------------
+# The stylesheet is read in fixed-size chunks and scanned with a small state
+# machine (code / comment / string), so memory stays bounded by the chunk size
+# plus the open-block stack regardless of file size.
+
+_CSS_CHUNK_SIZE = 1 << 16
+_CSS_PRELUDE_LIMIT = 200
+
+# At-rules whose block holds ordinary style rules
+_CSS_GROUPING_AT_RULES = frozenset({
+    'media', 'supports', 'layer', 'container', 'document', 'scope', 'starting-style',
+})
+
+# Skip ordinary code, then stop at the next character that matters
+_CSS_CODE_RE = re.compile(r"[^{};\"'/]*(?:(?P<open>\{)|(?P<close>\})|(?P<semi>;)|(?P<quote>[\"'])"
+                          r"|(?P<comment>/\*)|(?P<slash>/))")
+_CSS_STRING_RES = {q: re.compile(r"(?:[^%s\\\n]|\\.)*" % q, re.DOTALL) for q in '"\''}
+_CSS_AT_NAME_RE = re.compile(r"@(?:-[a-z]+-)?([a-z-]+)", re.IGNORECASE)
+
+
+def _css_snippet(text):
+    text = ' '.join(text.split())
+    return text if len(text) <= _CSS_PRELUDE_LIMIT else text[:_CSS_PRELUDE_LIMIT] + '...'
+
+
+def scan_css_nesting(stream, allow_native_nesting=False, chunk_size=_CSS_CHUNK_SIZE):
     """
-    Check for improper CSS nesting issues
+    Streaming nesting check over a text stream of CSS.
+
+    Braces inside comments and strings are ignored. Style rules directly inside
+    @media/@supports/@layer/@container (and other grouping at-rules) or
+    @keyframes are fine; a style rule opened inside another style rule is
+    reported as CSS_NESTED_SELECTORS unless `allow_native_nesting` is set.
     """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        css_content = f.read()
-    
-    lines = css_content.split('\n')
     issues = []
-    
-    brace_stack = []
-    in_media_query = False
-    
-    for line_num, line in enumerate(lines, 1):
-        stripped_line = line.strip()
-        
-        # Track opening braces
-        open_braces = stripped_line.count('{')
-        close_braces = stripped_line.count('}')
-        
-        # Check for media query nesting
-        if '@media' in stripped_line and '{' in stripped_line:
-            in_media_query = True
-            brace_stack.append('media')
-        
-        # Check for nested selectors (invalid in standard CSS)
-        if open_braces > 0 and not stripped_line.startswith('@') and brace_stack:
-            # Check if we're already inside a selector
-            if any(item != 'media' for item in brace_stack):
-                issues.append({
-                    'type': 'CSS_NESTED_SELECTORS',
-                    'line': line_num,
-                    'message': 'Nested selectors detected (invalid in standard CSS)',
-                    'code': stripped_line
-                })
-        
-        # Track braces for nesting level
-        for _ in range(open_braces):
-            brace_stack.append('selector')
-        
-        for _ in range(close_braces):
-            if brace_stack:
-                closed_item = brace_stack.pop()
-                if closed_item == 'media':
-                    in_media_query = False
-        
-        # Check for unclosed braces at end
-        if line_num == len(lines) and brace_stack:
-            issues.append({
-                'type': 'CSS_UNCLOSED_BRACES',
-                'line': line_num,
-                'message': f'Unclosed braces detected: {len(brace_stack)} remaining',
-                'code': 'End of file'
-            })
-    
+    # One entry per open block: 'rule', 'group', 'keyframes', 'keyframe' or 'at'
+    stack = []
+    rule_depth = 0
+    line_num = 1
+    prelude = []
+    prelude_len = 0
+    prelude_line = None
+    state = 'code'
+    quote = None
+    carry = ''
+
+    def add_prelude(text):
+        # Also advances line_num past any newlines in `text`
+        nonlocal line_num, prelude_len, prelude_line
+        newlines = text.count('\n')
+        if prelude_line is None:
+            stripped = text.lstrip()
+            if not stripped:
+                line_num += newlines
+                return
+            prelude_line = line_num + newlines - stripped.count('\n')
+            text = stripped
+        line_num += newlines
+        if prelude_len < _CSS_PRELUDE_LIMIT + 1:
+            text = text[:_CSS_PRELUDE_LIMIT + 1 - prelude_len]
+            prelude.append(text)
+            prelude_len += len(text)
+
+    def reset_prelude():
+        nonlocal prelude_len, prelude_line
+        prelude.clear()
+        prelude_len = 0
+        prelude_line = None
+
+    def open_block():
+        nonlocal rule_depth
+        text = ''.join(prelude).strip()
+        if text.startswith('@'):
+            name = _CSS_AT_NAME_RE.match(text)
+            name = name.group(1).lower() if name else ''
+            if name in _CSS_GROUPING_AT_RULES:
+                stack.append('group')
+            elif name == 'keyframes':
+                stack.append('keyframes')
+            else:
+                stack.append('at')
+        elif stack and stack[-1] == 'keyframes':
+            stack.append('keyframe')
+        else:
+            if rule_depth and not allow_native_nesting:
+                issues.append(NestingIssue('CSS_NESTED_SELECTORS', prelude_line or line_num,
+                                           'Nested selectors detected (invalid in standard CSS)',
+                                           _css_snippet(text) + ' {'))
+            stack.append('rule')
+            rule_depth += 1
+        reset_prelude()
+
+    def close_block():
+        nonlocal rule_depth
+        if stack:
+            if stack.pop() == 'rule':
+                rule_depth -= 1
+        else:
+            issues.append(NestingIssue('CSS_UNMATCHED_BRACE', line_num,
+                                       'Closing brace without matching opening brace',
+                                       (_css_snippet(''.join(prelude)) + ' }').strip()))
+        reset_prelude()
+
+    while True:
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buf = carry + chunk
+        carry = ''
+        pos = 0
+        length = len(buf)
+        while pos < length:
+            if state == 'comment':
+                end = buf.find('*/', pos)
+                if end == -1:
+                    # Keep a trailing '*' in case the next chunk starts with '/'
+                    keep = 1 if buf.endswith('*') and not eof else 0
+                    line_num += buf.count('\n', pos, length - keep)
+                    carry = buf[length - keep:]
+                    break
+                line_num += buf.count('\n', pos, end)
+                pos = end + 2
+                state = 'code'
+            elif state == 'string':
+                end = _CSS_STRING_RES[quote].match(buf, pos).end()
+                if end == length or buf[end] == '\\':
+                    # Unfinished string; an escape cut by the chunk edge is carried over
+                    if end < length and not eof:
+                        carry = '\\'
+                    else:
+                        end = length
+                    add_prelude(buf[pos:end])
+                    break
+                # The closing quote, or an unescaped newline ending a bad string
+                add_prelude(buf[pos:end + 1])
+                pos = end + 1
+                state = 'code'
+            else:
+                match = _CSS_CODE_RE.match(buf, pos)
+                if match is None:
+                    add_prelude(buf[pos:])
+                    break
+                kind = match.lastgroup
+                start, end = match.span(kind)
+                if kind == 'slash' and end == length and not eof:
+                    # Could be the start of a comment split across chunks
+                    add_prelude(buf[pos:start])
+                    carry = '/'
+                    break
+                add_prelude(buf[pos:start])
+                pos = end
+                if kind == 'open':
+                    open_block()
+                elif kind == 'close':
+                    close_block()
+                elif kind == 'semi':
+                    reset_prelude()
+                elif kind == 'quote':
+                    add_prelude(buf[start])
+                    quote = buf[start]
+                    state = 'string'
+                elif kind == 'comment':
+                    state = 'comment'
+                else:
+                    add_prelude('/')
+        if eof:
+            break
+
+    # Check for unclosed braces at end
+    if stack:
+        issues.append(NestingIssue('CSS_UNCLOSED_BRACES', line_num,
+                                   f'Unclosed braces detected: {len(stack)} remaining', 'End of file'))
+
     return issues
 
-def check_js_nesting(file_path):
+@timed("check_css_nesting")
+def check_css_nesting(file_path, allow_native_nesting=False):
     """
-    Check for improper JavaScript nesting issues
+    Check for improper CSS nesting issues
     """
     with open(file_path, 'r', encoding='utf-8') as f:
-        js_content = f.read()
-    
-    lines = js_content.split('\n')
-    issues = []
-    
-    # Track nesting levels
-    brace_stack = []
-    paren_stack = []
-    bracket_stack = []
-    
-    for line_num, line in enumerate(lines, 1):
-        stripped_line = line.strip()
-        
-        # Skip comments
-        if stripped_line.startswith('//') or stripped_line.startswith('/*'):
+        return scan_css_nesting(f, allow_native_nesting=allow_native_nesting)
+
+# ---------------- JavaScript lexer ----------------
+# Pass 1 finds strings, comments, regex literals and template literals with one
+# compiled scanner (each match first skips a run of ordinary code inside the regex
+# engine) and keeps only the code. Pass 2 reduces that code to brackets and newlines and walks it once.
+
+# Characters (optionally followed by up to two spaces) after which `/` opens a regex literal
+_JS_REGEX_PRECEDERS = r"(,=:\[!&|?{};~^*%<>"
+_JS_REGEX_KEYWORDS = ('return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+                      'throw', 'case', 'do', 'else', 'yield', 'await')
+
+
+def _js_regex_context():
+    """Alternation of fixed-width lookbehinds that allow a regex literal at the current `/`."""
+    preceders = '[' + re.escape(_JS_REGEX_PRECEDERS) + ']'
+    options = [f"(?<={preceders}{' ' * n}/)" for n in range(3)]
+    options += [f"(?<=[^+]\\+{' ' * n}/)|(?<=[^-]-{' ' * n}/)" for n in range(1, 3)]
+    options += [f"(?<=\\b{kw}{' ' * n}/)" for kw in _JS_REGEX_KEYWORDS for n in (0, 1)]
+    options.append("(?<=^/)")
+    return "(?:" + "|".join(options) + ")"
+
+
+_JS_STRING = r""""(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?"""
+_JS_COMMENT = r"//[^\n]*|/\*.*?(?:\*/|\Z)"
+_JS_REGEX_BODY = r"(?:[^\\/\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*"
+
+_JS_TOKEN_RE = re.compile(
+    r"[^\"'`/]*(?:"
+    r"(?P<comment>" + _JS_COMMENT + r")"
+    r"|(?P<string>" + _JS_STRING + r")"
+    # Template literals whose ${...} substitutions hold plain expressions are consumed whole
+    r"|(?P<template>`(?:[^`\\$]|\\.|\$(?!\{)|\$\{[^{}`'\"/\n]*\})*`)"
+    r"|(?P<regex>/" + _js_regex_context() + _JS_REGEX_BODY + r")"
+    # Anything else starting with a backtick needs the stateful template scanner
+    r"|(?P<nested_template>`)"
+    # A slash that is not a comment or regex literal is a division and stays in the code
+    r"|(?P<slash>/))",
+    re.DOTALL | re.MULTILINE,
+)
+
+# Inside a ${...} substitution: skip ordinary code, stop at a token or a brace
+_JS_SUBSTITUTION_RE = re.compile(
+    r"[^\"'`/{}]*(?:"
+    r"(?P<comment>" + _JS_COMMENT + r")"
+    r"|(?P<string>" + _JS_STRING + r")"
+    r"|(?P<regex>/" + _js_regex_context() + _JS_REGEX_BODY + r")"
+    r"|(?P<slash>/)|(?P<template>`)|(?P<open>\{)|(?P<close>\}))",
+    re.DOTALL | re.MULTILINE,
+)
+
+# Template text up to the closing backtick or the next ${
+_JS_TEMPLATE_TEXT_RE = re.compile(r"(?:[^`\\$]|\\.|\$(?!\{))*", re.DOTALL)
+
+_JS_NON_BRACKET_RE = re.compile(r"[^{}()\[\]\n]+")
+# str.translate table dropping every other ASCII character (much faster than the regex)
+_JS_ASCII_NON_BRACKETS = {i: None for i in range(128) if chr(i) not in '{}()[]\n'}
+
+_JS_UNMATCHED = {
+    '}': ('JS_UNMATCHED_BRACE', 'Closing brace without matching opening brace'),
+    ')': ('JS_UNMATCHED_PAREN', 'Closing parenthesis without matching opening parenthesis'),
+    ']': ('JS_UNMATCHED_BRACKET', 'Closing bracket without matching opening bracket'),
+}
+
+_JS_SNIPPET_LIMIT = 200
+
+
+def _js_snippet(text):
+    text = text.strip()
+    return text if len(text) <= _JS_SNIPPET_LIMIT else text[:_JS_SNIPPET_LIMIT] + '...'
+
+
+def _js_newlines(js_content, start, end):
+    newlines = js_content.count('\n', start, end)
+    return '\n' * newlines if newlines else ''
+
+
+def _js_scan_nested_template(js_content, start, pieces):
+    """
+    Consume the template literal whose backtick is at `start`, including nested
+    ${...} substitutions and templates. Code inside substitutions is appended to
+    `pieces`; returns the position after the closing backtick.
+    """
+    length = len(js_content)
+    # 'tpl' for template text, an int (open braces so far) for a ${...} substitution
+    stack = ['tpl']
+    pos = start + 1
+    while stack:
+        if stack[-1] == 'tpl':
+            text_end = _JS_TEMPLATE_TEXT_RE.match(js_content, pos).end()
+            pieces.append(_js_newlines(js_content, pos, text_end))
+            if js_content.startswith('${', text_end):
+                stack.append(0)
+                pos = text_end + 2
+            else:
+                stack.pop()
+                pos = min(text_end + 1, length)
             continue
-        
-        # Track brackets, braces, and parentheses
-        for char in stripped_line:
-            if char == '{':
-                brace_stack.append(line_num)
-            elif char == '}':
-                if brace_stack:
-                    brace_stack.pop()
-                else:
-                    issues.append({
-                        'type': 'JS_UNMATCHED_BRACE',
-                        'line': line_num,
-                        'message': 'Closing brace without matching opening brace',
-                        'code': stripped_line
-                    })
-            elif char == '(':
-                paren_stack.append(line_num)
-            elif char == ')':
-                if paren_stack:
-                    paren_stack.pop()
-                else:
-                    issues.append({
-                        'type': 'JS_UNMATCHED_PAREN',
-                        'line': line_num,
-                        'message': 'Closing parenthesis without matching opening parenthesis',
-                        'code': stripped_line
-                    })
-            elif char == '[':
-                bracket_stack.append(line_num)
-            elif char == ']':
-                if bracket_stack:
-                    bracket_stack.pop()
-                else:
-                    issues.append({
-                        'type': 'JS_UNMATCHED_BRACKET',
-                        'line': line_num,
-                        'message': 'Closing bracket without matching opening bracket',
-                        'code': stripped_line
-                    })
-        
-        # Check for excessive nesting (more than 5 levels deep)
-        total_nesting = len(brace_stack) + len(paren_stack) + len(bracket_stack)
-        if total_nesting > 5:
-            issues.append({
-                'type': 'JS_EXCESSIVE_NESTING',
-                'line': line_num,
-                'message': f'Excessive nesting detected: {total_nesting} levels deep',
-                'code': stripped_line
-            })
-    
+
+        match = _JS_SUBSTITUTION_RE.match(js_content, pos)
+        if match is None:
+            pieces.append(js_content[pos:])
+            return length
+        kind = match.lastgroup
+        token_start, end = match.span(kind)
+        if kind == 'open':
+            stack[-1] += 1
+            pieces.append(js_content[pos:end])
+        elif kind == 'close' and stack[-1]:
+            stack[-1] -= 1
+            pieces.append(js_content[pos:end])
+        else:
+            pieces.append(js_content[pos:token_start])
+            if kind == 'close':
+                stack.pop()
+            elif kind == 'template':
+                stack.append('tpl')
+            elif kind == 'slash':
+                pieces.append('/')
+            else:
+                pieces.append(_js_newlines(js_content, token_start, end))
+        pos = end
+    return pos
+
+
+def _js_code_only(js_content):
+    """
+    Return `js_content` with strings, comments, regex literals and template text
+    removed. Newlines inside removed spans are kept so line numbers still match.
+    """
+    pieces = []
+    pos = 0
+    length = len(js_content)
+    while pos < length:
+        for match in _JS_TOKEN_RE.finditer(js_content, pos):
+            kind = match.lastgroup
+            start, end = match.span(kind)
+            if kind == 'slash':
+                continue
+            pieces.append(js_content[pos:start])
+            if kind == 'nested_template':
+                pos = _js_scan_nested_template(js_content, start, pieces)
+                break
+            if end - start > 1:
+                newlines = js_content.count('\n', start, end)
+                if newlines:
+                    pieces.append('\n' * newlines)
+            pos = end
+        else:
+            pieces.append(js_content[pos:])
+            break
+    return ''.join(pieces)
+
+
+def scan_js_nesting(js_content, max_depth=5):
+    """
+    Lexer-based nesting check for JavaScript source.
+
+    Braces, parentheses and brackets inside strings, comments, template
+    literals and regex literals are ignored. Returns the same NestingIssue
+    records as `check_js_nesting`; nesting depth is the deepest point reached on each line.
+    """
+    issues = []
+    code = _js_code_only(js_content).translate(_JS_ASCII_NON_BRACKETS)
+    if not code.isascii():
+        code = _JS_NON_BRACKET_RE.sub('', code)
+    stacks = {'{': [], '(': [], '[': []}
+    closer_stacks = {'}': stacks['{'], ')': stacks['('], ']': stacks['[']}
+    depth = 0
+    peak = 0
+    line_num = 1
+    source_lines = None
+
+    def source_line(line_num):
+        nonlocal source_lines
+        if source_lines is None:
+            source_lines = js_content.split('\n')
+        return source_lines[line_num - 1] if line_num <= len(source_lines) else ''
+
+    def check_depth():
+        # Check for excessive nesting (more than max_depth levels deep)
+        text = source_line(line_num).strip()
+        if text and not text.startswith(('//', '/*', '*')):
+            issues.append(NestingIssue('JS_EXCESSIVE_NESTING', line_num,
+                                       f'Excessive nesting detected: {peak} levels deep', _js_snippet(text)))
+
+    # `code` now holds only brackets and newlines
+    for char in code:
+        if char == '\n':
+            if peak > max_depth:
+                check_depth()
+            line_num += 1
+            peak = depth
+        elif char in '{([':
+            stacks[char].append(line_num)
+            depth += 1
+            if depth > peak:
+                peak = depth
+        else:
+            stack = closer_stacks[char]
+            if stack:
+                stack.pop()
+                depth -= 1
+            else:
+                issue_type, message = _JS_UNMATCHED[char]
+                issues.append(NestingIssue(issue_type, line_num, message, _js_snippet(source_line(line_num))))
+    if peak > max_depth:
+        check_depth()
+
     # Check for unclosed brackets at end of file
+    brace_stack, paren_stack, bracket_stack = stacks['{'], stacks['('], stacks['[']
     if brace_stack:
-        issues.append({
-            'type': 'JS_UNCLOSED_BRACE',
-            'line': brace_stack[0],
-            'message': f'Unclosed braces detected: {len(brace_stack)} remaining',
-            'code': f'Starting at line {brace_stack[0]}'
-        })
-    
+        issues.append(NestingIssue('JS_UNCLOSED_BRACE', brace_stack[0],
+                                   f'Unclosed braces detected: {len(brace_stack)} remaining',
+                                   f'Starting at line {brace_stack[0]}'))
+
     if paren_stack:
-        issues.append({
-            'type': 'JS_UNCLOSED_PAREN',
-            'line': paren_stack[0],
-            'message': f'Unclosed parentheses detected: {len(paren_stack)} remaining',
-            'code': f'Starting at line {paren_stack[0]}'
-        })
-    
+        issues.append(NestingIssue('JS_UNCLOSED_PAREN', paren_stack[0],
+                                   f'Unclosed parentheses detected: {len(paren_stack)} remaining',
+                                   f'Starting at line {paren_stack[0]}'))
+
     if bracket_stack:
-        issues.append({
-            'type': 'JS_UNCLOSED_BRACKET',
-            'line': bracket_stack[0],
-            'message': f'Unclosed brackets detected: {len(bracket_stack)} remaining',
-            'code': f'Starting at line {bracket_stack[0]}'
-        })
-    
+        issues.append(NestingIssue('JS_UNCLOSED_BRACKET', bracket_stack[0],
+                                   f'Unclosed brackets detected: {len(bracket_stack)} remaining',
+                                   f'Starting at line {bracket_stack[0]}'))
+
     return issues
 
+@timed("check_js_nesting")
+def check_js_nesting(file_path):
+    """
+    Check for improper JavaScript nesting issues
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        js_content = f.read()
+
+    return scan_js_nesting(js_content)
+
 def find_element_line_number(html_content, element_html):
     """
     Find the line number where an HTML element appears
@@ -748,124 +1111,132 @@ def find_element_line_number(html_content, element_html):
     
     return 1  # Fallback
 
-def analyze_nesting_issues(directory_path=".", output_json=True, json_filename="nesting_issues.json"):
+def analyze_nesting_issues(directory_path=".", output_json=True, json_filename="nesting_issues.json",
+                           recursive=False, ignore=DEFAULT_IGNORE, incremental=False, sink=None):
     """
     Analyze all HTML, CSS, and JS files for nesting issues
+    With incremental=True only files changed since the last run are re-analyzed
+    Results are reported to `sink` (sinks.py); without one, JSON mode writes
+    json_filename, and json_filename=None writes nothing
     """
-    import json
     from datetime import datetime
     
     file_patterns = ["*.html", "*.css", "*.js"]
-    all_issues = []
+    issue_types = {}
+    files_with_issues = 0
     results = {
         "analysis_date": datetime.now().isoformat(),
         "directory": directory_path,
         "summary": {},
         "files": [],
-        "issues": []
+        # Flattened lazily from the per-file issues when serialized
+        "issues": IssueIndex(lambda filename, file_path, issue: {
+            "filename": filename,
+            "file_path": file_path,
+            "line": issue["line"],
+            "type": issue["type"],
+            "message": issue["message"],
+            "code": issue["code"]
+        })
     }
     
     if not output_json:
         print("🔍 NESTING ANALYSIS RESULTS")
         print("=" * 60)
     
-    for pattern in file_patterns:
-        files = glob.glob(os.path.join(directory_path, pattern))
+    files = find_files(directory_path, [pattern[1:] for pattern in file_patterns], recursive, ignore)
+    manifest = open_manifest(json_filename) if incremental else None
+    sink = result_sink(sink, output_json, json_filename)
+    
+    for file_path in files:
+        filename = relative_name(file_path, directory_path)
+        file_extension = os.path.splitext(filename)[1].lower()
         
-        for file_path in files:
-            filename = os.path.basename(file_path)
-            file_extension = os.path.splitext(filename)[1].lower()
-            
-            file_result = {
-                "filename": filename,
-                "file_path": file_path,
-                "file_type": file_extension,
-                "issues_count": 0,
-                "issues": []
-            }
-            
-            if not output_json:
-                print(f"\n📄 Analyzing {filename}")
-                print("-" * 40)
+        file_result = {
+            "filename": filename,
+            "file_path": file_path,
+            "file_type": file_extension,
+            "issues_count": 0,
+            "issues": []
+        }
+        
+        if not output_json:
+            print(f"\n📄 Analyzing {filename}")
+            print("-" * 40)
+        
+        issues = []
+        
+        try:
+            check = {'.html': check_html_nesting, '.css': check_css_nesting, '.js': check_js_nesting}.get(file_extension)
+            if check is not None:
+                if manifest is not None:
+                    issues = manifest.get_or_compute(file_path, "nesting", lambda: check(file_path))
+                else:
+                    issues = check(file_path)
             
-            issues = []
+            file_result["issues_count"] = len(issues)
+            file_result["issues"] = issues
             
-            try:
-                if file_extension == '.html':
-                    issues = check_html_nesting(file_path)
-                elif file_extension == '.css':
-                    issues = check_css_nesting(file_path)
-                elif file_extension == '.js':
-                    issues = check_js_nesting(file_path)
+            if issues:
+                if not output_json:
+                    print(f"   ❌ Found {len(issues)} nesting issues:")
+                    for i, issue in enumerate(issues, 1):
+                        issue = materialize(issue)
+                        print(f"      {i}. Line {issue['line']}: {issue['message']}")
+                        print(f"         Code: {issue['code']}")
+                        print()
                 
-                file_result["issues_count"] = len(issues)
-                file_result["issues"] = issues
+                files_with_issues += 1
+                for issue in issues:
+                    issue_types[issue["type"]] = issue_types.get(issue["type"], 0) + 1
                 
-                if issues:
-                    if not output_json:
-                        print(f"   ❌ Found {len(issues)} nesting issues:")
-                        for i, issue in enumerate(issues, 1):
-                            print(f"      {i}. Line {issue['line']}: {issue['message']}")
-                            print(f"         Code: {issue['code']}")
-                            print()
-                    
-                    all_issues.extend([(filename, issue) for issue in issues])
-                    
-                    # Add to results
-                    for issue in issues:
-                        results["issues"].append({
-                            "filename": filename,
-                            "file_path": file_path,
-                            "line": issue["line"],
-                            "type": issue["type"],
-                            "message": issue["message"],
-                            "code": issue["code"]
-                        })
-                else:
-                    if not output_json:
-                        print("   ✅ No nesting issues found")
-                    
-            except Exception as e:
-                error_msg = f"Error analyzing file: {str(e)}"
+                # Add to results
+                results["issues"].add(filename, file_path, issues)
+            else:
                 if not output_json:
-                    print(f"   ⚠️  {error_msg}")
+                    print("   ✅ No nesting issues found")
                 
-                file_result["error"] = error_msg
+        except Exception as e:
+            error_msg = f"Error analyzing file: {str(e)}"
+            if not output_json:
+                print(f"   ⚠️  {error_msg}")
             
-            results["files"].append(file_result)
-    
+            file_result["error"] = error_msg
+        
+        results["files"].append(file_result)
+        if sink is not None:
+            sink.file("nesting", file_result)
+
     # Generate summary
-    issue_types = {}
-    for filename, issue in all_issues:
-        issue_type = issue['type']
-        if issue_type not in issue_types:
-            issue_types[issue_type] = []
-        issue_types[issue_type].append((filename, issue))
-    
+    total_issues = sum(issue_types.values())
     results["summary"] = {
         "total_files_analyzed": len(results["files"]),
-        "total_files_with_issues": len(set(issue[0] for issue in all_issues)),
-        "total_issues_found": len(all_issues),
-        "issues_by_type": {issue_type: len(issues) for issue_type, issues in issue_types.items()}
+        "total_files_with_issues": files_with_issues,
+        "total_issues_found": total_issues,
+        "issues_by_type": issue_types
     }
     
+    if manifest is not None:
+        manifest.save()
+        logger.info("Incremental nesting analysis", extra={"fields": {"reused": manifest.hits, "analyzed": manifest.misses}})
+    
+    if sink is not None:
+        sink.end("nesting", results)
+        logger.debug("Nesting analysis results written", extra={"fields": {"sink": type(sink).__name__}})
+    
     if output_json:
-        # Save to JSON file
-        with open(json_filename, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
-        print(f"✅ Results saved to {json_filename}")
         return results
     else:
         # Display summary
-        if all_issues:
+        if total_issues:
             print(f"\n📊 SUMMARY")
             print("=" * 60)
-            print(f"Total files with issues: {len(set(issue[0] for issue in all_issues))}")
-            print(f"Total nesting issues found: {len(all_issues)}")
+            print(f"Total files with issues: {files_with_issues}")
+            print(f"Total nesting issues found: {total_issues}")
             
             print(f"\nIssues by type:")
-            for issue_type, issues in issue_types.items():
-                print(f"  - {issue_type}: {len(issues)}")
+            for issue_type, count in issue_types.items():
+                print(f"  - {issue_type}: {count}")
         else:
             print(f"\n✅ No nesting issues found in any files!")
         
@@ -874,62 +1245,69 @@ def analyze_nesting_issues(directory_path=".", output_json=True, json_filename="
 
 # Example usage
 if __name__ == "__main__":
+    configure_logging(fmt="text")
     # Option 1: Analyze single file
     # percentage, without_aria, total, missing_by_type = check_aria_labels("your_file.html")
     # print(f"Percentage without aria labels: {percentage:.1f}%")
     # if missing_by_type:
     #     print("Missing by type:", missing_by_type)
     
+    # ANALYSIS_INCREMENTAL=1 re-analyzes only files changed since the last run
+    incremental = os.environ.get("ANALYSIS_INCREMENTAL", "0").lower() in ("1", "true", "yes")
+    
+    # ANALYSIS_JSONL=results.jsonl streams the ARIA and nesting results as JSON Lines
+    # instead of writing their JSON files
+    jsonl_path = os.environ.get("ANALYSIS_JSONL")
+    sink = JsonLinesSink(jsonl_path) if jsonl_path else None
+    
     # Option 2: Analyze all HTML files in a directory
     # test for Aria
-    analyze_directory(".")  # Current directory
+    analyze_directory(".", incremental=incremental, sink=sink)  # Current directory
     
     # test for alt tags
     main()
 
     # test for nested structure
-    analyze_nesting_issues(".")
+    analyze_nesting_issues(".", incremental=incremental, sink=sink)
+    
+    if sink is not None:
+        sink.close()
 
     # Option 3: Analyze specific directory
     # analyze_directory("/path/to/your/html/files")
 
-def analyze_files(file_paths, tmp_dir):
+def analyze_tree(root, ignore=DEFAULT_IGNORE, output_dir=None, sink=None):
     """
-    Entry point function for backend to analyze uploaded files
-    Uses existing analysis functions in this module
+    Run the aria, alt tag and nesting analyses over every file under `root`,
+    keeping paths relative to `root` in the results. Results are collected in
+    memory and also reported to `sink`, or written as <analysis>.json files
+    to `output_dir` when given
     """
     from datetime import datetime
-    import tempfile
-    import shutil
-    import os
     
-    # Create a working directory and copy files there
-    work_dir = tempfile.mkdtemp(prefix="code_analysis_")
+    collected = MemorySink()
+    if sink is None and output_dir:
+        sink = FileSink(os.path.join(output_dir, "{analysis}.json"))
+    out = TeeSink(collected, sink)
     
     try:
-        # Copy uploaded files to working directory
-        for file_path in file_paths:
-            filename = os.path.basename(file_path)
-            shutil.copy2(file_path, os.path.join(work_dir, filename))
-        
-        # Run the three existing analysis functions on the working directory
-        aria_results = analyze_directory(work_dir, output_json=True, json_filename=os.path.join(work_dir, "aria.json"))
+        analyze_directory(root, output_json=True, json_filename=None, recursive=True, ignore=ignore, sink=out)
         
         # For alt tag analysis, create analyzer and run it
         alt_analyzer = ImageAltAnalyzer()
-        alt_analyzer.analyze_directory(work_dir, recursive=False)
-        alt_results = alt_analyzer.get_results_dict()
+        alt_analyzer.analyze_directory(root, recursive=True, ignore=ignore)
+        alt_analyzer.write_to(out)
         
         # Run nesting analysis
-        nesting_results = analyze_nesting_issues(work_dir, output_json=True, json_filename=os.path.join(work_dir, "nesting.json"))
+        analyze_nesting_issues(root, output_json=True, json_filename=None, recursive=True, ignore=ignore, sink=out)
         
         # Combine results
         return {
             "status": "success",
             "timestamp": datetime.now().isoformat(),
-            "aria_analysis": aria_results,
-            "alt_tag_analysis": alt_results,
-            "nesting_analysis": nesting_results
+            "aria_analysis": collected.results["aria"],
+            "alt_tag_analysis": collected.results["alt_tag"],
+            "nesting_analysis": collected.results["nesting"]
         }
         
     except Exception as e:
@@ -937,7 +1315,31 @@ def analyze_files(file_paths, tmp_dir):
             "status": "error",
             "message": f"Analysis failed: {str(e)}"
         }
+
+def analyze_files(file_paths, tmp_dir):
+    """
+    Entry point function for backend to analyze uploaded files
+    Uses existing analysis functions in this module
+    """
+    import tempfile
+    import shutil
+    
+    # Create a working directory and copy files there, keeping their folders
+    work_dir = tempfile.mkdtemp(prefix="code_analysis_")
+    tree_dir = os.path.join(work_dir, "tree")
+    
+    try:
+        for file_path in file_paths:
+            rel_path = os.path.relpath(file_path, tmp_dir)
+            if rel_path.startswith(os.pardir):
+                rel_path = os.path.basename(file_path)
+            dest_path = os.path.join(tree_dir, rel_path)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            shutil.copy2(file_path, dest_path)
+        
+        # Uploaded files were chosen explicitly, so nothing is ignored
+        return analyze_tree(tree_dir, ignore=())
     
     finally:
         # Cleanup working directory
-        shutil.rmtree(work_dir, ignore_errors=True)
\ No newline at end of file
+        shutil.rmtree(work_dir, ignore_errors=True)
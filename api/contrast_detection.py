@@ -1,13 +1,19 @@
 import cv2
 import numpy as np
-from typing import List, Tuple, Optional
-from playwright.sync_api import sync_playwright
+from typing import Iterator, List, Tuple, Optional
 from PIL import Image
 import tempfile
 import os
-import shutil
-import uuid
 import math
+import threading
+from contextlib import contextmanager
+from metrics import stage_timer, timed, CACHE_HITS_TOTAL, CACHE_MISSES_TOTAL
+import capture
+import image_output
+import inference
+import tiles
+from capture import capture_screenshot
+from pipeline import Pipeline, Stage
 
 
 # ---------------- Contrast helpers ----------------
@@ -28,9 +34,51 @@ def contrast_ratio(fg_rgb: np.ndarray, bg_rgb: np.ndarray) -> float:
     return (l1 + 0.05) / (l2 + 0.05)
 
 # ---------------- EAST loader + detector ----------------
+EAST_PATH = os.environ.get("EAST_MODEL_PATH", "frozen_east_text_detection.pb")
+
 def load_east(east_path: str):
-    net = cv2.dnn.readNet(east_path)
-    return net
+    """EAST net on the configured inference backend (see inference.py)"""
+    return inference.load(east_path)
+
+class EastPool:
+    """
+    Process-wide pool of loaded EAST nets. A net is not safe to use from two
+    threads at once, so each caller checks one out for the duration of its
+    forward passes; nets outlive the threads (and pipelines) that used them,
+    so requests after the first never load the model again.
+    """
+
+    def __init__(self):
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def net(self, east_path: str):
+        with self._lock:
+            idle = self._idle.setdefault(east_path, [])
+            net = idle.pop() if idle else None
+        if net is None:
+            CACHE_MISSES_TOTAL.inc(cache="east_net")
+            net = load_east(east_path)
+        else:
+            CACHE_HITS_TOTAL.inc(cache="east_net")
+        try:
+            yield net
+        finally:
+            with self._lock:
+                self._idle[east_path].append(net)
+
+    def warm(self, east_path: str, count: int = 1) -> int:
+        """Load nets until `count` are idle for `east_path`; returns how many were loaded"""
+        with self._lock:
+            missing = count - len(self._idle.setdefault(east_path, []))
+        nets = [load_east(east_path) for _ in range(max(0, missing))]
+        with self._lock:
+            self._idle[east_path].extend(nets)
+        return len(nets)
+
+
+east_pool = EastPool()
 
 def _resize_to_multiple_of_32(img: np.ndarray, max_dim: int = 1280) -> Tuple[np.ndarray, float, float]:
     H, W = img.shape[:2]
@@ -50,16 +98,20 @@ def _resize_to_multiple_of_32(img: np.ndarray, max_dim: int = 1280) -> Tuple[np.
 def detect_text_regions(image: np.ndarray, net, conf_threshold: float = 0.5, nms_threshold: float = 0.4) -> List[Tuple[int,int,int,int]]:
     """
     Returns boxes as (startX, startY, endX, endY) in coordinates relative to the input image.
-    `net` must be an already loaded EAST net (cv2.dnn.Net).
+    `net` must be an already loaded EAST net (see inference.load).
     """
     H, W = image.shape[:2]
     resized, rW, rH = _resize_to_multiple_of_32(image, max_dim=1280)  # tune max_dim if you want higher res
-    blob = cv2.dnn.blobFromImage(resized, 1.0, (resized.shape[1], resized.shape[0]),
-                                 (123.68, 116.78, 103.94), swapRB=True, crop=False)
-    net.setInput(blob)
-    layer_names = ["feature_fusion/Conv_7/Sigmoid", "feature_fusion/concat_3"]
-    scores, geometry = net.forward(layer_names)
+    net.setInput(inference.blob_from_image(resized))
+    with stage_timer("east_forward"):
+        scores, geometry = net.forward(inference.EAST_OUTPUTS)
 
+    with stage_timer("decode_nms"):
+        return _decode_boxes(scores, geometry, W, H, rW, rH, conf_threshold, nms_threshold)
+
+def _decode_boxes(scores, geometry, W: int, H: int, rW: float, rH: float,
+                  conf_threshold: float, nms_threshold: float) -> List[Tuple[int,int,int,int]]:
+    """Decode EAST score/geometry maps into NMS-filtered boxes in input image coordinates."""
     rects = []
     confidences = []
     numRows, numCols = scores.shape[2], scores.shape[3]
@@ -106,6 +158,7 @@ def detect_text_regions(image: np.ndarray, net, conf_threshold: float = 0.5, nms
     return boxes
 
 # ---------------- Splitting for tall images ----------------
+@timed("segmentation")
 def split_vertical_slices(image: np.ndarray, slice_aspect: float = 16/9) -> List[Tuple[int,int,np.ndarray]]:
     """Return list of (y0, y1, sub_img). If image isn't tall, returns single slice (0,H,image)."""
     H, W = image.shape[:2]
@@ -122,14 +175,18 @@ def split_vertical_slices(image: np.ndarray, slice_aspect: float = 16/9) -> List
     return slices
 
 # ---------------- Annotate + contrast calculation ----------------
-def annotate_contrast(image: np.ndarray, boxes: List[Tuple[int,int,int,int]], pad: int = 8, wcag_threshold: float = 4.5, max_boxes: int = 5) -> Tuple[np.ndarray, List[dict]]:
+@timed("contrast_scoring")
+def annotate_contrast(image: np.ndarray, boxes: List[Tuple[int,int,int,int]], pad: int = 8, wcag_threshold: float = 4.5, max_boxes: int = 5, draw: bool = True) -> Tuple[np.ndarray, List[dict]]:
     """
     Draws boxes and contrast ratio text directly on `image` copy and returns it plus a list of issues.
     Issues contain box coordinates and ratio if below `wcag_threshold`.
 
+    With draw=False nothing is copied or drawn: `image` is only read and returned as is,
+    for callers that send the issues as overlays instead.
+
     Only the first `max_boxes` boxes are analyzed and annotated to avoid overcrowding.
     """
-    out = image.copy()
+    out = image.copy() if draw else image
     H, W = out.shape[:2]
     issues = []
 
@@ -227,17 +284,18 @@ def annotate_contrast(image: np.ndarray, boxes: List[Tuple[int,int,int,int]], pa
 
         # Only annotate (draw rectangle + ratio text) when the ratio indicates a low-contrast issue.
         if ratio < wcag_threshold:
-            # Draw rectangle and ratio for failing boxes (red)
-            color_box = (0, 0, 255)
-            cv2.rectangle(out, (sx, sy), (ex, ey), color_box, 2)
-
-            text = f"{ratio:.2f}"
-            # choose text color for readability: black or white depending on background luminance
-            bg_lum = relative_luminance(bg_rgb)
-            txt_color = (0, 0, 0) if bg_lum > 0.5 else (255, 255, 255)
-            # Put text above the box if possible, else inside.
-            text_pos = (sx, sy - 8) if sy - 12 > 0 else (sx + 4, sy + 12)
-            # cv2.putText(out, text, text_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.45, txt_color, 1, cv2.LINE_AA)
+            if draw:
+                # Draw rectangle and ratio for failing boxes (red)
+                color_box = (0, 0, 255)
+                cv2.rectangle(out, (sx, sy), (ex, ey), color_box, 2)
+
+                text = f"{ratio:.2f}"
+                # choose text color for readability: black or white depending on background luminance
+                bg_lum = relative_luminance(bg_rgb)
+                txt_color = (0, 0, 0) if bg_lum > 0.5 else (255, 255, 255)
+                # Put text above the box if possible, else inside.
+                text_pos = (sx, sy - 8) if sy - 12 > 0 else (sx + 4, sy + 12)
+                # cv2.putText(out, text, text_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.45, txt_color, 1, cv2.LINE_AA)
 
             issues.append({
                 "x": int(sx), "y": int(sy), "w": int(ex-sx), "h": int(ey-sy),
@@ -247,18 +305,18 @@ def annotate_contrast(image: np.ndarray, boxes: List[Tuple[int,int,int,int]], pa
     return out, issues
 
 # ---------------- Main analyze function ----------------
-def analyze_contrast(image_path: str, east_path: str = "frozen_east_text_detection.pb"):
+def analyze_contrast(image_path: str, east_path: str = EAST_PATH):
     image = cv2.imread(image_path)
     if image is None:
         raise FileNotFoundError(f"Couldn't open image: {image_path}")
 
-    net = load_east(east_path)
     slices = split_vertical_slices(image, slice_aspect=16/9.0)
     boxes_global = []
 
     for (y0, y1, sub_img) in slices:
         # detect on the sub-image
-        boxes = detect_text_regions(sub_img, net, conf_threshold=0.5, nms_threshold=0.4)
+        with east_pool.net(east_path) as net:
+            boxes = detect_text_regions(sub_img, net, conf_threshold=0.5, nms_threshold=0.4)
         # offset them back to original coordinates
         for (sx, sy, ex, ey) in boxes:
             boxes_global.append((sx, sy + y0, ex, ey + y0))
@@ -269,37 +327,27 @@ def analyze_contrast(image_path: str, east_path: str = "frozen_east_text_detecti
 
 # --- Utilities to match legacy analyze_* API used by server.py ---
 
-# Directory under the Next.js app's public/ so files are served at /analysis_images/<file>
-PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
-PUBLIC_IMAGES_DIR = os.path.join(PROJECT_ROOT, 'web', 'public', 'analysis_images')
-os.makedirs(PUBLIC_IMAGES_DIR, exist_ok=True)
+# Published images are served by the API at /artifacts/<file> (see artifacts.py)
+PROJECT_ROOT = image_output.PROJECT_ROOT
+PUBLIC_IMAGES_DIR = image_output.PUBLIC_IMAGES_DIR
+
+def ensure_public_dir(public_dir: str = PUBLIC_IMAGES_DIR) -> str:
+    os.makedirs(public_dir, exist_ok=True)
+    return public_dir
 
 def _img_to_data_url(path: str) -> str:
     with open(path, 'rb') as f:
         import base64
         return 'data:image/png;base64,' + base64.b64encode(f.read()).decode('ascii')
 
-def save_to_public(src_path: str, public_dir: str = PUBLIC_IMAGES_DIR, prefix: str = 'annotated', prefer_jpeg: bool = False, jpeg_quality: int = 80) -> str:
-    ext = os.path.splitext(src_path)[1].lower()
-    if prefer_jpeg and ext not in ('.jpg', '.jpeg'):
-        out_ext = '.jpg'
-    else:
-        out_ext = ext if ext in ('.png', '.jpg', '.jpeg') else '.png'
-
-    name = f"{prefix}_{uuid.uuid4().hex}{out_ext}"
-    dst = os.path.join(public_dir, name)
-
-    try:
-        img = Image.open(src_path).convert('RGB')
-        if out_ext in ('.jpg', '.jpeg'):
-            img.save(dst, format='JPEG', quality=jpeg_quality, optimize=True)
-        else:
-            img.save(dst, format='PNG', optimize=True)
-    except Exception:
-        shutil.copy2(src_path, dst)
-
-    return f"/analysis_images/{name}"
+def save_to_public(src_path: str, public_dir: str = PUBLIC_IMAGES_DIR, policy: Optional[str] = None, codec: Optional[str] = None) -> str:
+    """Publish an image file under its content hash and return its URL (encodes in the foreground)"""
+    img = cv2.imread(src_path)
+    if img is None:
+        raise ValueError(f"Could not read image: {src_path}")
+    return image_output.publish_image(img, public_dir, policy=policy, codec=codec).url
 
+@timed("segmentation")
 def split_image_vertically(image_path: str, tmp_dir: str, max_height: int = 1080) -> List[str]:
     """
     Split an image vertically into segments each with height <= max_height.
@@ -322,82 +370,201 @@ def split_image_vertically(image_path: str, tmp_dir: str, max_height: int = 1080
         segments.append(seg_path)
     return segments
 
-def capture_screenshot(url: str, screenshot_path: str = "screenshot.png") -> str:
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.goto(url, timeout=30000)
-        page.screenshot(path=screenshot_path, full_page=True)
-        browser.close()
-    return screenshot_path
+# annotated: per-segment images with the boxes burned in (default)
+# overlay: one clean image per page, issues sent as page coordinates for the frontend to draw;
+#   opt-in until the dashboard viewer can scroll or tile a whole long page
+SCREENSHOT_MODE = os.environ.get("SCREENSHOT_MODE", "annotated").strip().lower()
+
+# Workers per pipeline stage; each inference worker checks its own net out of east_pool
+PIPELINE_WORKERS = {
+    "decode": int(os.environ.get("PIPELINE_DECODE_WORKERS", 1)),
+    "inference": int(os.environ.get("PIPELINE_INFERENCE_WORKERS", 1)),
+    "scoring": int(os.environ.get("PIPELINE_SCORING_WORKERS", 1)),
+    "encode": int(os.environ.get("PIPELINE_ENCODE_WORKERS", 2)),
+}
+
+def detect_boxes(img: np.ndarray, net) -> List[Tuple[int,int,int,int]]:
+    """EAST text boxes over 16:9 slices of `img`, in `img` coordinates"""
+    boxes_global = []
+    for (y0, y1, sub_img) in split_vertical_slices(img, slice_aspect=16/9.0):
+        boxes = detect_text_regions(sub_img, net, conf_threshold=0.5, nms_threshold=0.4)
+        for (sx, sy, ex, ey) in boxes:
+            boxes_global.append((sx, sy + y0, ex, ey + y0))
+    return boxes_global
 
-def analyze_url(url: str, tmp_dir: Optional[str] = None, max_segment_height: int = 1080, east_path: str = "frozen_east_text_detection.pb"):
-    if tmp_dir is None:
-        tmp_dir = tempfile.mkdtemp()
-    screenshot_path = os.path.join(tmp_dir, "screenshot.png")
-    capture_screenshot(url, screenshot_path)
+def detect_issues(img: np.ndarray, net, draw: bool = False) -> Tuple[np.ndarray, List[dict]]:
+    return annotate_contrast(img, detect_boxes(img, net), draw=draw)
 
-    segment_paths = split_image_vertically(screenshot_path, tmp_dir, max_height=max_segment_height)
+class PageJob:
+    """
+    A page image travelling through the pipeline; in overlay mode it is what
+    gets encoded. Progressively captured pages never enter the pipeline
+    themselves: their segments arrive one by one, each published on its own.
+    """
+    __slots__ = ("index", "title", "path", "progressive", "image", "width", "height", "segments", "published", "dzi_url")
+
+    def __init__(self, index: int, title: str, path: Optional[str] = None, progressive: bool = False):
+        self.index = index
+        self.title = title
+        self.path = path
+        self.progressive = progressive
+        self.image = None
+        self.width = self.height = self.segments = 0
+        self.published = None
+        self.dzi_url = None
+
+class SegmentJob:
+    """One max_segment_height band of a page: a view into the page array, or a captured clip still encoded as `data`"""
+    __slots__ = ("page", "index", "y0", "image", "data", "boxes", "issues", "published")
+
+    def __init__(self, page: PageJob, index: int, y0: int, image: Optional[np.ndarray] = None, data: Optional[bytes] = None):
+        self.page = page
+        self.index = index
+        self.y0 = y0
+        self.image = image
+        self.data = data
+        self.boxes = None
+        self.issues = []
+        self.published = None
+
+def contrast_pipeline(east_path: str = EAST_PATH, max_segment_height: int = 1080, mode: Optional[str] = None) -> Pipeline:
+    """
+    decode -> inference -> scoring -> encode over PageJobs. Decoding fans a
+    page out into SegmentJobs (and, in overlay mode, the page itself, which
+    passes straight through to be encoded while its segments are analyzed).
+    Captured SegmentJobs can be fed in directly; they are decoded from `data`.
+    """
+    annotated = (mode or SCREENSHOT_MODE) == "annotated"
+
+    def decode(page):
+        if isinstance(page, SegmentJob):
+            with stage_timer("image_decode"):
+                page.image = cv2.imdecode(np.frombuffer(page.data, np.uint8), cv2.IMREAD_COLOR)
+            page.data = None
+            return [page] if page.image is not None else []
+        with stage_timer("image_decode"):
+            image = cv2.imread(page.path)
+        if image is None:
+            return []
+        H, W = image.shape[:2]
+        page.width, page.height = W, H
+        page.segments = max(1, math.ceil(H / max_segment_height))
+        jobs = [SegmentJob(page, i + 1, i * max_segment_height, image[i * max_segment_height:(i + 1) * max_segment_height])
+                for i in range(page.segments)]
+        if not annotated:
+            page.image = image
+            jobs.insert(0, page)
+        return jobs
+
+    def inference(job):
+        if isinstance(job, SegmentJob):
+            with east_pool.net(east_path) as net:
+                job.boxes = detect_boxes(job.image, net)
+        return job
+
+    def scoring(job):
+        if isinstance(job, SegmentJob):
+            out, job.issues = annotate_contrast(job.image, job.boxes, draw=annotated)
+            job.image = out if annotated or job.page.progressive else None
+        return job
+
+    def encode(job):
+        if isinstance(job, PageJob):
+            job.published = image_output.publish_image(job.image)
+            job.dzi_url = tiles.register(tiles.image_id_for(job.published), job.image)
+            job.image = None
+        elif annotated or job.page.progressive:
+            job.published = image_output.publish_image(job.image)
+            job.image = None
+        return job
+
+    return Pipeline([
+        Stage("decode", decode, PIPELINE_WORKERS["decode"], fanout=True),
+        Stage("inference", inference, PIPELINE_WORKERS["inference"]),
+        Stage("scoring", scoring, PIPELINE_WORKERS["scoring"]),
+        Stage("encode", encode, PIPELINE_WORKERS["encode"]),
+    ])
+
+def screenshot_entries(pages: List[PageJob], segments: List[SegmentJob]) -> List[dict]:
+    """Screenshot entries in page/segment order from the finished jobs"""
+    segments = sorted(segments, key=lambda s: (s.page.index, s.index))
     screenshots = []
-
-    net = load_east(east_path)
-
-    for idx, seg_path in enumerate(segment_paths, start=1):
-        img = cv2.imread(seg_path)
-        if img is None:
+    for page in sorted(pages, key=lambda p: p.index):
+        if page.progressive:
+            continue
+        issues = []
+        for seg in segments:
+            if seg.page is not page:
+                continue
+            for issue in seg.issues:
+                issue["y"] += seg.y0
+                issue["segment"] = seg.index
+            issues.extend(seg.issues)
+        screenshots.append({"url": page.published.url, "tiles": page.dzi_url, "title": page.title,
+                            "width": page.width, "height": page.height, "segments": page.segments, "issues": issues})
+    # annotated mode and progressive captures: one entry per segment image
+    whole_pages = {id(page) for page in pages if not page.progressive}
+    for seg in segments:
+        if id(seg.page) in whole_pages:
             continue
-        # detect boxes
-        slices = split_vertical_slices(img, slice_aspect=16/9.0)
-        boxes_global = []
-        for (y0, y1, sub_img) in slices:
-            boxes = detect_text_regions(sub_img, net, conf_threshold=0.5, nms_threshold=0.4)
-            for (sx, sy, ex, ey) in boxes:
-                boxes_global.append((sx, sy + y0, ex, ey + y0))
-
-        annotated, issues = annotate_contrast(img, boxes_global)
-        out_path = os.path.join(tmp_dir, f"annotated_part{idx}.png")
-        cv2.imwrite(out_path, annotated)
-        public_url = save_to_public(out_path, prefix=f"mainpage_part{idx}")
         screenshots.append({
-            "url": public_url,
-            "title": f"Main Page (part {idx}/{len(segment_paths)})",
-            "issues": issues
+            "url": seg.published.url,
+            "title": f"{seg.page.title} (part {seg.index}/{seg.page.segments})",
+            "issues": seg.issues
         })
+    return screenshots
 
-    return {"files": [], "screenshots": screenshots, "aria": {}, "altText": {}, "structure": {}}
+def analyze_pages(pages: List[PageJob], east_path: str = EAST_PATH, max_segment_height: int = 1080, mode: Optional[str] = None) -> List[dict]:
+    done_pages, done_segments = [], []
+    for job in contrast_pipeline(east_path, max_segment_height, mode).run(pages):
+        (done_pages if isinstance(job, PageJob) else done_segments).append(job)
+    return screenshot_entries(done_pages, done_segments)
+
+def iter_url_segments(url: str, max_segment_height: int = 1080, east_path: str = EAST_PATH, mode: Optional[str] = None,
+                      profile: Optional[str] = None, report: Optional[dict] = None,
+                      snapshot: Optional[str] = None) -> Iterator[SegmentJob]:
+    """
+    Capture `url` clip by clip and yield each analyzed (and published) segment
+    as soon as it is done, while later clips are still being captured.
+    `report` (a dict) receives the capture report.
+    """
+    page = PageJob(0, "Main Page", progressive=True)
+    capture_profile = capture.get_profile(profile)
+
+    def clips():
+        captured = capture.capture_clips(url, clip_height=max_segment_height, profile=capture_profile, report=report,
+                                        snapshot=snapshot)
+        for index, (y0, png) in enumerate(captured, start=1):
+            page.segments = index
+            yield SegmentJob(page, index, y0, data=png)
+
+    yield from contrast_pipeline(east_path, max_segment_height, mode).run(clips())
+
+def analyze_url(url: str, tmp_dir: Optional[str] = None, max_segment_height: int = 1080, east_path: str = EAST_PATH, mode: Optional[str] = None,
+                capture_mode: Optional[str] = None, profile: Optional[str] = None, snapshot: Optional[str] = None):
+    """
+    `profile` names a capture profile and `snapshot` a snapshot mode (see
+    capture.py); the result's "capture" key reports what was blocked and
+    whether the page was recorded or replayed.
+    """
+    report = {}
+    if (capture_mode or capture.CAPTURE_MODE) == "progressive":
+        segments = list(iter_url_segments(url, max_segment_height, east_path, mode, profile, report, snapshot))
+        screenshots = screenshot_entries([], segments)
+        return {"files": [], "screenshots": screenshots, "aria": {}, "altText": {}, "structure": {}, "capture": report}
 
-def analyze_files(file_paths: List[str], tmp_dir: Optional[str] = None, max_segment_height: int = 1080, east_path: str = "frozen_east_text_detection.pb"):
     if tmp_dir is None:
         tmp_dir = tempfile.mkdtemp()
-    screenshots = []
-    all_files = []
+    screenshot_path = os.path.join(tmp_dir, "screenshot.png")
+    capture_screenshot(url, screenshot_path, profile=capture.get_profile(profile), report=report, snapshot=snapshot)
 
-    net = load_east(east_path)
+    screenshots = analyze_pages([PageJob(0, "Main Page", screenshot_path)], east_path, max_segment_height, mode)
+    return {"files": [], "screenshots": screenshots, "aria": {}, "altText": {}, "structure": {}, "capture": report}
 
-    for p in file_paths:
-        seg_paths = split_image_vertically(p, tmp_dir, max_height=max_segment_height)
-        for idx, seg in enumerate(seg_paths, start=1):
-            img = cv2.imread(seg)
-            if img is None:
-                continue
-            slices = split_vertical_slices(img, slice_aspect=16/9.0)
-            boxes_global = []
-            for (y0, y1, sub_img) in slices:
-                boxes = detect_text_regions(sub_img, net, conf_threshold=0.5, nms_threshold=0.4)
-                for (sx, sy, ex, ey) in boxes:
-                    boxes_global.append((sx, sy + y0, ex, ey + y0))
-
-            annotated, issues = annotate_contrast(img, boxes_global)
-            out_name = f"annotated_{os.path.splitext(os.path.basename(p))[0]}_part{idx}.png"
-            out_path = os.path.join(tmp_dir, out_name)
-            cv2.imwrite(out_path, annotated)
-            public_url = save_to_public(out_path, prefix=f"{os.path.splitext(os.path.basename(p))[0]}_part{idx}")
-            screenshots.append({
-                "url": public_url,
-                "title": f"{os.path.basename(p)} (part {idx}/{len(seg_paths)})",
-                "issues": issues
-            })
-        all_files.append(os.path.basename(p))
+def analyze_files(file_paths: List[str], tmp_dir: Optional[str] = None, max_segment_height: int = 1080, east_path: str = EAST_PATH, mode: Optional[str] = None):
+    pages = [PageJob(i, os.path.basename(p), p) for i, p in enumerate(file_paths)]
+    screenshots = analyze_pages(pages, east_path, max_segment_height, mode)
+    all_files = [os.path.basename(p) for p in file_paths]
     return {"files": all_files, "screenshots": screenshots, "aria": {}, "altText": {}, "structure": {}}
 
 # ---------------- Example usage ----------------
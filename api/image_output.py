@@ -0,0 +1,197 @@
+"""
+Encoding and publishing of annotated screenshots.
+
+Images are encoded straight from the in-memory BGR array with cv2.imencode
+(no temp PNG, no Pillow round trip) on the calling thread. In the analysis
+pipeline that is the encode stage (PIPELINE_ENCODE_WORKERS threads, see
+contrast_detection.py), so the next segment's text detection runs while the
+previous one is being compressed.
+
+Published names are content hashes of the pixels plus the encoding settings
+(`/artifacts/<hash>.webp`): the same image always gets the same URL, an
+image that is already on disk is not encoded again, and the files can be
+served with a long-lived cache policy. Old images are expired and evicted by
+the artifacts sweeper.
+
+Policies (IMAGE_POLICY):
+    latency    JPEG; a few ms per segment, largest lossy files
+    balanced   lossy WebP (default)
+    size       AVIF when OpenCV was built with it, lossy WebP otherwise or
+               when the image is larger than IMAGE_AVIF_MAX_PIXELS
+    lossless   lossless WebP (re-encoded lossy when over IMAGE_LOSSLESS_MAX_BYTES),
+               or PNG without WebP support
+
+Images too tall for WebP/AVIF (over 16383px, e.g. a whole long page) fall
+back to JPEG, then PNG.
+
+Environment:
+    IMAGE_POLICY               one of the policies above (default balanced)
+    IMAGE_CODEC                force a codec: webp, webp_lossless, avif, jpeg or png
+    IMAGE_WEBP_QUALITY         lossy WebP quality 1-100 (default 80)
+    IMAGE_AVIF_QUALITY         AVIF quality 0-100 (default 60)
+    IMAGE_AVIF_SPEED           AVIF encoder speed 0-10 (default 8)
+    IMAGE_JPEG_QUALITY         JPEG quality 0-100 (default 80)
+    IMAGE_AVIF_MAX_PIXELS      largest image the size policy encodes as AVIF (default 4000000)
+    IMAGE_LOSSLESS_MAX_BYTES   lossless output over this is re-encoded lossy (default 2000000; 0 disables)
+"""
+import hashlib
+import os
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+import artifacts
+from log_config import get_logger
+from metrics import CACHE_HITS_TOTAL, CACHE_MISSES_TOTAL, ERRORS_TOTAL, stage_timer
+
+logger = get_logger("image_output")
+
+PROJECT_ROOT = artifacts.PROJECT_ROOT
+PUBLIC_IMAGES_DIR = artifacts.PUBLISHED_DIR
+
+POLICIES = ("latency", "balanced", "size", "lossless")
+
+POLICY = os.environ.get("IMAGE_POLICY", "balanced").strip().lower()
+FORCED_CODEC = os.environ.get("IMAGE_CODEC", "").strip().lower() or None
+WEBP_QUALITY = int(os.environ.get("IMAGE_WEBP_QUALITY", 80))
+AVIF_QUALITY = int(os.environ.get("IMAGE_AVIF_QUALITY", 60))
+AVIF_SPEED = int(os.environ.get("IMAGE_AVIF_SPEED", 8))
+JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", 80))
+AVIF_MAX_PIXELS = int(os.environ.get("IMAGE_AVIF_MAX_PIXELS", 4_000_000))
+LOSSLESS_MAX_BYTES = int(os.environ.get("IMAGE_LOSSLESS_MAX_BYTES", 2_000_000))
+
+
+class Codec(NamedTuple):
+    name: str
+    ext: str
+    params: tuple
+
+
+def _codecs():
+    codecs = {
+        # cv2 switches WebP to lossless for quality > 100
+        "webp": Codec("webp", ".webp", (cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY)),
+        "webp_lossless": Codec("webp_lossless", ".webp", (cv2.IMWRITE_WEBP_QUALITY, 101)),
+        "jpeg": Codec("jpeg", ".jpg", (cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY, cv2.IMWRITE_JPEG_OPTIMIZE, 1)),
+        "png": Codec("png", ".png", (cv2.IMWRITE_PNG_COMPRESSION, 3)),
+    }
+    if hasattr(cv2, "IMWRITE_AVIF_QUALITY"):  # OpenCV >= 4.11
+        codecs["avif"] = Codec("avif", ".avif", (cv2.IMWRITE_AVIF_QUALITY, AVIF_QUALITY, cv2.IMWRITE_AVIF_SPEED, AVIF_SPEED))
+    return codecs
+
+
+CODECS = _codecs()
+
+# Largest width/height each format can store (a long full-page screenshot easily passes 16383px)
+MAX_DIMENSION = {"webp": 16383, "webp_lossless": 16383, "avif": 16384, "jpeg": 65500}
+
+_writer_support = {}
+
+
+def codec_available(name: str) -> bool:
+    """Whether this OpenCV build can encode `name`"""
+    codec = CODECS.get(name)
+    if codec is None:
+        return False
+    if codec.ext not in _writer_support:
+        try:
+            _writer_support[codec.ext] = bool(cv2.haveImageWriter(codec.ext))
+        except cv2.error:
+            _writer_support[codec.ext] = False
+    return _writer_support[codec.ext]
+
+
+def codec_fits(name: str, image: np.ndarray) -> bool:
+    limit = MAX_DIMENSION.get(name)
+    return limit is None or max(image.shape[:2]) <= limit
+
+
+def choose_codec(image: np.ndarray, policy: Optional[str] = None, codec: Optional[str] = None) -> Codec:
+    """Codec for `image` under `policy`; an explicit (or IMAGE_CODEC) codec wins when available"""
+    codec = codec or FORCED_CODEC
+    if codec:
+        if codec_available(codec) and codec_fits(codec, image):
+            return CODECS[codec]
+        logger.warning("Image codec %s not usable for a %sx%s image, using policy", codec, image.shape[1], image.shape[0])
+
+    policy = (policy or POLICY).lower()
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown image policy {policy!r}; expected one of {', '.join(POLICIES)}")
+
+    pixels = image.shape[0] * image.shape[1]
+    if policy == "latency":
+        order = ("jpeg", "png")
+    elif policy == "size":
+        order = ("avif", "webp", "jpeg") if pixels <= AVIF_MAX_PIXELS else ("webp", "jpeg")
+    elif policy == "lossless":
+        order = ("webp_lossless", "png")
+    else:
+        order = ("webp", "jpeg")
+    for name in order:
+        if codec_available(name) and codec_fits(name, image):
+            return CODECS[name]
+    return CODECS["jpeg"] if codec_fits("jpeg", image) else CODECS["png"]
+
+
+def content_hash(image: np.ndarray, codec: Codec) -> str:
+    """Stable name for `image` encoded with `codec`"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{image.shape}|{image.dtype}|{codec.name}|{codec.params}".encode())
+    h.update(np.ascontiguousarray(image).data)
+    return h.hexdigest()
+
+
+def encode(image: np.ndarray, codec: Codec) -> bytes:
+    ok, buf = cv2.imencode(codec.ext, image, list(codec.params))
+    if not ok:
+        raise ValueError(f"cv2.imencode failed for {codec.name}")
+    return buf.tobytes()
+
+
+class PublishedImage(NamedTuple):
+    """URL of an image that is on disk at `path`"""
+    url: str
+    path: str
+    codec: str
+
+
+def _encode_to(image: np.ndarray, codec: Codec, path: str) -> str:
+    with stage_timer("image_encode"):
+        data = encode(image, codec)
+        if codec.name == "webp_lossless" and LOSSLESS_MAX_BYTES and len(data) > LOSSLESS_MAX_BYTES:
+            # Same container, so the name (and the URL already handed out) stays valid
+            logger.debug("Lossless image over budget, re-encoding lossy",
+                         extra={"fields": {"bytes": len(data), "path": path}})
+            data = encode(image, CODECS["webp"])
+        artifacts.write_atomic(path, data)
+    return path
+
+
+def _encode_job(image: np.ndarray, codec: Codec, path: str) -> str:
+    try:
+        return _encode_to(image, codec, path)
+    except Exception as e:
+        ERRORS_TOTAL.inc(stage="image_encode")
+        logger.error("Image encode failed: %s", e, exc_info=e, extra={"fields": {"path": path}})
+        raise
+
+
+def publish_image(image: np.ndarray, public_dir: str = PUBLIC_IMAGES_DIR, policy: Optional[str] = None,
+                  codec: Optional[str] = None) -> PublishedImage:
+    """Encode and publish a BGR image under its content hash (skipped when it is already on disk)"""
+    chosen = choose_codec(image, policy, codec)
+    name = content_hash(image, chosen) + chosen.ext
+    os.makedirs(public_dir, exist_ok=True)
+    path = os.path.join(public_dir, name)
+    url = artifacts.url_for(name)
+
+    if os.path.exists(path):
+        CACHE_HITS_TOTAL.inc(cache="published_image")
+        artifacts.published.touch(path)
+        return PublishedImage(url, path, chosen.name)
+    CACHE_MISSES_TOTAL.inc(cache="published_image")
+
+    _encode_job(image, chosen, path)
+    return PublishedImage(url, path, chosen.name)
+
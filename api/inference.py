@@ -0,0 +1,264 @@
+"""
+Inference backends for the EAST text detector.
+
+`load(path)` returns a net with the two cv2.dnn.Net calls detect_text_regions
+makes, `setInput(blob)` and `forward(layer_names)`, so backends can be swapped
+without touching detection. `forward` always returns (scores, geometry) as
+float32 NCHW arrays, whatever layout or precision the model computes in.
+
+    opencv        cv2.dnn with a chosen backend and target; reads the
+                  TensorFlow .pb (the FP32 reference) or an ONNX export
+    onnxruntime   ONNX Runtime on the CPU; reads FP32, FP16 or INT8 (QDQ)
+                  ONNX exports
+
+Lower-precision variants are separate model files. Export the .pb to ONNX
+once, then derive the others from it:
+
+    python -m tf2onnx.convert --graphdef frozen_east_text_detection.pb \\
+        --inputs input_images:0 --inputs-as-nchw input_images:0 \\
+        --outputs feature_fusion/Conv_7/Sigmoid:0,feature_fusion/concat_3:0 \\
+        --output east.onnx
+    python inference.py fp16 east.onnx east_fp16.onnx
+    python inference.py int8 east.onnx east_int8.onnx --calibration static_images
+
+INT8 uses static QDQ quantization calibrated on real screenshots,
+preprocessed exactly like analysis input. Before switching, compare a
+variant's latency and box recall against the FP32 path on the same inputs:
+
+    python benchmark.py --suite inference \\
+        --east-variants "ort_fp32=onnxruntime:east.onnx,int8=onnxruntime:east_int8.onnx"
+
+onnxruntime is optional, and only needed for that backend. onnx and
+onnxconverter-common are only needed to export variants.
+
+Environment:
+    EAST_BACKEND       opencv or onnxruntime (default opencv)
+    EAST_DNN_BACKEND   OpenCV backend: default, opencv, openvino, cuda, vulkan, ... (default default)
+    EAST_DNN_TARGET    OpenCV target: cpu, cpu_fp16, opencl, opencl_fp16, cuda, cuda_fp16, vulkan, ... (default cpu)
+    EAST_ORT_THREADS   intra-op threads per ONNX Runtime session (default 0 = ONNX Runtime decides)
+"""
+import argparse
+import os
+import sys
+from typing import List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+BACKEND = os.environ.get("EAST_BACKEND", "opencv").strip().lower()
+DNN_BACKEND = os.environ.get("EAST_DNN_BACKEND", "default").strip().lower()
+DNN_TARGET = os.environ.get("EAST_DNN_TARGET", "cpu").strip().lower()
+ORT_THREADS = int(os.environ.get("EAST_ORT_THREADS", 0))
+
+BACKENDS = ("opencv", "onnxruntime")
+
+# Output layers of the TensorFlow graph: score map, then geometry
+EAST_OUTPUTS = ["feature_fusion/Conv_7/Sigmoid", "feature_fusion/concat_3"]
+EAST_MEAN = (123.68, 116.78, 103.94)
+
+# Names for cv2.dnn constants; not every build has all of them
+DNN_BACKENDS = {
+    "default": "DNN_BACKEND_DEFAULT",
+    "opencv": "DNN_BACKEND_OPENCV",
+    "openvino": "DNN_BACKEND_INFERENCE_ENGINE",
+    "cuda": "DNN_BACKEND_CUDA",
+    "vulkan": "DNN_BACKEND_VKCOM",
+    "webnn": "DNN_BACKEND_WEBNN",
+    "timvx": "DNN_BACKEND_TIMVX",
+    "cann": "DNN_BACKEND_CANN",
+}
+DNN_TARGETS = {
+    "cpu": "DNN_TARGET_CPU",
+    "cpu_fp16": "DNN_TARGET_CPU_FP16",
+    "opencl": "DNN_TARGET_OPENCL",
+    "opencl_fp16": "DNN_TARGET_OPENCL_FP16",
+    "cuda": "DNN_TARGET_CUDA",
+    "cuda_fp16": "DNN_TARGET_CUDA_FP16",
+    "vulkan": "DNN_TARGET_VULKAN",
+    "npu": "DNN_TARGET_NPU",
+}
+
+
+def _dnn_constant(table: dict, name: str, kind: str) -> int:
+    attr = table.get(name)
+    value = getattr(cv2.dnn, attr, None) if attr else None
+    if value is None:
+        available = [n for n, a in table.items() if hasattr(cv2.dnn, a)]
+        raise ValueError(f"Unknown or unsupported DNN {kind} {name!r}; this OpenCV build has {', '.join(available)}")
+    return value
+
+
+def blob_from_image(resized: np.ndarray) -> np.ndarray:
+    """NCHW float32 EAST input for a BGR image already sized to multiples of 32"""
+    return cv2.dnn.blobFromImage(resized, 1.0, (resized.shape[1], resized.shape[0]), EAST_MEAN, swapRB=True, crop=False)
+
+
+def _as_nchw(output) -> np.ndarray:
+    output = np.asarray(output, dtype=np.float32)
+    # EAST maps have 1 (score) or 5 (geometry) channels; move them first if the export kept NHWC
+    if output.shape[1] not in (1, 5) and output.shape[-1] in (1, 5):
+        output = output.transpose(0, 3, 1, 2)
+    return output
+
+
+def _scores_geometry(outputs) -> Tuple[np.ndarray, np.ndarray]:
+    scores, geometry = sorted((_as_nchw(o) for o in outputs), key=lambda o: o.shape[1])
+    return scores, geometry
+
+
+class OpenCVEAST:
+    """cv2.dnn net on a chosen backend/target"""
+
+    def __init__(self, path: str, dnn_backend: str = DNN_BACKEND, dnn_target: str = DNN_TARGET):
+        self.name = f"opencv/{dnn_backend}/{dnn_target}"
+        self.net = cv2.dnn.readNet(path)
+        self.net.setPreferableBackend(_dnn_constant(DNN_BACKENDS, dnn_backend, "backend"))
+        self.net.setPreferableTarget(_dnn_constant(DNN_TARGETS, dnn_target, "target"))
+        # The TensorFlow graph has named layers; an ONNX export only has its graph outputs
+        layers = set(self.net.getLayerNames())
+        if all(name in layers for name in EAST_OUTPUTS):
+            self.outputs = list(EAST_OUTPUTS)
+        else:
+            self.outputs = list(self.net.getUnconnectedOutLayersNames())
+
+    def setInput(self, blob: np.ndarray) -> None:
+        self.net.setInput(blob)
+
+    def forward(self, layer_names=None) -> Tuple[np.ndarray, np.ndarray]:
+        return _scores_geometry(self.net.forward(self.outputs))
+
+
+class OnnxRuntimeEAST:
+    """ONNX Runtime CPU session; adapts the blob to the model's input layout and precision"""
+
+    def __init__(self, path: str, threads: int = ORT_THREADS):
+        import onnxruntime as ort
+        self.name = "onnxruntime/cpu"
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        shape = model_input.shape
+        self.nhwc = len(shape) == 4 and shape[-1] == 3 and shape[1] != 3
+        self.input_dtype = np.float16 if model_input.type == "tensor(float16)" else np.float32
+        self._blob = None
+
+    def setInput(self, blob: np.ndarray) -> None:
+        if self.nhwc:
+            blob = blob.transpose(0, 2, 3, 1)
+        self._blob = np.ascontiguousarray(blob, dtype=self.input_dtype)
+
+    def forward(self, layer_names=None) -> Tuple[np.ndarray, np.ndarray]:
+        return _scores_geometry(self.session.run(None, {self.input_name: self._blob}))
+
+
+def load(path: str, backend: Optional[str] = None, dnn_backend: Optional[str] = None, dnn_target: Optional[str] = None):
+    """An EAST net for `path` on `backend` (default EAST_BACKEND)"""
+    backend = (backend or BACKEND).lower()
+    if backend == "opencv":
+        return OpenCVEAST(path, dnn_backend or DNN_BACKEND, dnn_target or DNN_TARGET)
+    if backend == "onnxruntime":
+        return OnnxRuntimeEAST(path)
+    raise ValueError(f"Unknown EAST backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+
+# ---------------- Variants ----------------
+class Variant(NamedTuple):
+    name: str
+    backend: str
+    path: str
+    dnn_backend: Optional[str] = None
+    dnn_target: Optional[str] = None
+
+    def load(self):
+        return load(self.path, self.backend, self.dnn_backend, self.dnn_target)
+
+
+def parse_variants(text: str) -> List[Variant]:
+    """
+    Parse "name=backend[/dnn_backend/dnn_target]:path,..." e.g.
+    "int8=onnxruntime:east_int8.onnx,cpu16=opencv/default/cpu_fp16:frozen_east_text_detection.pb"
+    """
+    variants = []
+    for item in (part.strip() for part in text.split(",")):
+        if not item:
+            continue
+        name, sep, rest = item.partition("=")
+        engine, sep2, path = rest.partition(":")
+        if not sep or not sep2 or not name or not path:
+            raise ValueError(f"Bad EAST variant {item!r}; expected name=backend[/dnn_backend/dnn_target]:path")
+        parts = engine.lower().split("/")
+        if parts[0] not in BACKENDS or len(parts) not in (1, 3):
+            raise ValueError(f"Bad EAST variant engine {engine!r} in {item!r}")
+        dnn_backend, dnn_target = parts[1:] if len(parts) == 3 else (None, None)
+        variants.append(Variant(name.strip(), parts[0], path.strip(), dnn_backend, dnn_target))
+    return variants
+
+
+# ---------------- Exporting FP16 / INT8 models ----------------
+def convert_fp16(src: str, dst: str) -> str:
+    """FP16 copy of an FP32 ONNX model; inputs and outputs stay float32"""
+    import onnx
+    from onnxconverter_common import float16
+    model = float16.convert_float_to_float16(onnx.load(src), keep_io_types=True)
+    onnx.save(model, dst)
+    return dst
+
+
+def _calibration_blobs(src: str, image_dir: str, max_images: int):
+    import contrast_detection
+    net = OnnxRuntimeEAST(src)
+    names = sorted(n for n in os.listdir(image_dir) if n.lower().endswith((".png", ".jpg", ".jpeg", ".webp")))
+    for name in names[:max_images]:
+        image = cv2.imread(os.path.join(image_dir, name))
+        if image is None:
+            continue
+        # The same 16:9 slices and resizing the analysis feeds the model
+        for _y0, _y1, sub in contrast_detection.split_vertical_slices(image):
+            resized, _, _ = contrast_detection._resize_to_multiple_of_32(sub)
+            net.setInput(blob_from_image(resized))
+            yield {net.input_name: net._blob}
+
+
+def quantize_int8(src: str, dst: str, image_dir: str, max_images: int = 32) -> str:
+    """Static INT8 (QDQ, per-channel weights) copy of an FP32 ONNX model, calibrated on screenshots in `image_dir`"""
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.blobs = _calibration_blobs(src, image_dir, max_images)
+
+        def get_next(self):
+            return next(self.blobs, None)
+
+    quantize_static(src, dst, Reader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    return dst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export FP16 / INT8 variants of an EAST ONNX model")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fp16 = sub.add_parser("fp16", help="Convert weights and compute to float16")
+    fp16.add_argument("src")
+    fp16.add_argument("dst")
+    int8 = sub.add_parser("int8", help="Static INT8 quantization calibrated on screenshots")
+    int8.add_argument("src")
+    int8.add_argument("dst")
+    int8.add_argument("--calibration", required=True, metavar="DIR", help="Directory of page screenshots")
+    int8.add_argument("--max-images", type=int, default=32, help="Screenshots used for calibration (default 32)")
+    args = parser.parse_args(argv)
+
+    if args.command == "fp16":
+        out = convert_fp16(args.src, args.dst)
+    else:
+        out = quantize_int8(args.src, args.dst, args.calibration, args.max_images)
+    print(f"Wrote {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
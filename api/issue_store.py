@@ -0,0 +1,246 @@
+"""
+Compact in-memory form of code analysis findings.
+
+Checks return `__slots__` records instead of dicts: type strings and file
+names are interned, and a check locates code through one SourceText per file
+(a line index built once) instead of re-splitting the text. A record keeps
+its line and the short strings its JSON needs, cut out when it is created
+and capped at SNIPPET_LIMIT - never the SourceText - so a file's content is
+freed as soon as the file has been checked. The JSON dict the API returns is only built when a
+record is serialized - pass `to_json` as the `default` hook of json.dumps, or
+call `materialize`.
+
+Records still answer `issue["type"]`-style reads, so code written against
+the old dicts keeps working. Findings restored from the incremental manifest
+are plain dicts and pass through unchanged.
+
+Only the standard library is used so the standalone scripts can import it.
+"""
+import functools
+import re
+import sys
+from abc import ABC, abstractmethod
+from array import array
+
+SNIPPET_LIMIT = 200
+
+# Elements that never have a closing tag
+_VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+})
+_START_TAG_RE = re.compile(r"""<[^\s/>]+(?:"[^"]*"|'[^']*'|[^'">])*>""")
+
+
+def snippet(text, limit=SNIPPET_LIMIT):
+    text = text.strip()
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+class SourceText:
+    """A file's content plus a line-start index built on first use."""
+    __slots__ = ("text", "_line_starts")
+
+    def __init__(self, text):
+        self.text = text
+        self._line_starts = None
+
+    def _starts(self):
+        if self._line_starts is None:
+            starts = array("q", [0])
+            find = self.text.find
+            i = find("\n")
+            while i != -1:
+                starts.append(i + 1)
+                i = find("\n", i + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    def offset(self, line, column=0):
+        """Offset of 1-based `line` and 0-based `column`"""
+        starts = self._starts()
+        return starts[min(max(line, 1), len(starts)) - 1] + column
+
+    def line_span(self, line):
+        starts = self._starts()
+        if not 1 <= line <= len(starts):
+            return 0, 0
+        end = starts[line] - 1 if line < len(starts) else len(self.text)
+        return starts[line - 1], end
+
+    def line_text(self, line):
+        start, end = self.line_span(line)
+        return self.text[start:end]
+
+
+@functools.lru_cache(maxsize=64)
+def _tag_re(name):
+    return re.compile(r"<(/?)%s(?=[\s/>])" % re.escape(name), re.IGNORECASE)
+
+
+def element_span(source, tag):
+    """
+    (start, end) of a BeautifulSoup tag in `source`, from its sourceline and
+    sourcepos, or None when the parser did not record a position. Unclosed
+    elements span just their start tag.
+    """
+    if tag.sourceline is None:
+        return None
+    text = source.text
+    start = source.offset(tag.sourceline, tag.sourcepos or 0)
+    start_tag = _START_TAG_RE.match(text, start)
+    if start_tag is None:
+        return None
+    end = start_tag.end()
+    if tag.name in _VOID_ELEMENTS or text[end - 2] == '/':
+        return start, end
+    depth = 1
+    for match in _tag_re(tag.name).finditer(text, end):
+        if not match.group(1):
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 0:
+            close = text.find('>', match.end())
+            return start, (close + 1 if close != -1 else len(text))
+    return start, end
+
+
+class Finding(ABC):
+    """
+    One finding: an interned type and a line. Subclasses take `source` as a
+    SourceText with the finding's (start, end) span, or as a literal string
+    for scanners that only have a short snippet, and keep just the text their
+    JSON needs.
+    """
+    __slots__ = ("type", "line")
+
+    def __init__(self, type, line):
+        self.type = sys.intern(type)
+        self.line = line
+
+    @abstractmethod
+    def to_json(self):
+        """The JSON-ready value the API returns for this finding"""
+
+    def __getitem__(self, key):
+        # Dict-style reads for code written against the old issue dicts
+        if key in ("type", "line"):
+            return getattr(self, key)
+        return self.to_json()[key]
+
+    def __eq__(self, other):
+        if isinstance(other, Finding):
+            return type(self) is type(other) and self.to_json() == other.to_json()
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.type!r}, line={self.line})"
+
+
+def _code(source, start, end):
+    return source.text[start:end] if isinstance(source, SourceText) else source
+
+
+class NestingIssue(Finding):
+    """Nesting check result: {type, line, message, code}"""
+    __slots__ = ("message", "code")
+
+    def __init__(self, type, line, message, source, start=0, end=0):
+        super().__init__(type, line)
+        self.message = message
+        code = _code(source, start, end)
+        self.code = snippet(code) if isinstance(source, SourceText) else code
+
+    def to_json(self):
+        return {"type": self.type, "line": self.line, "message": self.message, "code": self.code}
+
+
+class AriaFinding(Finding):
+    """Element missing an aria label: {type, html, context}"""
+    __slots__ = ("html", "context")
+
+    def __init__(self, type, line, source, start=0, end=0):
+        super().__init__(type, line)
+        self.html = snippet(_code(source, start, end))
+        if isinstance(source, SourceText):
+            self.context = f"Line {line}: {snippet(source.line_text(line))}"
+        else:
+            self.context = f"Element: {self.html}"
+
+    def to_json(self):
+        return {"type": self.type, "html": self.html, "context": self.context}
+
+
+class ImageFinding(Finding):
+    """
+    Image without alt text. HTML images serialize to their tag; images found
+    in JavaScript to {type, line, img_tag, full_match}, where the match span
+    is the whole creation site or HTML sink.
+    """
+    __slots__ = ("img_tag", "full_match")
+
+    def __init__(self, type, line, source, start=0, end=0, match_span=None):
+        super().__init__(type, line)
+        code = _code(source, start, end)
+        if self.type == "html":
+            self.img_tag, self.full_match = snippet(code), None
+            return
+        match_start, match_end = match_span or (start, end)
+        match = source.text[match_start:match_end]
+        if self.type in ("createElement", "new Image"):
+            self.img_tag = f"Dynamic image creation: {self.type}"
+            self.full_match = snippet(match)
+        elif self.type == "jsx":
+            self.img_tag = self.full_match = snippet(match)
+        else:
+            self.img_tag = snippet(code)
+            self.full_match = snippet(match)
+
+    def to_json(self):
+        if self.type == "html":
+            return self.img_tag
+        return {"type": self.type, "line": self.line, "img_tag": self.img_tag, "full_match": self.full_match}
+
+
+class IssueIndex:
+    """
+    Findings of many files seen as one flat list (e.g. results["issues"]),
+    without copying them: each row is built by `row(filename, file_path, finding)`
+    while the list is iterated or serialized.
+    """
+    __slots__ = ("_groups", "_row")
+
+    def __init__(self, row):
+        self._groups = []
+        self._row = row
+
+    def add(self, filename, file_path, findings):
+        if findings:
+            self._groups.append((sys.intern(filename), file_path, findings))
+
+    def __len__(self):
+        return sum(len(findings) for _, _, findings in self._groups)
+
+    def __iter__(self):
+        row = self._row
+        for filename, file_path, findings in self._groups:
+            for finding in findings:
+                yield row(filename, file_path, materialize(finding))
+
+    def to_json(self):
+        return list(self)
+
+
+def materialize(obj):
+    """JSON-ready form of a record; anything else is returned as is"""
+    return obj.to_json() if isinstance(obj, (Finding, IssueIndex)) else obj
+
+
+def to_json(obj):
+    """`default` hook for json.dumps"""
+    if isinstance(obj, (Finding, IssueIndex)):
+        return obj.to_json()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,131 @@
+"""
+Startup and readiness lifecycle for the API process.
+
+The vision stack (cv2, numpy, PIL, playwright via contrast_detection) is only
+imported on first use, so file-only workers start fast. `warm_up` loads the
+components listed in ANALYSIS_WARMUP ahead of traffic, and `/ready` reports
+ready only once all of them have succeeded.
+
+"east" loads one net per inference worker into the shared pool the analysis
+pipeline checks nets out of. "browser" only checks that Chromium launches;
+captures start their own browser, so nothing is kept running.
+
+Environment:
+    ANALYSIS_WARMUP   comma-separated components to warm: vision, east, browser
+                      (default "vision,east,browser"; empty disables warm-up)
+    EAST_MODEL_PATH   EAST model used by the warm-up and URL analysis
+    EAST_BACKEND      inference backend it is loaded on (see inference.py)
+"""
+import importlib
+import os
+import threading
+import time
+
+from log_config import get_logger
+
+logger = get_logger("lifecycle")
+
+COMPONENTS = ("vision", "east", "browser")
+
+_vision_lock = threading.Lock()
+_vision_module = None
+
+
+def get_contrast_detection():
+    """Import contrast_detection (and with it cv2/numpy/PIL) on first use."""
+    global _vision_module
+    if _vision_module is None:
+        with _vision_lock:
+            if _vision_module is None:
+                _vision_module = importlib.import_module("contrast_detection")
+    return _vision_module
+
+
+def get_tiles():
+    """The deep-zoom tile module, which needs the same vision stack"""
+    return get_contrast_detection().tiles
+
+
+def configured_components():
+    raw = os.environ.get("ANALYSIS_WARMUP", ",".join(COMPONENTS))
+    return [c.strip() for c in raw.split(",") if c.strip() in COMPONENTS]
+
+
+class Readiness:
+    """Tracks warm-up state per component."""
+
+    def __init__(self, components):
+        self._lock = threading.Lock()
+        self.components = {name: {"status": "pending"} for name in components}
+        self.started_at = None
+        self.finished_at = None
+
+    def mark(self, name, status, **details):
+        with self._lock:
+            self.components[name] = {"status": status, **details}
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self.finished_at is not None and all(
+                c["status"] == "ready" for c in self.components.values()
+            )
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            if self.finished_at is None:
+                state = "starting" if self.started_at is None else "warming"
+            elif all(c["status"] == "ready" for c in self.components.values()):
+                state = "ready"
+            else:
+                state = "failed"
+            return {"state": state, "components": {k: dict(v) for k, v in self.components.items()}}
+
+
+readiness = Readiness(configured_components())
+
+
+def _warm_vision():
+    get_contrast_detection()
+
+
+def _warm_east():
+    vision = get_contrast_detection()
+    path = vision.EAST_PATH
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"EAST model not found: {path}")
+    vision.east_pool.warm(path, vision.PIPELINE_WORKERS["inference"])
+
+
+def _warm_browser():
+    """Launch check only (Playwright and Chromium installed); no browser stays up"""
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        browser.close()
+
+
+_WARMERS = {
+    "vision": _warm_vision,
+    "east": _warm_east,
+    "browser": _warm_browser,
+}
+
+
+def warm_up(state: Readiness = None) -> Readiness:
+    """Run the configured warmers in order, recording each outcome. Blocking."""
+    state = state or readiness
+    state.started_at = time.time()
+    for name in list(state.components):
+        start = time.perf_counter()
+        try:
+            _WARMERS[name]()
+        except Exception as e:
+            state.mark(name, "failed", error=f"{type(e).__name__}: {e}")
+            logger.error("Warm-up of %s failed: %s", name, e)
+            continue
+        elapsed = round(time.perf_counter() - start, 3)
+        state.mark(name, "ready", seconds=elapsed)
+        logger.info("Warmed %s", name, extra={"fields": {"seconds": elapsed}})
+    state.finished_at = time.time()
+    return state
@@ -0,0 +1,288 @@
+"""
+Load generator for the /analyze endpoint.
+
+Runs the FastAPI app in-process under uvicorn (default) or targets an already
+running server, serves a synthetic page from a local static HTTP server for
+URL workloads, and reports throughput, p50/p95/p99 latency and peak RSS for
+each concurrency level.
+
+Usage:
+    python loadtest.py --concurrency 1,4,16 --requests 50 --mix file=3,url=1
+    python loadtest.py --target http://127.0.0.1:8000 --server-pid 12345 --mix combined=1
+"""
+import argparse
+import functools
+import http.server
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmark import make_css, make_html, make_js
+
+WORKLOADS = ("file", "url", "combined")
+
+
+# ---------------- Local servers ----------------
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_static_server(directory: str):
+    """Serve `directory` on a free localhost port; returns (server, base_url)."""
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def start_inprocess_api(log_level: str = "warning"):
+    """Start main.app under uvicorn in a background thread; returns (server, base_url)."""
+    import uvicorn
+    import main
+
+    port = _free_port()
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level=log_level)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError("In-process API server failed to start")
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+# ---------------- Request building ----------------
+def build_multipart(fields, files):
+    """Encode form `fields` and `files` [(name, filename, bytes)] as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    chunks = []
+    for name, value in fields:
+        chunks.append(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode())
+    for name, filename, data in files:
+        chunks.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/octet-stream\r\n\r\n".encode() + data + b"\r\n"
+        )
+    chunks.append(f"--{boundary}--\r\n".encode())
+    return b"".join(chunks), f"multipart/form-data; boundary={boundary}"
+
+
+def make_payloads(page_url: str, scale: int, seed: int):
+    files = [
+        ("files", "index.html", make_html(scale, seed).encode()),
+        ("files", "app.js", make_js(scale, seed).encode()),
+        ("files", "styles.css", make_css(scale, seed).encode()),
+    ]
+    return {
+        "file": build_multipart([], files),
+        "url": build_multipart([("url", page_url)], []),
+        "combined": build_multipart([("url", page_url)], files),
+    }
+
+
+def parse_mix(text: str):
+    weights = {}
+    for part in text.split(","):
+        if not part:
+            continue
+        name, _, weight = part.partition("=")
+        if name not in WORKLOADS:
+            raise ValueError(f"unknown workload: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+# ---------------- Measurement ----------------
+def read_rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid == os.getpid():
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    return 0
+
+
+class RSSSampler:
+    """Samples the RSS of `pid` in the background and keeps the peak."""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, read_rss_bytes(self.pid))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = read_rss_bytes(self.pid)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, read_rss_bytes(self.pid))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def send(endpoint: str, body: bytes, content_type: str, timeout: float):
+    req = urllib.request.Request(endpoint, data=body, method="POST", headers={"Content-Type": content_type})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except Exception:
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def run_level(endpoint, payloads, weights, concurrency, total, timeout, pid, seed):
+    rng = random.Random(seed)
+    names = list(weights)
+    plan = rng.choices(names, weights=[weights[n] for n in names], k=total)
+
+    def one(kind):
+        body, content_type = payloads[kind]
+        status, latency = send(endpoint, body, content_type, timeout)
+        return kind, status, latency
+
+    with RSSSampler(pid) as sampler:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(one, plan))
+        elapsed = time.perf_counter() - start
+
+    ok = sorted(lat for _, status, lat in outcomes if 200 <= status < 300)
+    by_kind = {}
+    for kind, status, latency in outcomes:
+        entry = by_kind.setdefault(kind, {"requests": 0, "errors": 0})
+        entry["requests"] += 1
+        if not 200 <= status < 300:
+            entry["errors"] += 1
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": total - len(ok),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {"p50": ms(percentile(ok, 50)), "p95": ms(percentile(ok, 95)), "p99": ms(percentile(ok, 99))},
+        "peak_rss_mb": round(sampler.peak / (1024 * 1024), 1),
+        "by_workload": by_kind,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the /analyze endpoint")
+    parser.add_argument("--target", default="inprocess",
+                        help="'inprocess' to run main.app under uvicorn here, or a base URL such as http://127.0.0.1:8000")
+    parser.add_argument("--server-pid", type=int, help="PID of an external server to sample RSS from")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per concurrency level")
+    parser.add_argument("--mix", default="file=1", help="Workload weights, e.g. file=3,url=1,combined=1")
+    parser.add_argument("--scale", type=int, default=200, help="Size of the synthetic HTML/JS/CSS uploads and page")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", metavar="FILE", help="Write JSON results to FILE")
+    args = parser.parse_args(argv)
+
+    try:
+        weights = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+
+    site_dir = tempfile.mkdtemp(prefix="loadtest_site_")
+    with open(os.path.join(site_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(make_html(args.scale, args.seed))
+    static_server, static_url = start_static_server(site_dir)
+
+    api_server = None
+    if args.target == "inprocess":
+        api_server, base_url = start_inprocess_api()
+        pid = os.getpid()
+    else:
+        base_url = args.target.rstrip("/")
+        pid = args.server_pid or 0
+
+    payloads = make_payloads(f"{static_url}/index.html", args.scale, args.seed)
+    endpoint = f"{base_url}/analyze"
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(),
+            "target": args.target,
+            "mix": weights,
+            "scale": args.scale,
+            "rss_source": "in-process (server + load generator)" if api_server else (f"pid {pid}" if pid else "none"),
+        },
+        "levels": [],
+    }
+
+    try:
+        print(f"{'conc':>5} {'reqs':>5} {'err':>4} {'rps':>8} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'rssMB':>8}")
+        for level_index, concurrency in enumerate(levels):
+            result = run_level(endpoint, payloads, weights, concurrency, args.requests,
+                               args.timeout, pid, args.seed + level_index)
+            report["levels"].append(result)
+            lat = result["latency_ms"]
+            print(f"{concurrency:>5} {result['requests']:>5} {result['errors']:>4} {result['throughput_rps']:>8} "
+                  f"{lat['p50'] or '-':>9} {lat['p95'] or '-':>9} {lat['p99'] or '-':>9} {result['peak_rss_mb']:>8}")
+    finally:
+        static_server.shutdown()
+        shutil.rmtree(site_dir, ignore_errors=True)
+        if api_server is not None:
+            api_server.should_exit = True
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Load test results saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Structured logging for the analysis backend.
+
+Records are handed to a QueueHandler so the request path never blocks on the
+terminal; a single QueueListener thread formats and writes them. Every record
+carries the current request correlation id.
+
+Environment:
+    LOG_LEVEL     DEBUG/INFO/WARNING/ERROR (default INFO)
+    LOG_FORMAT    json or text (default json)
+    LOG_PAYLOADS  1 to log full analysis result payloads at DEBUG (default off)
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+
+LOGGER_NAME = "analysis"
+
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default="-")
+
+_configure_lock = threading.Lock()
+_listener = None
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def set_request_id(request_id: str):
+    """Bind `request_id` to the current context; returns a token for `reset_request_id`."""
+    return request_id_var.set(request_id)
+
+
+def reset_request_id(token) -> None:
+    request_id_var.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+def _json_default(obj):
+    # Analysis records (issue_store) know their JSON form; anything else is logged as text
+    to_json = getattr(obj, "to_json", None)
+    return to_json() if callable(to_json) else str(obj)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; values passed as `extra={"fields": {...}}` are merged in."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=_json_default, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Keeps `fields` and exception info intact so formatting happens on the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: str = None, fmt: str = None, stream=None) -> logging.Logger:
+    """Install the queue handler on the package logger. Safe to call more than once."""
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    logger.setLevel(level)
+
+    with _configure_lock:
+        if _listener is not None:
+            return logger
+
+        fmt = (fmt or os.environ.get("LOG_FORMAT", "json")).lower()
+        sink = logging.StreamHandler(stream or sys.stderr)
+        sink.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+
+        log_queue = queue.SimpleQueue()
+        handler = _QueueHandler(log_queue)
+        handler.addFilter(RequestIdFilter())
+        logger.addHandler(handler)
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, sink, respect_handler_level=False)
+        _listener.start()
+        atexit.register(shutdown_logging)
+    return logger
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def get_logger(name: str = None) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
+
+
+def payload_logging_enabled() -> bool:
+    return os.environ.get("LOG_PAYLOADS", "0").lower() in ("1", "true", "yes")
+
+
+def log_payload(logger: logging.Logger, message: str, payload) -> None:
+    """Log a full result payload at DEBUG, only when LOG_PAYLOADS is enabled."""
+    if payload_logging_enabled() and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, extra={"fields": {"payload": payload}})
@@ -1,13 +1,33 @@
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from typing import List, Optional
-import tempfile, os, asyncio, traceback
+from contextlib import asynccontextmanager
+import os, asyncio
 from fastapi.middleware.cors import CORSMiddleware
-import contrast_detection
+import artifacts
 import code_analyzer
+import lifecycle
+import metrics
+import project_tree
+import responses
+from metrics import stage_timer
+from log_config import configure_logging, get_logger, log_payload, new_request_id, set_request_id, reset_request_id
+
+logger = get_logger("api")
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start warm-up in the background so liveness answers immediately while /ready waits"""
+    warmup_task = asyncio.create_task(asyncio.to_thread(lifecycle.warm_up))
+    sweeper = artifacts.Sweeper().start()
+    yield
+    sweeper.stop()
+    if not warmup_task.done():
+        warmup_task.cancel()
 
 # Create FastAPI app instance
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Allow your frontend dev server
 app.add_middleware(
@@ -18,14 +38,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Bind a correlation id to every request and echo it back in X-Request-ID"""
+    request_id = request.headers.get("x-request-id") or new_request_id()
+    token = set_request_id(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        reset_request_id(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler to ensure JSON responses"""
-    print(f"=== GLOBAL EXCEPTION ===")
-    print(f"Exception type: {type(exc)}")
-    print(f"Exception message: {str(exc)}")
-    traceback.print_exc()
-    print("========================")
+    logger.error("Unhandled exception: %s", exc, exc_info=exc,
+                 extra={"fields": {"error_type": type(exc).__name__}})
+    metrics.ERRORS_TOTAL.inc(stage="unhandled")
     return JSONResponse(
         status_code=500,
         content={"error": f"Internal server error: {str(exc)}"}
@@ -36,88 +66,167 @@ async def root():
     """Health check endpoint"""
     return {"status": "Backend is running"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once configured models and browsers are warmed, 503 before"""
+    snapshot = lifecycle.readiness.snapshot()
+    return JSONResponse(status_code=200 if snapshot["state"] == "ready" else 503, content=snapshot)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return Response(content=metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+# Artifact and tile URLs embed a content hash, so they never change meaning
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@app.api_route(artifacts.URL_PREFIX + "/{name}", methods=["GET", "HEAD"])
+async def artifact(name: str, request: Request):
+    """Published analysis image; small ones come from memory, others are streamed from disk"""
+    try:
+        item = await asyncio.to_thread(artifacts.open_artifact, name)
+    except artifacts.ArtifactNotFound:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    headers = {"ETag": item.etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if responses.etag_matches(request.headers.get("if-none-match"), item.etag):
+        return Response(status_code=304, headers=headers)
+    if item.data is None:
+        # FileResponse does Range/If-Range itself, against the ETag set here
+        return FileResponse(item.path, media_type=item.media_type, headers=headers)
+    return responses.range_response(item.data, item.media_type, headers,
+                                    request.headers.get("range"), request.headers.get("if-range"))
+
+@app.get("/tiles/{image_id}.dzi")
+async def tile_descriptor(image_id: str):
+    """Deep Zoom descriptor of an analyzed page image"""
+    tiles = await asyncio.to_thread(lifecycle.get_tiles)
+    try:
+        xml = await asyncio.to_thread(tiles.dzi, image_id)
+    except tiles.TileNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(content=xml, media_type="application/xml", headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
+
+@app.get("/tiles/{image_id}_files/{level:int}/{col:int}_{row:int}.{ext}")
+async def tile(image_id: str, level: int, col: int, row: int, ext: str):
+    """One deep-zoom tile, built on first request"""
+    tiles = await asyncio.to_thread(lifecycle.get_tiles)
+    if ext != tiles.tile_extension():
+        raise HTTPException(status_code=404, detail=f"Tiles are served as .{tiles.tile_extension()}")
+    try:
+        data = await asyncio.to_thread(tiles.get_tile, image_id, level, col, row)
+    except tiles.TileNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(content=data, media_type=tiles.MEDIA_TYPES[ext], headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
+
 @app.post("/analyze")
 async def analyze(request: Request):
     """
     Handle form data manually to avoid FastAPI parsing issues
     Processes both URL and files when provided
     """
-    print("=== ANALYZE ENDPOINT CALLED ===")
+    logger.info("Analyze request received")
+    metrics.REQUESTS_TOTAL.inc(endpoint="analyze")
     
     try:
         # Get the form data
-        form_data = await request.form()
-        print(f"Form data keys: {list(form_data.keys())}")
+        with stage_timer("form_parse"):
+            form_data = await request.form()
+        logger.debug("Form parsed", extra={"fields": {"keys": list(form_data.keys())}})
         
         # Extract URL
         url = form_data.get("url")
-        print(f"URL received: {url}")
-        
-        # Extract files
-        files = []
-        for key, value in form_data.items():
-            if key == "files":
-                if hasattr(value, 'filename'):  # It's a file
-                    files.append(value)
-                    print(f"File found: {value.filename} ({value.size} bytes)")
         
-        print(f"Number of files: {len(files)}")
+        # Extract files (every "files" part, not just the last one)
+        files = [value for value in form_data.getlist("files") if hasattr(value, 'filename')]
+        # Optional comma-separated ignore globs for uploaded archives
+        ignore_field = form_data.get("ignore")
+        ignore = tuple(g.strip() for g in str(ignore_field).split(",") if g.strip()) if ignore_field else project_tree.DEFAULT_IGNORE
+        # Optional capture profile for URLs (full, fast or lean; default CAPTURE_PROFILE)
+        profile = str(form_data.get("profile") or "").strip().lower() or None
+        # Optional snapshot mode for URLs (off, record, replay or auto; default CAPTURE_SNAPSHOT)
+        snapshot = str(form_data.get("snapshot") or "").strip().lower() or None
         
         # Filter out empty files
         files = [f for f in files if f.filename and f.size > 0]
-        print(f"Filtered files: {len(files)} non-empty files")
+        logger.info("Analyze inputs", extra={"fields": {"url": str(url) if url else None, "files": len(files)}})
 
         # Check if we have either URL or files
         if not url and len(files) == 0:
-            print("ERROR: No URL or files provided")
+            logger.warning("No URL or files provided")
+            metrics.ERRORS_TOTAL.inc(stage="validation")
             raise HTTPException(
                 status_code=400, 
                 detail="Provide either a url or files to analyze"
             )
 
-        # Create temporary directory
-        tmp_dir = tempfile.mkdtemp(prefix="analysis_")
-        print(f"Created temp directory: {tmp_dir}")
+        # Per-request scratch space, removed when the request ends (published images live elsewhere)
+        tmp_dir = artifacts.new_scratch_dir()
+        logger.debug("Created temp directory", extra={"fields": {"tmp_dir": tmp_dir}})
 
         try:
             results = {}
             
             # Process URL if provided
             if url and str(url).strip():
-                print(f"Processing URL: {url}")
                 
-                # Check if the function exists
+                # Vision stack is only imported for URL requests
+                contrast_detection = await asyncio.to_thread(lifecycle.get_contrast_detection)
                 if not hasattr(contrast_detection, 'analyze_url'):
                     raise Exception("contrast_detection.analyze_url function not found")
                 
                 # Run URL analysis
-                url_result = await asyncio.to_thread(contrast_detection.analyze_url, str(url).strip(), tmp_dir)
-                print(f"analyze_url returned: {url_result}")
+                capture = contrast_detection.capture
+                try:
+                    capture_profile = capture.get_profile(profile)
+                    if snapshot and snapshot not in capture.SNAPSHOT_MODES:
+                        raise ValueError(f"Unknown snapshot mode {snapshot!r}; expected one of {', '.join(capture.SNAPSHOT_MODES)}")
+                except ValueError as e:
+                    metrics.ERRORS_TOTAL.inc(stage="validation")
+                    return JSONResponse(status_code=400, content={"error": str(e)})
+                try:
+                    url_result = await asyncio.to_thread(contrast_detection.analyze_url, str(url).strip(), tmp_dir,
+                                                         profile=capture_profile.name, snapshot=snapshot)
+                except capture.SnapshotNotFound as e:
+                    metrics.ERRORS_TOTAL.inc(stage="validation")
+                    return JSONResponse(status_code=404, content={"error": str(e)})
+                log_payload(logger, "analyze_url result", url_result)
                 results["url_analysis"] = url_result
 
             # Process files if provided
             if files and len(files) > 0:
-                print(f"Processing {len(files)} uploaded files")
-                saved_files = []
-                
-                for i, uploaded_file in enumerate(files):
-                    print(f"Processing file {i}: {uploaded_file.filename} ({uploaded_file.size} bytes)")
-                    
+                # Uploads keep their relative folder names; archives are extracted into the same tree
+                upload_dir = os.path.join(tmp_dir, "upload")
+                os.makedirs(upload_dir, exist_ok=True)
+                archives = [f for f in files if project_tree.is_archive(f.filename)]
+                archive_dirs = set()
+
+                for uploaded_file in files:
+                    if project_tree.is_archive(uploaded_file.filename):
+                        # Several archives each get their own folder
+                        dest_dir = upload_dir
+                        if len(archives) > 1:
+                            folder = project_tree.archive_dir_name(uploaded_file.filename, archive_dirs)
+                            archive_dirs.add(folder)
+                            dest_dir = os.path.join(upload_dir, folder)
+                        written = await asyncio.to_thread(
+                            project_tree.extract_archive, uploaded_file.file, uploaded_file.filename, dest_dir, ignore
+                        )
+                        logger.debug("Extracted archive", extra={"fields": {"file": uploaded_file.filename, "files": len(written)}})
+                        continue
                     # Save uploaded file to temp directory
-                    file_path = os.path.join(tmp_dir, uploaded_file.filename)
-                    with open(file_path, "wb") as f:
-                        content = await uploaded_file.read()
-                        f.write(content)
-                    saved_files.append(file_path)
-                    print(f"Saved file to: {file_path}")
-
-                # Check if analyze_files function exists in code_analyzer
-                if not hasattr(code_analyzer, 'analyze_files'):
-                    raise Exception("code_analyzer.analyze_files function not found")
+                    with stage_timer("upload_save"):
+                        file_path = await asyncio.to_thread(
+                            project_tree.save_upload, uploaded_file.file, upload_dir, uploaded_file.filename
+                        )
+                    logger.debug("Saved upload", extra={"fields": {"file": uploaded_file.filename, "bytes": uploaded_file.size}})
+
+                # Check if analyze_tree function exists in code_analyzer
+                if not hasattr(code_analyzer, 'analyze_tree'):
+                    raise Exception("code_analyzer.analyze_tree function not found")
                 
-                # Run file analysis using code_analyzer
-                file_result = await asyncio.to_thread(code_analyzer.analyze_files, saved_files, tmp_dir)
-                print(f"analyze_files returned: {file_result}")
+                # Run file analysis over the uploaded tree (archives were already filtered by `ignore`)
+                file_result = await asyncio.to_thread(code_analyzer.analyze_tree, upload_dir, ())
+                log_payload(logger, "analyze_files result", file_result)
                 results["file_analysis"] = file_result
             
             # Return combined results
@@ -127,41 +236,40 @@ async def analyze(request: Request):
                     detail="No valid URL or files provided"
                 )
             
-            return {
+            payload = {
                 "status": "success", 
                 "type": "combined" if len(results) > 1 else ("url" if "url_analysis" in results else "files"),
                 "data": results
             }
+            # orjson + optional compression, rendered off the event loop
+            return await asyncio.to_thread(
+                responses.AnalysisResponse, payload, accept_encoding=request.headers.get("accept-encoding", "")
+            )
+
+        except project_tree.ArchiveError as e:
+            metrics.ERRORS_TOTAL.inc(stage="validation")
+            logger.warning("Rejected upload: %s", e)
+            return JSONResponse(status_code=400, content={"error": str(e)})
 
         except Exception as e:
-            print(f"=== ANALYSIS ERROR ===")
-            print(f"Error type: {type(e)}")
-            print(f"Error message: {str(e)}")
-            traceback.print_exc()
-            print("======================")
-            
-            # Clean up temp directory on error
-            import shutil
-            try:
-                shutil.rmtree(tmp_dir)
-                print(f"Cleaned up temp directory: {tmp_dir}")
-            except Exception as cleanup_error:
-                print(f"Failed to cleanup temp directory: {cleanup_error}")
-            
+            metrics.ERRORS_TOTAL.inc(stage="analysis")
+            logger.error("Analysis failed: %s", e, exc_info=e,
+                         extra={"fields": {"error_type": type(e).__name__}})
             return JSONResponse(
                 status_code=500,
                 content={"error": f"Analysis failed: {str(e)}"}
             )
 
+        finally:
+            await asyncio.to_thread(artifacts.remove_scratch_dir, tmp_dir)
+
     except HTTPException as he:
-        print(f"HTTP Exception: {he.detail}")
+        logger.info("HTTP exception: %s", he.detail, extra={"fields": {"status_code": he.status_code}})
         raise  # Re-raise HTTP exceptions
     except Exception as e:
-        print(f"=== UNEXPECTED ERROR ===")
-        print(f"Error type: {type(e)}")
-        print(f"Error message: {str(e)}")
-        traceback.print_exc()
-        print("========================")
+        metrics.ERRORS_TOTAL.inc(stage="unexpected")
+        logger.error("Unexpected error: %s", e, exc_info=e,
+                     extra={"fields": {"error_type": type(e).__name__}})
         return JSONResponse(
             status_code=500,
             content={"error": f"Unexpected error: {str(e)}"}
@@ -0,0 +1,142 @@
+"""
+File fingerprint manifest for incremental code analysis.
+
+The manifest sits next to an analysis output JSON and maps each analyzed file
+to its size, mtime, content hash and the findings of every check run on it.
+A file whose size and mtime are unchanged is served from the manifest without
+being read; when only the mtime moved, the content hash decides. Entries are
+also keyed by a fingerprint of the analyzer source, so editing the analyzer
+invalidates everything.
+
+Only the standard library is used so the standalone scripts can import it.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+from issue_store import to_json
+
+MANIFEST_VERSION = 1
+
+MISSING = object()
+
+_HASH_CHUNK = 1 << 20
+
+
+def manifest_path_for(output_path: str) -> str:
+    """`report.json` -> `report.manifest.json`"""
+    root, _ = os.path.splitext(output_path)
+    return root + ".manifest.json"
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(*paths: str) -> str:
+    """Hash of the given source files, used to invalidate findings when analyzer code changes."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(path.encode())
+    return digest.hexdigest()
+
+
+class Manifest:
+    """path -> {size, mtime_ns, hash, findings: {check: ...}} for one output file."""
+
+    def __init__(self, path: str, salt: str = ""):
+        self.path = path
+        self.salt = salt
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen = set()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION and data.get("salt") == self.salt:
+            self.entries = data.get("files", {})
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def _current_entry(self, key, file_path):
+        """Entry for `file_path` if its content is unchanged, else None."""
+        st = os.stat(file_path)
+        entry = self.entries.get(key)
+        if entry is None or entry["size"] != st.st_size:
+            return None
+        if entry["mtime_ns"] != st.st_mtime_ns:
+            # Touched but possibly unchanged: the content hash decides
+            if entry["hash"] != file_hash(file_path):
+                return None
+            entry["mtime_ns"] = st.st_mtime_ns
+            self._dirty = True
+        return entry
+
+    def lookup(self, file_path: str, check: str):
+        """Cached findings of `check` for `file_path`, or MISSING."""
+        key = self._key(file_path)
+        self._seen.add(key)
+        entry = self._current_entry(key, file_path)
+        if entry is not None and check in entry["findings"]:
+            self.hits += 1
+            return entry["findings"][check]
+        self.misses += 1
+        return MISSING
+
+    def store(self, file_path: str, check: str, findings) -> None:
+        key = self._key(file_path)
+        self._seen.add(key)
+        entry = self._current_entry(key, file_path)
+        if entry is None:
+            st = os.stat(file_path)
+            entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": file_hash(file_path), "findings": {}}
+            self.entries[key] = entry
+        entry["findings"][check] = findings
+        self._dirty = True
+
+    def get_or_compute(self, file_path: str, check: str, compute):
+        """Cached findings, or `compute()` stored for next time. Exceptions are not cached."""
+        findings = self.lookup(file_path, check)
+        if findings is MISSING:
+            findings = compute()
+            self.store(file_path, check, findings)
+        return findings
+
+    def save(self) -> None:
+        """Write the manifest atomically, dropping files not looked at in this run."""
+        files = {key: entry for key, entry in self.entries.items() if key in self._seen}
+        if not self._dirty and len(files) == len(self.entries) and os.path.exists(self.path):
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".manifest_", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                # dumps() uses the C encoder; dump() to a file would not. Issue
+                # records are stored in their JSON form
+                f.write(json.dumps({"version": MANIFEST_VERSION, "salt": self.salt, "files": files},
+                                   ensure_ascii=False, default=to_json))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
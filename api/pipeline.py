@@ -0,0 +1,148 @@
+"""
+Bounded multi-stage thread pipeline.
+
+Each stage has its own worker threads and reads from a bounded queue that the
+previous stage writes to, so a slow stage applies back-pressure instead of
+letting work pile up in memory, and different stages of consecutive items
+run at the same time (segment N+1 is in inference while segment N encodes).
+
+    pipeline = Pipeline([
+        Stage("decode", load, workers=1, fanout=True),   # one item in, many out
+        Stage("inference", infer, workers=1),
+        Stage("encode", encode, workers=2),
+    ])
+    for result in pipeline.run(items):                  # completion order
+        ...
+
+`items` may be a generator that produces work slowly (e.g. a page being
+captured); it is consumed on a feeder thread, so the stages start on the
+first item.
+
+The first exception raised by any stage stops the pipeline and is re-raised
+from `run`. Workers run in a copy of the caller's context, so log records
+keep the request id.
+"""
+import contextvars
+import os
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List, NamedTuple
+
+from metrics import stage_timer
+
+QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", 2))
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+class Stage(NamedTuple):
+    name: str
+    fn: Callable
+    workers: int = 1
+    fanout: bool = False
+
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], queue_size: int = QUEUE_SIZE):
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+
+    def run(self, items: Iterable) -> Iterator:
+        """Feed `items` through every stage; yields final outputs as they complete"""
+        queues = [queue.Queue(self.queue_size) for _ in self.stages]
+        output = queue.Queue(self.queue_size)
+        stop = threading.Event()
+        errors = []
+        threads = []
+
+        def put(q, item):
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def fail(e):
+            errors.append(e)
+            stop.set()
+
+        def feed():
+            iterator = iter(items)
+            try:
+                for item in iterator:
+                    if not put(queues[0], item):
+                        return
+            except BaseException as e:
+                fail(e)
+                return
+            finally:
+                # A generator (e.g. a page capture) is closed on the thread that ran it
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    try:
+                        close()
+                    except Exception as e:
+                        if not errors:
+                            fail(e)
+            put(queues[0], _DONE)
+
+        def work(index, stage, remaining):
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else output
+            while not stop.is_set():
+                try:
+                    item = inbox.get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    put(inbox, _DONE)  # for this stage's other workers
+                    with remaining[1]:
+                        remaining[0] -= 1
+                        last = remaining[0] == 0
+                    if last:
+                        put(outbox, _DONE)
+                    return
+                try:
+                    with stage_timer(f"pipeline_{stage.name}"):
+                        result = stage.fn(item)
+                except BaseException as e:
+                    fail(e)
+                    return
+                for out in (result if stage.fanout else (result,)):
+                    if not put(outbox, out):
+                        return
+
+        def start(name, target, *args):
+            ctx = contextvars.copy_context()
+            thread = threading.Thread(target=ctx.run, args=(target, *args), name=name, daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        start("pipeline-feed", feed)
+        for index, stage in enumerate(self.stages):
+            workers = max(1, stage.workers)
+            remaining = [workers, threading.Lock()]
+            for n in range(workers):
+                start(f"pipeline-{stage.name}-{n}", work, index, stage, remaining)
+
+        try:
+            while True:
+                try:
+                    item = output.get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    if errors:
+                        raise errors[0]
+                    continue
+                if item is _DONE:
+                    break
+                yield item
+            if errors:
+                raise errors[0]
+        finally:
+            # Also reached when the caller stops iterating early
+            stop.set()
+            for thread in threads:
+                thread.join()
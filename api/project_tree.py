@@ -0,0 +1,236 @@
+"""
+Project-tree support for code analysis: safe archive extraction and a
+parallel directory walker.
+
+Uploaded zip/tar archives are extracted member by member straight into the
+analysis directory (only analyzable files, nothing outside the destination,
+no links), and the tree is walked with `os.scandir` on a small thread pool
+while skipping ignored directories such as node_modules, dist and .git.
+
+Environment:
+    ARCHIVE_MAX_BYTES   total uncompressed bytes extracted per archive (default 200 MB)
+    ARCHIVE_MAX_FILES   files extracted per archive (default 20000)
+"""
+import fnmatch
+import os
+import posixpath
+import shutil
+import stat
+import tarfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import timed
+
+# Directory/file names (or relative-path globs) skipped by the walker and extractor
+DEFAULT_IGNORE = ("node_modules", "dist", "build", ".git", ".next", "coverage", "__pycache__", ".venv")
+
+# Everything any of the code analyzers reads
+ANALYZABLE_EXTENSIONS = frozenset({".html", ".htm", ".css", ".js", ".jsx", ".ts", ".tsx"})
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+ARCHIVE_MAX_BYTES = int(os.environ.get("ARCHIVE_MAX_BYTES", 200 * 1024 * 1024))
+ARCHIVE_MAX_FILES = int(os.environ.get("ARCHIVE_MAX_FILES", 20000))
+
+_COPY_CHUNK = 1 << 20
+
+
+class ArchiveError(ValueError):
+    """Raised for archives that are unreadable, unsafe or over the size limits."""
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def safe_relative_path(name: str):
+    """
+    Normalize an uploaded or archived name to a relative POSIX path that stays
+    inside the destination. Returns None for names that would escape it.
+    """
+    name = name.replace("\\", "/")
+    if name.startswith("/") or (len(name) > 1 and name[1] == ":"):
+        return None
+    path = posixpath.normpath(name)
+    if path in (".", "") or path == ".." or path.startswith("../"):
+        return None
+    return path
+
+
+def archive_dir_name(filename: str, taken=()) -> str:
+    """
+    Folder name for one of several uploaded archives: the archive's base name
+    without extensions, made unique against `taken`. Raises ArchiveError for
+    names that leave nothing safe to use.
+    """
+    base = safe_relative_path(os.path.basename(filename.replace("\\", "/")))
+    stem = base.split(".")[0] if base else ""
+    if not stem or stem == "..":
+        raise ArchiveError(f"Invalid archive name: {filename!r}")
+    name, n = stem, 2
+    while name in taken:
+        name = f"{stem}-{n}"
+        n += 1
+    return name
+
+
+def is_ignored(rel_path: str, ignore=DEFAULT_IGNORE) -> bool:
+    """True when any component of `rel_path`, or the path itself, matches an ignore glob."""
+    for pattern in ignore:
+        if fnmatch.fnmatch(rel_path, pattern):
+            return True
+        for part in rel_path.split("/"):
+            if fnmatch.fnmatch(part, pattern):
+                return True
+    return False
+
+
+# ---------------- Extraction ----------------
+class _Budget:
+    def __init__(self, max_bytes, max_files):
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.bytes = 0
+        self.files = 0
+
+    def add_file(self):
+        self.files += 1
+        if self.files > self.max_files:
+            raise ArchiveError(f"Archive has more than {self.max_files} files to analyze")
+
+    def add_bytes(self, n):
+        self.bytes += n
+        if self.bytes > self.max_bytes:
+            raise ArchiveError(f"Archive expands to more than {self.max_bytes} bytes")
+
+
+def _copy_member(src, dest_path, budget):
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with open(dest_path, "wb") as out:
+        while True:
+            chunk = src.read(_COPY_CHUNK)
+            if not chunk:
+                break
+            # Counted while copying, so lying size headers do not get past the limit
+            budget.add_bytes(len(chunk))
+            out.write(chunk)
+
+
+def _wanted(rel_path, ignore, extensions):
+    if rel_path is None or is_ignored(rel_path, ignore):
+        return False
+    return extensions is None or os.path.splitext(rel_path)[1].lower() in extensions
+
+
+def _extract_zip(fileobj, dest_dir, ignore, extensions, budget):
+    written = []
+    with zipfile.ZipFile(fileobj) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            if stat.S_IFMT(info.external_attr >> 16) not in (0, stat.S_IFREG):
+                continue  # symlinks and other special entries
+            rel_path = safe_relative_path(info.filename)
+            if not _wanted(rel_path, ignore, extensions):
+                continue
+            budget.add_file()
+            with zf.open(info) as src:
+                _copy_member(src, os.path.join(dest_dir, rel_path), budget)
+            written.append(rel_path)
+    return written
+
+
+def _extract_tar(fileobj, dest_dir, ignore, extensions, budget):
+    written = []
+    # "r|*" reads the archive as a forward-only stream with any compression
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+        for member in tf:
+            if not member.isfile():
+                continue  # directories, links, devices
+            rel_path = safe_relative_path(member.name)
+            if not _wanted(rel_path, ignore, extensions):
+                continue
+            budget.add_file()
+            src = tf.extractfile(member)
+            _copy_member(src, os.path.join(dest_dir, rel_path), budget)
+            written.append(rel_path)
+    return written
+
+
+@timed("archive_extract")
+def extract_archive(fileobj, filename, dest_dir, ignore=DEFAULT_IGNORE, extensions=ANALYZABLE_EXTENSIONS,
+                    max_bytes=None, max_files=None):
+    """
+    Extract the zip or tar archive in `fileobj` (named `filename`) into `dest_dir`.
+
+    Only regular files whose relative path stays inside `dest_dir`, is not
+    ignored and has one of `extensions` are written. Returns the relative
+    paths written; raises ArchiveError on bad or oversized archives.
+    """
+    budget = _Budget(max_bytes or ARCHIVE_MAX_BYTES, max_files or ARCHIVE_MAX_FILES)
+    os.makedirs(dest_dir, exist_ok=True)
+    try:
+        if filename.lower().endswith(".zip"):
+            return _extract_zip(fileobj, dest_dir, ignore, extensions, budget)
+        return _extract_tar(fileobj, dest_dir, ignore, extensions, budget)
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise ArchiveError(f"Could not extract {filename}: {e}") from e
+
+
+def save_upload(fileobj, dest_dir, filename):
+    """Copy an uploaded file to `dest_dir` under its (sanitized) relative name."""
+    rel_path = safe_relative_path(filename) or os.path.basename(filename.replace("\\", "/"))
+    if rel_path in ("", ".", ".."):
+        raise ArchiveError(f"Invalid upload name: {filename!r}")
+    dest_path = os.path.join(dest_dir, rel_path)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with open(dest_path, "wb") as out:
+        shutil.copyfileobj(fileobj, out, _COPY_CHUNK)
+    return dest_path
+
+
+# ---------------- Walking ----------------
+def _scan_dir(root, rel_dir, ignore, extensions):
+    files, subdirs = [], []
+    try:
+        with os.scandir(os.path.join(root, rel_dir) if rel_dir else root) as it:
+            for entry in it:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                # Parents were already checked, so only this entry's name and full path matter
+                if any(fnmatch.fnmatch(entry.name, p) or fnmatch.fnmatch(rel_path, p) for p in ignore):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(rel_path)
+                    elif entry.is_file(follow_symlinks=False):
+                        if extensions is None or os.path.splitext(entry.name)[1].lower() in extensions:
+                            files.append(rel_path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subdirs
+
+
+@timed("tree_walk")
+def walk_tree(root, ignore=DEFAULT_IGNORE, extensions=None, workers=None):
+    """
+    List files under `root` as sorted relative POSIX paths.
+
+    Each directory is scanned by a pool worker with `os.scandir`; ignored
+    names are pruned before descending and symlinks are not followed.
+    """
+    workers = workers or min(8, (os.cpu_count() or 1) * 2)
+    found = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_scan_dir, root, "", ignore, extensions)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                found.extend(files)
+                for rel_dir in subdirs:
+                    pending.add(pool.submit(_scan_dir, root, rel_dir, ignore, extensions))
+    found.sort()
+    return found
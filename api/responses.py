@@ -0,0 +1,163 @@
+"""
+Fast encoding of analysis responses.
+
+Payloads are serialized once with orjson (issue records are materialized
+through issue_store.to_json on the way) and, when the client accepts it and
+the body is large enough, compressed with brotli (if the `brotli` package is
+installed) or gzip.
+
+Artifacts (images) are already compressed; `range_response` serves them with
+single-range support instead.
+
+Environment:
+    RESPONSE_COMPRESSION          encodings to offer in order of preference (default "br,gzip"; empty disables)
+    RESPONSE_COMPRESS_MIN_BYTES   smallest body that gets compressed (default 16384)
+    RESPONSE_GZIP_LEVEL           gzip level 1-9 (default 6)
+    RESPONSE_BROTLI_QUALITY       brotli quality 0-11 (default 5)
+"""
+import gzip
+import os
+
+import orjson
+from fastapi.responses import Response
+
+import issue_store
+from metrics import stage_timer
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+COMPRESSION = tuple(e.strip() for e in os.environ.get("RESPONSE_COMPRESSION", "br,gzip").split(",") if e.strip())
+COMPRESS_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESS_MIN_BYTES", 16384))
+GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("RESPONSE_BROTLI_QUALITY", 5))
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=issue_store.to_json, option=ORJSON_OPTIONS)
+
+
+def accepted_encodings(accept_encoding: str):
+    """Codings listed in an Accept-Encoding header, minus those with q=0"""
+    accepted = set()
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding)
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, size: int):
+    """Content-Encoding to use for a body of `size` bytes, or None"""
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    accepted = accepted_encodings(accept_encoding)
+    for coding in COMPRESSION:
+        if coding not in ("br", "gzip") or (coding == "br" and brotli is None):
+            continue
+        if coding in accepted or "*" in accepted:
+            return coding
+    return None
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class AnalysisResponse(Response):
+    """
+    orjson-backed JSON response that serializes issue records and compresses
+    bodies over RESPONSE_COMPRESS_MIN_BYTES for clients that accept it.
+    Rendering is CPU work, so build it off the event loop for large payloads.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, content, status_code=200, headers=None, accept_encoding="", **kwargs):
+        self.accept_encoding = accept_encoding
+        self.content_encoding = None
+        super().__init__(content, status_code=status_code, headers=headers, **kwargs)
+
+    def render(self, content) -> bytes:
+        with stage_timer("json_serialization"):
+            body = dumps(content)
+        coding = choose_encoding(self.accept_encoding, len(body))
+        if coding:
+            with stage_timer("response_compression"):
+                body = compress(body, coding)
+            self.content_encoding = coding
+        return body
+
+    def init_headers(self, headers=None):
+        headers = dict(headers or {})
+        if self.content_encoding:
+            headers["content-encoding"] = self.content_encoding
+        if COMPRESSION:
+            headers["vary"] = "Accept-Encoding"
+        super().init_headers(headers)
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def byte_range(range_header: str, size: int):
+    """
+    Inclusive (start, end) of a single `bytes=` range, or None to send the
+    whole body (no header, another unit, or several ranges).
+    """
+    unit, _, spec = (range_header or "").partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start, end = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(range_header)
+    return start, min(end, size - 1)
+
+
+def range_response(body: bytes, media_type: str, headers: dict, range_header: str = None, if_range: str = None) -> Response:
+    """200, 206 or 416 for an in-memory body; If-Range must match headers["ETag"]"""
+    size = len(body)
+    span = None
+    if range_header and (not if_range or if_range == headers.get("ETag")):
+        try:
+            span = byte_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if span is None:
+        return Response(body, media_type=media_type, headers=headers)
+    start, end = span
+    return Response(body[start:end + 1], status_code=206, media_type=media_type,
+                    headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"})
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
@@ -0,0 +1,118 @@
+"""
+Destinations for code analysis results.
+
+The analyses report to a sink as they go: `file()` for each analyzed file
+(where the analysis produces per-file results) and `end()` with the full
+results dict. Which sink is used decides whether anything touches the disk:
+
+    MemorySink       keeps results in memory (the API)
+    FileSink         pretty-printed JSON file per analysis (the CLI)
+    JsonLinesSink    one JSON object per line, written as files finish (huge runs)
+
+Only the standard library is used so the standalone scripts can import it.
+"""
+import json
+import os
+
+from issue_store import to_json
+
+
+class ResultSink:
+    def file(self, analysis, file_result):
+        """One file's results; called while the analysis is still running"""
+
+    def end(self, analysis, results):
+        """The complete results of `analysis`"""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MemorySink(ResultSink):
+    def __init__(self):
+        self.results = {}
+
+    def end(self, analysis, results):
+        self.results[analysis] = results
+
+
+class TeeSink(ResultSink):
+    """Forwards everything to several sinks"""
+
+    def __init__(self, *sinks):
+        self.sinks = [s for s in sinks if s is not None]
+
+    def file(self, analysis, file_result):
+        for sink in self.sinks:
+            sink.file(analysis, file_result)
+
+    def end(self, analysis, results):
+        for sink in self.sinks:
+            sink.end(analysis, results)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+class FileSink(ResultSink):
+    """
+    Writes each analysis to `path` when it ends; a `{analysis}` placeholder in
+    the path gives every analysis its own file.
+    """
+
+    def __init__(self, path, indent=2):
+        self.path = path
+        self.indent = indent
+
+    def path_for(self, analysis):
+        # Not str.format: any other braces in the path are literal
+        return self.path.replace("{analysis}", str(analysis))
+
+    def end(self, analysis, results):
+        with open(self.path_for(analysis), 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=self.indent, ensure_ascii=False, default=to_json)
+
+
+class JsonLinesSink(ResultSink):
+    """
+    Streams {"analysis", "record": "file", ...} lines as files finish and a
+    {"record": "summary"} line at the end of each analysis, so output starts
+    immediately and no document has to be built for it. Analyses without
+    per-file results are written as a single {"record": "results"} line.
+    """
+
+    def __init__(self, path_or_stream):
+        if isinstance(path_or_stream, (str, os.PathLike)):
+            self.stream = open(path_or_stream, 'w', encoding='utf-8')
+            self._owns_stream = True
+        else:
+            self.stream = path_or_stream
+            self._owns_stream = False
+        self._streamed = set()
+
+    def _write(self, record):
+        # dumps() uses the C encoder; dump() to a stream would not
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=to_json))
+        self.stream.write('\n')
+
+    def file(self, analysis, file_result):
+        self._streamed.add(analysis)
+        self._write({"analysis": analysis, "record": "file", **file_result})
+
+    def end(self, analysis, results):
+        if analysis in self._streamed:
+            self._write({"analysis": analysis, "record": "summary", "summary": results.get("summary")})
+        else:
+            self._write({"analysis": analysis, "record": "results", **results})
+        self.stream.flush()
+
+    def close(self):
+        if self._owns_stream:
+            self.stream.close()
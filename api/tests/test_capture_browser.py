@@ -0,0 +1,150 @@
+"""
+Capture profiles against a real Chromium and a local http.server: what gets
+blocked, what the report counts, and how the waits behave. Skipped when
+Playwright's Chromium is not installed.
+"""
+import http.server
+import os
+import threading
+
+import pytest
+
+import artifacts
+import capture
+
+sync_api = pytest.importorskip("playwright.sync_api")
+
+PAGE = b"""<!DOCTYPE html>
+<html><head><title>capture test</title>
+<script src="/app.js"></script>
+<script src="http://ads.doubleclick.net/tag.js"></script>
+</head><body>
+<p>Some text to capture.</p>
+<video src="/clip.webm" autoplay muted></video>
+</body></html>"""
+
+FILES = {
+    "/": ("text/html", PAGE),
+    "/app.js": ("application/javascript", b"document.title = 'ran';"),
+    "/clip.webm": ("video/webm", b"\x1a\x45\xdf\xa3"),
+}
+
+
+def _chromium_installed():
+    try:
+        with sync_api.sync_playwright() as p:
+            return os.path.exists(p.chromium.executable_path)
+    except Exception:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _chromium_installed(), reason="Playwright Chromium is not installed")
+
+
+@pytest.fixture
+def site():
+    """Serves FILES on 127.0.0.1; yields (base_url, list of requested paths)"""
+    requested = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            requested.append(self.path)
+            entry = FILES.get(self.path)
+            if entry is None:
+                self.send_error(404)
+                return
+            media_type, body = entry
+            self.send_response(200)
+            self.send_header("Content-Type", media_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "max-age=3600")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/", requested
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "SCRATCH_DIR", str(tmp_path / "scratch"))
+    monkeypatch.setattr(capture, "HTTP_CACHE_DIR", str(tmp_path / "http_cache"))
+    monkeypatch.setattr(capture, "SNAPSHOT_MODE", "off")
+
+
+@pytest.fixture(params=["routed", "cached"])
+def cache_mode(request, monkeypatch):
+    """Run each test through Playwright routing and through the HTTP-cache path"""
+    if request.param == "routed":
+        monkeypatch.setattr(capture, "HTTP_CACHE_DIR", "")
+    return request.param
+
+
+def _capture(url, tmp_path, profile):
+    report = {}
+    path = capture.capture_screenshot(url, str(tmp_path / "shot.png"), profile=profile, report=report)
+    assert os.path.getsize(path) > 0
+    return report
+
+
+def test_fast_profile_blocks_media_and_ad_hosts(site, tmp_path, cache_mode):
+    url, requested = site
+    profile = capture.get_profile("fast")._replace(network_idle_ms=1000)
+    report = _capture(url, tmp_path, profile)
+
+    assert "/app.js" in requested
+    assert "/clip.webm" not in requested
+    assert report["profile"] == "fast"
+    assert (report["http_cache"] is not None) == (cache_mode == "cached")
+    blocked = report["blocked"]
+    assert blocked["by_type"].get("media") == 1
+    assert blocked["by_host"].get("ads.doubleclick.net") == 1
+    assert blocked["count"] == 2
+    # document, app.js, tag.js and clip.webm were all seen, blocked or not
+    assert report["requests"] >= 4
+    assert report["network_idle"] is True
+    assert set(report["timings_ms"]) >= {"navigation", "network_idle", "total"}
+
+
+def test_full_profile_blocks_nothing(site, tmp_path, cache_mode):
+    url, requested = site
+    report = _capture(url, tmp_path, capture.get_profile("full"))
+
+    assert "/app.js" in requested
+    assert report["blocked"]["count"] == 0
+    assert report["network_idle"] is None
+    assert "network_idle" not in report["timings_ms"]
+
+
+def test_lean_profile_settles_instead_of_waiting_for_idle(site, tmp_path, cache_mode):
+    url, _ = site
+    report = _capture(url, tmp_path, capture.get_profile("lean"))
+
+    assert report["network_idle"] is None
+    assert report["timings_ms"]["settle"] == capture.get_profile("lean").settle_ms
+    assert report["blocked"]["by_type"].get("media") == 1
+
+
+def test_allowed_host_with_extension_like_name_is_not_blocked(site, tmp_path, monkeypatch):
+    """Type patterns of the cached path must not match hostnames (www.webmd.com vs *.webm)"""
+    url, requested = site
+    profile = capture.get_profile("fast")._replace(network_idle_ms=0)
+    # 127.0.0.1 under a name containing ".webm" and ".mov", alongside the profile's own rules
+    profile_rules = capture._host_resolver_rules
+    monkeypatch.setattr(capture, "_host_resolver_rules",
+                        lambda p: ", ".join(filter(None, ["MAP www.webmd.movistar.test 127.0.0.1", profile_rules(p)])))
+    host_url = url.replace("127.0.0.1", "www.webmd.movistar.test")
+    report = _capture(host_url, tmp_path, profile)
+
+    assert report["http_cache"] is not None
+    assert "/" in requested and "/app.js" in requested
+    assert report["blocked"]["by_type"].get("document") is None
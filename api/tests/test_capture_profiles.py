@@ -0,0 +1,122 @@
+"""Capture profile selection and request blocking rules (no browser needed)."""
+import re
+
+import pytest
+
+import capture
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    for name in ("CAPTURE_PROFILE", "CAPTURE_BLOCK_TYPES", "CAPTURE_BLOCK_HOSTS", "CAPTURE_WAIT_UNTIL",
+                 "CAPTURE_NETWORK_IDLE_MS", "CAPTURE_SETTLE_MS"):
+        monkeypatch.delenv(name, raising=False)
+
+
+@pytest.mark.parametrize("host, pattern, expected", [
+    ("doubleclick.net", "doubleclick.net", True),
+    ("stats.g.doubleclick.net", "doubleclick.net", True),
+    ("notdoubleclick.net", "doubleclick.net", False),
+    ("doubleclick.net.example.com", "doubleclick.net", False),
+    ("img.cdn.example.net", "*.cdn.example.*", True),
+    ("cdn.example.net", "*.cdn.example.*", False),
+    ("ads1.example.com", "ads?.example.com", True),
+])
+def test_host_matches_subdomains_and_globs(host, pattern, expected):
+    assert capture._host_matches(host, pattern) is expected
+
+
+def test_fast_profile_blocks_by_type_and_host():
+    profile = capture.get_profile("fast")
+    assert profile.blocks("media", "example.com") == "type"
+    assert profile.blocks("script", "www.google-analytics.com") == "host"
+    assert profile.blocks("script", "example.com") is None
+    assert profile.blocks("image", "example.com") is None
+
+
+def test_full_profile_blocks_nothing():
+    profile = capture.get_profile("full")
+    assert profile.blocks("media", "doubleclick.net") is None
+    assert profile.wait_until == "load"
+
+
+def test_default_profile_from_env(monkeypatch):
+    assert capture.get_profile().name == "fast"
+    monkeypatch.setenv("CAPTURE_PROFILE", "Lean")
+    assert capture.get_profile().name == "lean"
+
+
+def test_block_types_override_replaces_profile_types(monkeypatch):
+    monkeypatch.setenv("CAPTURE_BLOCK_TYPES", "font, Image")
+    profile = capture.get_profile("fast")
+    assert profile.block_types == frozenset({"font", "image"})
+    assert profile.blocks("media", "example.com") is None
+    assert profile.blocks("image", "example.com") == "type"
+
+
+def test_empty_block_types_override_blocks_no_types(monkeypatch):
+    monkeypatch.setenv("CAPTURE_BLOCK_TYPES", "")
+    assert capture.get_profile("lean").block_types == frozenset()
+
+
+def test_block_hosts_override_extends_profile_hosts(monkeypatch):
+    monkeypatch.setenv("CAPTURE_BLOCK_HOSTS", "example.org, *.cdn.example.*")
+    profile = capture.get_profile("full")
+    assert profile.block_hosts == ("example.org", "*.cdn.example.*")
+    assert profile.blocks("script", "a.example.org") == "host"
+    assert profile.blocks("script", "img.cdn.example.net") == "host"
+    assert capture.get_profile("fast").block_hosts[-2:] == ("example.org", "*.cdn.example.*")
+
+
+def test_wait_overrides(monkeypatch):
+    monkeypatch.setenv("CAPTURE_WAIT_UNTIL", "Commit")
+    monkeypatch.setenv("CAPTURE_NETWORK_IDLE_MS", "500")
+    monkeypatch.setenv("CAPTURE_SETTLE_MS", "100")
+    profile = capture.get_profile("fast")
+    assert (profile.wait_until, profile.network_idle_ms, profile.settle_ms) == ("commit", 500, 100)
+
+
+def test_unknown_profile_is_an_error(monkeypatch):
+    with pytest.raises(ValueError, match="Unknown capture profile 'nope'"):
+        capture.get_profile("nope")
+    monkeypatch.setenv("CAPTURE_PROFILE", "bogus")
+    with pytest.raises(ValueError, match="full, fast, lean"):
+        capture.get_profile()
+
+
+def _cdp_matches(url, pattern):
+    # Network.setBlockedURLs semantics: "*" matches any run of characters, nothing else is special
+    return re.fullmatch(".*".join(re.escape(part) for part in pattern.split("*")), url) is not None
+
+
+def _blocked_by_patterns(url, profile):
+    return any(_cdp_matches(url, p) for p in capture._blocked_url_patterns(profile))
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.webmd.com/",
+    "https://www.webmd.com/app.js",
+    "https://www.movistar.es/app.js",
+    "https://www.movieweb.com/main.css",
+    "https://cdn.mp4.example/bundle.js",
+    "https://example.com/movies/index.html",
+])
+def test_cached_type_patterns_ignore_hostnames_and_directories(url):
+    assert not _blocked_by_patterns(url, capture.get_profile("lean"))
+
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/intro.webm",
+    "https://example.com/v/clip.mov?t=3",
+    "https://example.com/a.vtt#cue",
+    "wss://example.com/socket",
+])
+def test_cached_type_patterns_block_by_extension(url):
+    assert _blocked_by_patterns(url, capture.get_profile("fast"))
+
+
+def test_cached_lean_patterns_cover_images_and_fonts():
+    lean = capture.get_profile("lean")
+    assert _blocked_by_patterns("https://example.com/logo.png?v=2", lean)
+    assert _blocked_by_patterns("https://example.com/f/inter.woff2", lean)
+    assert not _blocked_by_patterns("https://example.com/logo.png", capture.get_profile("fast"))
@@ -0,0 +1,216 @@
+"""
+Deep Zoom (DZI) tile pyramids for long page screenshots.
+
+Overlay analysis registers each page image here while it is still in memory.
+Nothing is tiled up front: the first request for a tile builds the levels it
+needs (each level is the one above it halved with INTER_AREA, kept with the
+source) and encodes just that tile, which is then cached in memory and on
+disk. A viewer on a 30,000px page fetches only the visible tiles at its zoom.
+
+Pages are keyed by the content hash of their published image, so tile URLs
+never change meaning and can be cached indefinitely. A page that is no longer
+in memory (evicted, or the server restarted) is reloaded from its published
+image.
+
+    /tiles/<id>.dzi                               descriptor
+    /tiles/<id>_files/<level>/<col>_<row>.<fmt>   tiles; level 0 is 1x1 px
+
+Environment:
+    TILE_SIZE              tile edge in px (default 256)
+    TILE_OVERLAP           overlap in px (default 1)
+    TILE_FORMAT            webp or jpeg (default webp)
+    TILE_SOURCE_CACHE_MB   page images and levels kept in memory (default 512)
+    TILE_CACHE_MB          encoded tiles kept in memory (default 64)
+    TILE_CACHE_DIR         on-disk tile cache (default <tmp>/analysis_tiles; empty disables)
+    TILE_CACHE_DISK_MB     quota of the on-disk cache, enforced by the artifacts sweeper (default 512)
+"""
+import math
+import os
+import re
+import tempfile
+import threading
+from typing import Optional
+
+import cv2
+import numpy as np
+
+import artifacts
+import image_output
+from metrics import CACHE_HITS_TOTAL, CACHE_MISSES_TOTAL, stage_timer
+
+TILE_SIZE = int(os.environ.get("TILE_SIZE", 256))
+TILE_OVERLAP = int(os.environ.get("TILE_OVERLAP", 1))
+TILE_FORMAT = os.environ.get("TILE_FORMAT", "webp").strip().lower()
+SOURCE_CACHE_BYTES = int(float(os.environ.get("TILE_SOURCE_CACHE_MB", 512)) * 1024 * 1024)
+TILE_CACHE_BYTES = int(float(os.environ.get("TILE_CACHE_MB", 64)) * 1024 * 1024)
+TILE_CACHE_DIR = os.environ.get("TILE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "analysis_tiles"))
+TILE_CACHE_DISK_BYTES = int(float(os.environ.get("TILE_CACHE_DISK_MB", 512)) * 1024 * 1024)
+
+_disk_store = artifacts.register(artifacts.ArtifactStore(TILE_CACHE_DIR, TILE_CACHE_DISK_BYTES, name="tiles")) if TILE_CACHE_DIR else None
+
+TILE_EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+MEDIA_TYPES = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+_ID_RE = re.compile(r"^[0-9a-f]{8,64}$")
+
+
+class TileNotFound(LookupError):
+    """Unknown page id, or a level/tile outside the pyramid"""
+
+
+def tile_extension() -> str:
+    return TILE_EXTENSIONS.get(TILE_FORMAT, "webp")
+
+
+def level_count(width: int, height: int) -> int:
+    return int(math.ceil(math.log2(max(width, height, 1)))) + 1
+
+
+class TileSource:
+    """A page image and the pyramid levels built from it so far"""
+
+    def __init__(self, image_id: str, image: np.ndarray):
+        self.id = image_id
+        self.height, self.width = image.shape[:2]
+        self.max_level = level_count(self.width, self.height) - 1
+        self._levels = {self.max_level: image}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(level.nbytes for level in self._levels.values())
+
+    def level_size(self, level: int):
+        scale = 2 ** (self.max_level - level)
+        return max(1, math.ceil(self.width / scale)), max(1, math.ceil(self.height / scale))
+
+    def level_image(self, level: int) -> np.ndarray:
+        if not 0 <= level <= self.max_level:
+            raise TileNotFound(f"level {level} outside 0..{self.max_level}")
+        with self._lock:
+            image = self._levels.get(level)
+            if image is not None:
+                return image
+            # Build down from the nearest level we already have
+            have = min(l for l in self._levels if l > level)
+            image = self._levels[have]
+            with stage_timer("tile_level"):
+                for l in range(have - 1, level - 1, -1):
+                    image = cv2.resize(image, self.level_size(l), interpolation=cv2.INTER_AREA)
+                    self._levels[l] = image
+            return image
+
+    def tile(self, level: int, col: int, row: int) -> np.ndarray:
+        image = self.level_image(level)
+        h, w = image.shape[:2]
+        x = col * TILE_SIZE
+        y = row * TILE_SIZE
+        if col < 0 or row < 0 or x >= w or y >= h:
+            raise TileNotFound(f"tile {col}_{row} outside level {level}")
+        x0 = x - TILE_OVERLAP if col > 0 else x
+        y0 = y - TILE_OVERLAP if row > 0 else y
+        x1 = min(w, x + TILE_SIZE + TILE_OVERLAP)
+        y1 = min(h, y + TILE_SIZE + TILE_OVERLAP)
+        return image[y0:y1, x0:x1]
+
+    def dzi(self) -> str:
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" '
+            f'TileSize="{TILE_SIZE}" Overlap="{TILE_OVERLAP}" Format="{tile_extension()}">'
+            f'<Size Width="{self.width}" Height="{self.height}"/></Image>'
+        )
+
+
+_sources = artifacts.ByteLRU(SOURCE_CACHE_BYTES, size=lambda source: source.nbytes)
+_tiles = artifacts.ByteLRU(TILE_CACHE_BYTES)
+_load_lock = threading.Lock()
+
+
+def image_id_for(published: "image_output.PublishedImage") -> str:
+    return os.path.splitext(os.path.basename(published.path))[0]
+
+
+def register(image_id: str, image: np.ndarray) -> str:
+    """Make `image` (BGR, not modified afterwards) available for tiling; returns the DZI URL"""
+    if _sources.get(image_id) is None:
+        _sources.put(image_id, TileSource(image_id, image))
+    return f"/tiles/{image_id}.dzi"
+
+
+def _published_path(image_id: str, public_dir: str) -> Optional[str]:
+    for codec in image_output.CODECS.values():
+        path = os.path.join(public_dir, image_id + codec.ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _check_id(image_id: str) -> None:
+    if not _ID_RE.match(image_id):
+        raise TileNotFound(f"bad image id {image_id!r}")
+
+
+def get_source(image_id: str, public_dir: Optional[str] = None) -> TileSource:
+    _check_id(image_id)
+    source = _sources.get(image_id)
+    if source is not None:
+        CACHE_HITS_TOTAL.inc(cache="tile_source")
+        return source
+    with _load_lock:
+        source = _sources.get(image_id)
+        if source is not None:
+            return source
+        CACHE_MISSES_TOTAL.inc(cache="tile_source")
+        path = _published_path(image_id, public_dir or image_output.PUBLIC_IMAGES_DIR)
+        image = cv2.imread(path) if path else None
+        if image is None:
+            raise TileNotFound(f"unknown image {image_id}")
+        source = TileSource(image_id, image)
+        _sources.put(image_id, source)
+        return source
+
+
+def dzi(image_id: str) -> str:
+    return get_source(image_id).dzi()
+
+
+def _disk_path(image_id: str, level: int, col: int, row: int) -> Optional[str]:
+    if not TILE_CACHE_DIR:
+        return None
+    return os.path.join(TILE_CACHE_DIR, image_id, str(level), f"{col}_{row}.{tile_extension()}")
+
+
+def get_tile(image_id: str, level: int, col: int, row: int) -> bytes:
+    """Encoded tile bytes, from the memory or disk cache or built now"""
+    _check_id(image_id)  # before it becomes part of a disk path
+    key = (image_id, level, col, row)
+    data = _tiles.get(key)
+    if data is not None:
+        CACHE_HITS_TOTAL.inc(cache="tile")
+        return data
+
+    disk_path = _disk_path(image_id, level, col, row)
+    if disk_path and os.path.exists(disk_path):
+        CACHE_HITS_TOTAL.inc(cache="tile")
+        _disk_store.touch(disk_path)
+        with open(disk_path, 'rb') as f:
+            data = f.read()
+        _tiles.put(key, data)
+        return data
+
+    CACHE_MISSES_TOTAL.inc(cache="tile")
+    source = get_source(image_id)
+    nbytes = source.nbytes
+    tile = source.tile(level, col, row)
+    if source.nbytes != nbytes:
+        # New levels were built; re-account the source against TILE_SOURCE_CACHE_MB
+        _sources.put(image_id, source)
+    codec = image_output.CODECS["jpeg" if tile_extension() == "jpg" else "webp"]
+    with stage_timer("tile_encode"):
+        data = image_output.encode(tile, codec)
+    _tiles.put(key, data)
+    if disk_path:
+        os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+        artifacts.write_atomic(disk_path, data)
+    return data
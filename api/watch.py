@@ -0,0 +1,434 @@
+"""
+Watch mode: keep code analysis findings up to date while files are edited.
+
+The tree is analyzed once, then filesystem events (inotify through ctypes on
+Linux, stat polling elsewhere or with --poll) are collected, debounced, and
+only the checks that apply to each changed file are re-run on that file.
+After every batch the full snapshot can be written to a JSON file and the
+delta POSTed to a local endpoint.
+
+Usage:
+    python watch.py ./site --output findings.json
+    python watch.py ./site --post http://127.0.0.1:9000/findings --debounce 0.5
+"""
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import json
+import os
+import select
+import struct
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+import code_analyzer
+from issue_store import to_json
+from log_config import configure_logging, get_logger
+from project_tree import DEFAULT_IGNORE, walk_tree
+
+logger = get_logger("watch")
+
+
+# ---------------- Per-file checks ----------------
+def _aria(path, rel_path):
+    percentage, without_aria, total, missing_by_type, missing_elements = code_analyzer.check_aria_labels(path)
+    return {
+        "total_interactive_elements": total,
+        "elements_without_aria": without_aria,
+        "percentage_without_aria": round(percentage, 1),
+        "missing_by_type": missing_by_type,
+        "missing_elements": missing_elements,
+    }
+
+
+_NESTING_CHECKS = {
+    ".html": code_analyzer.check_html_nesting,
+    ".css": code_analyzer.check_css_nesting,
+    ".js": code_analyzer.check_js_nesting,
+}
+
+
+def _nesting(path, rel_path):
+    return _NESTING_CHECKS[os.path.splitext(path)[1].lower()](path)
+
+
+def _image_alt(path, rel_path):
+    analyzer = code_analyzer.ImageAltAnalyzer()
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        content = f.read()
+    if os.path.splitext(path)[1].lower() in (".html", ".htm"):
+        analyzer.analyze_html_content(content, rel_path)
+    else:
+        analyzer.analyze_js_content(content, rel_path)
+    return analyzer.file_results
+
+
+# check name -> (extensions it applies to, function(path, rel_path))
+CHECKS = {
+    "aria": ({".html"}, _aria),
+    "nesting": (set(_NESTING_CHECKS), _nesting),
+    "image_alt": ({".html", ".htm", ".js", ".jsx", ".ts", ".tsx"}, _image_alt),
+}
+WATCHED_EXTENSIONS = set().union(*(exts for exts, _ in CHECKS.values()))
+
+
+def analyze_file(path, rel_path):
+    """Run every check that applies to `path`; a failing check records its error."""
+    ext = os.path.splitext(path)[1].lower()
+    findings = {}
+    for name, (extensions, check) in CHECKS.items():
+        if ext in extensions:
+            try:
+                findings[name] = check(path, rel_path)
+            except Exception as e:
+                findings[name] = {"error": f"{type(e).__name__}: {e}"}
+    return findings
+
+
+def summarize(files):
+    summary = {
+        "total_files": len(files),
+        "aria": {"total_interactive_elements": 0, "elements_without_aria": 0},
+        "nesting": {"total_issues": 0, "issues_by_type": {}},
+        "image_alt": {"total_images": 0, "images_without_alt": 0},
+    }
+    for findings in files.values():
+        aria = findings.get("aria")
+        if isinstance(aria, dict) and "error" not in aria:
+            summary["aria"]["total_interactive_elements"] += aria["total_interactive_elements"]
+            summary["aria"]["elements_without_aria"] += aria["elements_without_aria"]
+        nesting = findings.get("nesting")
+        if isinstance(nesting, list):
+            summary["nesting"]["total_issues"] += len(nesting)
+            by_type = summary["nesting"]["issues_by_type"]
+            for issue in nesting:
+                by_type[issue["type"]] = by_type.get(issue["type"], 0) + 1
+        for result in findings.get("image_alt") or []:
+            if isinstance(result, dict) and "total_images" in result:
+                summary["image_alt"]["total_images"] += result["total_images"]
+                summary["image_alt"]["images_without_alt"] += result["without_alt"]
+    return summary
+
+
+# ---------------- Watchers ----------------
+class PollingWatcher:
+    """Detects changes by comparing (size, mtime) snapshots of the tree."""
+
+    def __init__(self, root, ignore=DEFAULT_IGNORE, extensions=None, interval=1.0):
+        self.root = root
+        self.ignore = ignore
+        self.extensions = extensions
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def _scan(self):
+        snapshot = {}
+        for rel_path in walk_tree(self.root, ignore=self.ignore, extensions=self.extensions):
+            try:
+                st = os.stat(os.path.join(self.root, rel_path))
+            except OSError:
+                continue
+            snapshot[rel_path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def poll(self, timeout):
+        """Relative paths created, modified or deleted; waits at most `timeout` seconds."""
+        delay = self._next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set()
+        if delay > 0:
+            time.sleep(delay)
+        current = self._scan()
+        self._next_scan = time.monotonic() + self.interval
+        changed = {p for p, sig in current.items() if self._snapshot.get(p) != sig}
+        changed |= set(self._snapshot) - set(current)
+        self._snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+               | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Linux inotify through ctypes, with one watch per (non-ignored) directory."""
+
+    def __init__(self, root, ignore=DEFAULT_IGNORE, extensions=None):
+        self.root = root
+        self.ignore = ignore
+        self.extensions = extensions
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}  # watch descriptor -> relative directory ("" for root)
+        self._watch_tree("")
+
+    def _watch_dir(self, rel_dir):
+        path = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        wd = self._add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            return False
+        self._dirs[wd] = rel_dir
+        return True
+
+    def _watch_tree(self, rel_dir):
+        """Watch `rel_dir` and everything below it; returns the files found there."""
+        files = []
+        pending = [rel_dir]
+        while pending:
+            current = pending.pop()
+            if not self._watch_dir(current):
+                continue
+            path = os.path.join(self.root, current) if current else self.root
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+            for entry in entries:
+                rel_path = f"{current}/{entry.name}" if current else entry.name
+                if self._ignored(entry.name, rel_path):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(rel_path)
+                    elif self._wanted(entry.name):
+                        files.append(rel_path)
+                except OSError:
+                    continue
+        return files
+
+    def _ignored(self, name, rel_path):
+        # Parents are already watched, so only this entry's name and full path matter
+        return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(rel_path, p) for p in self.ignore)
+
+    def _wanted(self, name):
+        return self.extensions is None or os.path.splitext(name)[1].lower() in self.extensions
+
+    def poll(self, timeout):
+        """Relative paths created, modified or deleted; waits at most `timeout` seconds."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            changed |= self._parse(data)
+        return changed
+
+    def _parse(self, data):
+        changed = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: rewatch and report every file
+                changed |= self._rewatch_all()
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            rel_dir = self._dirs.get(wd)
+            if rel_dir is None or not name:
+                continue
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            if self._ignored(name, rel_path):
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files may have landed before the watch existed
+                    changed |= set(self._watch_tree(rel_path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    changed.add(rel_path + "/")
+            elif self._wanted(name):
+                changed.add(rel_path)
+        return changed
+
+    def _rewatch_all(self):
+        for wd in list(self._dirs):
+            self._dirs.pop(wd, None)
+        return set(self._watch_tree(""))
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def open_watcher(root, ignore=DEFAULT_IGNORE, extensions=None, force_polling=False, interval=1.0):
+    if not force_polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, ignore, extensions)
+        except (OSError, AttributeError) as e:
+            logger.warning("inotify unavailable, falling back to polling: %s", e)
+    return PollingWatcher(root, ignore, extensions, interval)
+
+
+# ---------------- Sinks ----------------
+def write_snapshot(path, snapshot):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".watch_", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False, default=to_json)
+    os.replace(tmp_path, path)
+
+
+def post_json(url, payload, timeout=5.0):
+    body = json.dumps(payload, ensure_ascii=False, default=to_json).encode("utf-8")
+    req = urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        resp.read()
+
+
+# ---------------- Watch loop ----------------
+class Watch:
+    """Holds the current findings for every file under `root` and applies change batches."""
+
+    def __init__(self, root, ignore=DEFAULT_IGNORE, output=None, post_url=None):
+        self.root = os.path.abspath(root)
+        self.ignore = ignore
+        self.output = output
+        self.post_url = post_url
+        self.files = {}
+
+    def initial_scan(self):
+        for rel_path in walk_tree(self.root, ignore=self.ignore, extensions=WATCHED_EXTENSIONS):
+            self.files[rel_path] = analyze_file(os.path.join(self.root, rel_path), rel_path)
+        self.publish({"changed": self.files, "removed": []})
+
+    def apply(self, rel_paths):
+        """Re-analyze the changed files, drop deleted ones, publish the delta."""
+        changed, removed = {}, []
+        for rel_path in sorted(rel_paths):
+            if rel_path.endswith("/"):
+                # A whole directory went away
+                prefix = rel_path
+                for known in [p for p in self.files if p.startswith(prefix)]:
+                    del self.files[known]
+                    removed.append(known)
+                continue
+            path = os.path.join(self.root, rel_path)
+            if os.path.isfile(path):
+                self.files[rel_path] = changed[rel_path] = analyze_file(path, rel_path)
+            elif self.files.pop(rel_path, None) is not None:
+                removed.append(rel_path)
+        if changed or removed:
+            self.publish({"changed": changed, "removed": removed})
+        return changed, removed
+
+    def publish(self, delta):
+        summary = summarize(self.files)
+        updated_at = datetime.now().isoformat()
+        if self.output:
+            write_snapshot(self.output, {"updated_at": updated_at, "root": self.root,
+                                         "summary": summary, "files": self.files})
+        if self.post_url:
+            try:
+                post_json(self.post_url, {"updated_at": updated_at, "root": self.root, "summary": summary, **delta})
+            except Exception as e:
+                logger.warning("Could not push findings to %s: %s", self.post_url, e)
+
+    def run(self, watcher, debounce=0.3, max_delay=2.0, stop_event=None, on_batch=None):
+        """
+        Collect events until `debounce` seconds pass without new ones (or
+        `max_delay` since the first), then apply them as one batch.
+        """
+        pending = set()
+        first_event = None
+        while stop_event is None or not stop_event.is_set():
+            changed = watcher.poll(debounce if pending else 0.5)
+            now = time.monotonic()
+            if changed:
+                pending |= changed
+                first_event = first_event or now
+                if now - first_event < max_delay:
+                    continue
+            if pending:
+                batch, pending, first_event = pending, set(), None
+                start = time.perf_counter()
+                updated, removed = self.apply(batch)
+                if on_batch:
+                    on_batch(updated, removed, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-analyze HTML/CSS/JS files as they change")
+    parser.add_argument("path", nargs="?", default=".", help="Directory to watch (default: current directory)")
+    parser.add_argument("--output", metavar="FILE", help="Rewrite FILE with the full findings after every change")
+    parser.add_argument("--post", metavar="URL", help="POST each change batch as JSON to URL")
+    parser.add_argument("--ignore", default=",".join(DEFAULT_IGNORE), help="Comma-separated ignore globs")
+    parser.add_argument("--debounce", type=float, default=0.3, help="Quiet period before a batch runs (seconds)")
+    parser.add_argument("--poll", action="store_true", help="Use stat polling instead of inotify")
+    parser.add_argument("--interval", type=float, default=1.0, help="Polling interval (seconds)")
+    args = parser.parse_args(argv)
+
+    configure_logging(fmt="text")
+    ignore = tuple(g.strip() for g in args.ignore.split(",") if g.strip())
+    if not args.output and not args.post:
+        parser.error("give --output and/or --post")
+
+    watch = Watch(args.path, ignore=ignore, output=args.output, post_url=args.post)
+    start = time.perf_counter()
+    watch.initial_scan()
+    print(f"🔍 Analyzed {len(watch.files)} files in {time.perf_counter() - start:.2f}s")
+
+    watcher = open_watcher(watch.root, ignore, WATCHED_EXTENSIONS, force_polling=args.poll, interval=args.interval)
+    print(f"👀 Watching {watch.root} ({type(watcher).__name__}), Ctrl-C to stop")
+
+    def report(updated, removed, seconds):
+        for rel_path in updated:
+            print(f"♻️  {rel_path} re-analyzed")
+        for rel_path in removed:
+            print(f"🗑️  {rel_path} removed")
+        print(f"   batch took {seconds * 1000:.1f}ms")
+
+    try:
+        watch.run(watcher, debounce=args.debounce, on_batch=report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,15 @@
 import type { NextConfig } from "next";
 
+const backend = process.env.BACKEND_SERVICE_URL || 'http://localhost:8000';
+
 const nextConfig: NextConfig = {
-  /* config options here */
+  // Analysis images and deep-zoom tiles are served by the API
+  async rewrites() {
+    return [
+      { source: '/artifacts/:path*', destination: `${backend}/artifacts/:path*` },
+      { source: '/tiles/:path*', destination: `${backend}/tiles/:path*` },
+    ];
+  },
 };
 
 export default nextConfig;
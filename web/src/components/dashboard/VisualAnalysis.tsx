@@ -9,12 +9,17 @@ interface Issue {
   w?: number;
   h?: number;
   ratio?: number;
+  segment?: number;
 }
 
 interface Screenshot {
   url: string;
   title: string;
   issues: Issue[];
+  // overlay mode: page size, so markers can be placed before the image loads
+  width?: number;
+  height?: number;
+  segments?: number;
 }
 
 interface VisualAnalysisProps {
@@ -155,8 +160,11 @@ export default function VisualAnalysis({ screenshots }: VisualAnalysisProps) {
             const ComplianceIcon = compliance?.icon;
             // compute marker position relative to actual rendered image inside the container
             const computeMarkerStyle = () => {
+              const natural = imgNatural ?? (currentScreenshot.width && currentScreenshot.height
+                ? { w: currentScreenshot.width, h: currentScreenshot.height }
+                : null);
               // fallback to previous constants if we don't have sizes yet
-              if (!imgNatural || !containerSize) {
+              if (!natural || !containerSize) {
                 return {
                   left: `${(issue.x / 1200) * 100}%`,
                   top: `${(issue.y / 800) * 100}%`,
@@ -165,9 +173,9 @@ export default function VisualAnalysis({ screenshots }: VisualAnalysisProps) {
                 } as React.CSSProperties;
               }
 
-              const scale = Math.min(containerSize.w / imgNatural.w, containerSize.h / imgNatural.h);
-              const dispW = imgNatural.w * scale;
-              const dispH = imgNatural.h * scale;
+              const scale = Math.min(containerSize.w / natural.w, containerSize.h / natural.h);
+              const dispW = natural.w * scale;
+              const dispH = natural.h * scale;
               const offsetX = (containerSize.w - dispW) / 6;
               const offsetY = (containerSize.h - dispH) / 6;
 